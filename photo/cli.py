@@ -0,0 +1,341 @@
+"""
+ExifEditor 命令行入口，不依赖 Qt，可在无图形界面的服务器上运行。
+
+用法（在 photo 目录下）：
+    python -m cli read IMG_0001.jpg
+    python -m cli set-date IMG_*.jpg --date "2024-10-01 08:30:00" --dest out/
+    python -m cli set-gps IMG_0001.jpg --lat 31.2304 --lon 121.4737 --dest out/
+    python -m cli set-note IMG_0001.jpg --note "外滩" --dest out/
+    python -m cli set-note IMG_*.jpg --note "外滩" --in-place --fsync
+    python -m cli batch photos/*.jpg --date "2024-10-01 08:30:00" --lat 31.2 --lon 121.4 --dest out/
+    python -m cli scan D:/Photos
+    python -m cli shift-time photos/*.jpg --by=-1h30s --dest out/
+    python -m cli geotag photos/*.jpg --gpx track.gpx --tz +08:00 --clock-offset 35 --dest out/
+    python -m cli prefetch-tiles --bbox 121.3,31.1,121.6,31.35 --zoom 10-16
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+from datetime import datetime, timedelta
+
+from utils.batch_editor import BatchEditor, EditSpec
+from utils.catalog import get_catalog
+from utils.exif_core import read_exif_info, resolve_location_name
+from utils.folder_scanner import FolderScanner
+from utils.geotag import DEFAULT_MAX_GAP, GeotagSpec, TrackIndex
+from utils.tile_cache import DEFAULT_MAX_BYTES, MAX_ZOOM, TileCache, TileDownloader, count_tiles, prefetch_tiles
+from utils.time_shift import TimeShiftSpec, parse_time_shift, parse_utc_offset
+
+DATE_FORMATS = ("%Y-%m-%d %H:%M:%S", "%Y:%m:%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S")
+
+
+def parse_date(text):
+    """解析命令行中的日期参数"""
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError(f"无法解析日期：{text}（格式：YYYY-MM-DD HH:MM:SS）")
+
+
+def parse_timezone(text):
+    """解析时区参数，如 +08:00、-5 或 5.5"""
+    offset = parse_utc_offset(text)
+    if offset is None:
+        raise argparse.ArgumentTypeError(f"无法解析时区：{text}（格式：+08:00）")
+    return offset
+
+
+def parse_shift(text):
+    """解析时间偏移参数"""
+    try:
+        return parse_time_shift(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def parse_bbox(text):
+    """解析范围参数：最小经度,最小纬度,最大经度,最大纬度"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in text.split(","))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无法解析范围：{text}（格式：最小经度,最小纬度,最大经度,最大纬度）")
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise argparse.ArgumentTypeError(f"范围无效：{text}（最小值需要小于最大值）")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def parse_zoom_range(text):
+    """解析缩放级别参数，如 12 或 3-15"""
+    try:
+        low, _, high = text.partition("-")
+        low, high = int(low), int(high or low)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无法解析缩放级别：{text}（格式：3-15）")
+    if not 0 <= low <= high <= MAX_ZOOM:
+        raise argparse.ArgumentTypeError(f"缩放级别需要在 0-{MAX_ZOOM} 之间：{text}")
+    return low, high
+
+
+def cmd_read(args):
+    """输出图片的 EXIF 信息"""
+    catalog = None if args.no_catalog else get_catalog()
+    results = []
+    for image_path in args.paths:
+        info = catalog.get_or_parse(image_path) if catalog else read_exif_info(image_path)
+        info["Path"] = image_path
+        if args.geocode and info["Latitude"] is not None and "LocationName" not in info:
+            info["LocationName"] = resolve_location_name(info["Latitude"], info["Longitude"])
+            if catalog and info["LocationName"] != "未知位置":
+                catalog.set_location_name(image_path, info["LocationName"])
+        results.append(info)
+
+    if args.json:
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        for info in results:
+            print(info["Path"])
+            print(f"  拍摄日期: {info['DateTime'] or '无'}")
+            print(f"  GPS 坐标: {info['Location']}")
+            if "LocationName" in info:
+                print(f"  拍摄地点: {info['LocationName']}")
+            print(f"  备注: {info['Note']}")
+    return 0
+
+
+def _gps_coords(args):
+    """由 --lat/--lon 生成 GPS 坐标字符串"""
+    if args.lat is None and args.lon is None:
+        return None
+    if args.lat is None or args.lon is None:
+        raise SystemExit("错误: --lat 和 --lon 需要同时指定")
+    return f"{args.lat}, {args.lon}"
+
+
+def run_edit(args, spec):
+    """用批量引擎处理所有文件"""
+    # 原地修改时保留了修改时间，需要由编辑器刷新元数据目录
+    dest_dir = None if args.in_place else args.dest
+    editor = BatchEditor(spec, dest_dir, workers=args.workers, use_processes=args.processes,
+                         fsync=args.fsync, catalog=get_catalog() if args.in_place else None)
+
+    def on_error(path, e):
+        print(f"错误，{path} 处理失败：{e}", file=sys.stderr)
+
+    def on_success(path, dest_path):
+        if args.verbose:
+            print(f"{path} -> {dest_path}")
+
+    try:
+        result = editor.run(args.paths, on_success=on_success, on_error=on_error)
+    except KeyboardInterrupt:
+        editor.cancel()
+        return 130
+    print(f"完成：成功 {len(result.succeeded)} 个，失败 {len(result.failed)} 个")
+    return 1 if result.failed else 0
+
+
+def cmd_set_date(args):
+    return run_edit(args, EditSpec(date=args.date))
+
+
+def cmd_set_gps(args):
+    return run_edit(args, EditSpec(gps_coords=_gps_coords(args)))
+
+
+def cmd_set_note(args):
+    return run_edit(args, EditSpec(note=args.note))
+
+
+def cmd_batch(args):
+    spec = EditSpec(date=args.date, gps_coords=_gps_coords(args), note=args.note)
+    return run_edit(args, spec)
+
+
+def cmd_shift_time(args):
+    """平移拍摄时间"""
+    if args.by is None and args.to_tz is None:
+        raise SystemExit("错误: 需要指定 --by 或 --to-tz")
+    spec = TimeShiftSpec(args.by or timedelta(), from_offset=args.from_tz, to_offset=args.to_tz)
+    return run_edit(args, spec)
+
+
+def cmd_geotag(args):
+    """按 GPX 轨迹为照片写入坐标"""
+    track = TrackIndex.from_gpx(args.gpx)
+    if not len(track):
+        print("错误: GPX 文件中没有带时间的轨迹点", file=sys.stderr)
+        return 1
+    print(f"已读取 {len(track)} 个轨迹点")
+    spec = GeotagSpec(track, utc_offset=args.tz, clock_offset=args.clock_offset, max_gap=args.max_gap)
+
+    if args.dry_run:
+        missing = 0
+        for image_path in args.paths:
+            try:
+                lat, lon = spec.locate(image_path)
+                print(f"{image_path}: {lat:.6f}, {lon:.6f}")
+            except LookupError as e:
+                missing += 1
+                print(f"{image_path}: {e}")
+        print(f"匹配 {len(args.paths) - missing} 个，未匹配 {missing} 个")
+        return 0
+    if args.dest is None and not args.in_place:
+        raise SystemExit("错误: 需要指定 --dest 或 --in-place（或使用 --dry-run 预览）")
+    # 轨迹索引较大，固定使用线程池
+    args.processes = False
+    return run_edit(args, spec)
+
+
+def cmd_prefetch_tiles(args):
+    """预先下载范围内的地图瓦片，供没有网络的机器使用"""
+    min_zoom, max_zoom = args.zoom
+    total = count_tiles(*args.bbox, min_zoom, max_zoom)
+    if total > args.max_tiles:
+        print(f"错误: 共 {total} 个瓦片，超过 --max-tiles {args.max_tiles}，请缩小范围或缩放级别", file=sys.stderr)
+        return 1
+    max_bytes = args.max_mb * 1024 * 1024 if args.max_mb else None
+    cache = TileCache(args.cache, max_bytes=max_bytes)
+    print(f"共 {total} 个瓦片，写入 {cache.db_path}")
+
+    def on_progress(done, count, failed):
+        print(f"\r已处理 {done}/{count}，失败 {failed}", end="", flush=True)
+
+    try:
+        downloaded, skipped, failed = prefetch_tiles(
+            cache, TileDownloader(args.url), args.bbox, min_zoom, max_zoom, workers=args.workers,
+            on_progress=on_progress)
+    except KeyboardInterrupt:
+        print()
+        return 130
+    count, size = cache.stats()
+    print(f"\n完成：下载 {downloaded} 个，已存在 {skipped} 个，失败 {failed} 个；"
+          f"缓存共 {count} 个瓦片，{size / 1024 / 1024:.1f} MB")
+    return 1 if failed else 0
+
+
+def cmd_scan(args):
+    """扫描目录并写入元数据目录"""
+    catalog = get_catalog()
+    if catalog is None:
+        return 1
+    scanner = FolderScanner(catalog, workers=args.workers, use_processes=not args.threads)
+
+    def on_progress(stats):
+        print(f"\r{stats}", end="", flush=True)
+
+    def on_error(path, e):
+        if args.verbose:
+            print(f"\n错误，{path} 解析失败：{e}", file=sys.stderr)
+
+    try:
+        for root in args.roots:
+            stats = scanner.scan(root, on_progress=on_progress, on_error=on_error)
+            print(f"\r{root}: {stats}")
+    except KeyboardInterrupt:
+        scanner.cancel()
+        return 130
+    return 0
+
+
+def _add_edit_options(parser):
+    """写入类命令的公共参数"""
+    parser.add_argument("paths", nargs="+", help="图片文件")
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--dest", help="导出目录")
+    output.add_argument("--in-place", action="store_true", help="原地修改源文件（只支持 JPEG 和 HEIC）")
+    parser.add_argument("--fsync", action="store_true", help="每个文件替换前刷到磁盘")
+    parser.add_argument("--workers", type=int, default=None, help="并行数，默认为 CPU 核数")
+    parser.add_argument("--processes", action="store_true", help="使用进程池（非 JPEG 需要重新编码时更快）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出每个文件的处理结果")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m cli", description="ExifEditor 命令行工具")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("read", help="读取 EXIF 信息")
+    p.add_argument("paths", nargs="+", help="图片文件")
+    p.add_argument("--json", action="store_true", help="以 JSON 格式输出")
+    p.add_argument("--geocode", action="store_true", help="解析拍摄地点名称")
+    p.add_argument("--no-catalog", action="store_true", help="不使用元数据目录，总是重新解析文件")
+    p.set_defaults(func=cmd_read)
+
+    p = subparsers.add_parser("set-date", help="设置拍摄日期")
+    _add_edit_options(p)
+    p.add_argument("--date", type=parse_date, required=True, help="YYYY-MM-DD HH:MM:SS")
+    p.set_defaults(func=cmd_set_date)
+
+    p = subparsers.add_parser("set-gps", help="设置 GPS 坐标")
+    _add_edit_options(p)
+    p.add_argument("--lat", type=float, required=True, help="纬度（南纬为负）")
+    p.add_argument("--lon", type=float, required=True, help="经度（西经为负）")
+    p.set_defaults(func=cmd_set_gps)
+
+    p = subparsers.add_parser("set-note", help="设置备注")
+    _add_edit_options(p)
+    p.add_argument("--note", required=True, help="备注内容")
+    p.set_defaults(func=cmd_set_note)
+
+    p = subparsers.add_parser("batch", help="同时设置日期、GPS 和备注")
+    _add_edit_options(p)
+    p.add_argument("--date", type=parse_date, help="YYYY-MM-DD HH:MM:SS")
+    p.add_argument("--lat", type=float, help="纬度（南纬为负）")
+    p.add_argument("--lon", type=float, help="经度（西经为负）")
+    p.add_argument("--note", help="备注内容")
+    p.set_defaults(func=cmd_batch)
+
+    p = subparsers.add_parser("shift-time", help="按相对偏移平移拍摄时间")
+    _add_edit_options(p)
+    p.add_argument("--by", type=parse_shift, help="时间偏移，如 +1d2h；负值需写成 --by=-30s")
+    p.add_argument("--from-tz", type=parse_timezone, help="原时区（照片没有时区标签时使用），如 +08:00")
+    p.add_argument("--to-tz", type=parse_timezone, help="改为新时区，按时区差额平移并更新时区标签")
+    p.set_defaults(func=cmd_shift_time)
+
+    p = subparsers.add_parser("geotag", help="按 GPX 轨迹写入 GPS 坐标")
+    p.add_argument("paths", nargs="+", help="图片文件")
+    p.add_argument("--gpx", nargs="+", required=True, help="GPX 轨迹文件")
+    output = p.add_mutually_exclusive_group()
+    output.add_argument("--dest", help="导出目录")
+    output.add_argument("--in-place", action="store_true", help="原地修改源文件（只支持 JPEG 和 HEIC）")
+    p.add_argument("--fsync", action="store_true", help="每个文件替换前刷到磁盘")
+    p.add_argument("--tz", type=parse_timezone, default=None,
+                   help="相机时钟所在时区，如 +08:00；默认使用照片的 OffsetTimeOriginal 或本机时区")
+    p.add_argument("--clock-offset", type=float, default=0.0, help="相机时钟比实际时间快的秒数（慢时为负）")
+    p.add_argument("--max-gap", type=float, default=DEFAULT_MAX_GAP, help="允许插值的轨迹点最大间隔（秒）")
+    p.add_argument("--dry-run", action="store_true", help="只输出匹配结果，不写入文件")
+    p.add_argument("--workers", type=int, default=None, help="并行数，默认为 CPU 核数")
+    p.add_argument("-v", "--verbose", action="store_true", help="输出每个文件的处理结果")
+    p.set_defaults(func=cmd_geotag)
+
+    p = subparsers.add_parser("prefetch-tiles", help="预先下载地图瓦片到本地瓦片缓存（MBTiles）")
+    p.add_argument("--bbox", type=parse_bbox, required=True, help="范围：最小经度,最小纬度,最大经度,最大纬度")
+    p.add_argument("--zoom", type=parse_zoom_range, required=True, help="缩放级别范围，如 3-15")
+    p.add_argument("--cache", default=None, help="瓦片数据库路径，默认为 EXIF_EDITOR_TILES 或缓存目录")
+    p.add_argument("--url", default=None, help="瓦片地址模板，包含 {x}、{y}、{z}，可选 {s}")
+    p.add_argument("--max-mb", type=int, default=DEFAULT_MAX_BYTES // 1024 // 1024,
+                   help="缓存大小上限（MB），超出时淘汰最久未使用的瓦片；0 表示不限制")
+    p.add_argument("--max-tiles", type=int, default=100000, help="瓦片数超过该值时拒绝下载")
+    p.add_argument("--workers", type=int, default=4, help="并行下载数")
+    p.set_defaults(func=cmd_prefetch_tiles)
+
+    p = subparsers.add_parser("scan", help="递归扫描目录，建立元数据目录")
+    p.add_argument("roots", nargs="+", help="图片目录")
+    p.add_argument("--workers", type=int, default=None, help="并行数，默认为 CPU 核数")
+    p.add_argument("--threads", action="store_true", help="使用线程池代替进程池")
+    p.add_argument("-v", "--verbose", action="store_true", help="输出解析失败的文件")
+    p.set_defaults(func=cmd_scan)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
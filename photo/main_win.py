@@ -1,13 +1,17 @@
 from datetime import datetime
+import multiprocessing
 import sys
 from utils import messages
 from utils.emitting_stream import EmittingStream
 from ui.main_window import Ui_MainWindow
-from PyQt5.QtWidgets import QApplication, QMainWindow
-from PyQt5.QtCore import Qt, QPoint
+from PyQt5.QtWidgets import QApplication, QMainWindow, QMenu, QPushButton
+from PyQt5.QtCore import Qt, QPoint, QTimer
 from utils.button_events import ButtonEvents
-from utils.exif_editor import ExifEditorApp  # Add this import statement
-from geopy.geocoders import Nominatim  # Import Nominatim
+from utils.image_loader import ImageLoader
+from utils.geocoding import get_reverse_geocoder
+
+# 启动后延迟创建地图对话框，避免与窗口首次绘制争抢主线程
+MAP_PREWARM_DELAY_MS = 1500
 
 class InterfaceWindow(QMainWindow):
     def __init__(self):
@@ -19,8 +23,16 @@ class InterfaceWindow(QMainWindow):
         self.setMouseTracking(True)  # 启用鼠标追踪
         self.lastPosition = QPoint(0, 0)  # 初始化最后的位置
         self.current_page_index = 0 # 初始化变量，记录当前页面索引
-        # 初始化地理编码服务
-        self.geolocator = Nominatim(user_agent="geo_app")
+        # 后台图片加载器
+        self.image_loader = ImageLoader(self)
+        self.image_loader.thumbnail_ready.connect(lambda gen, image: ButtonEvents.show_thumbnail(self, gen, image))
+        self.image_loader.preview_ready.connect(lambda gen, image: ButtonEvents.show_preview(self, gen, image))
+        self.image_loader.full_image_ready.connect(lambda gen, image: ButtonEvents.show_full_image(self, gen, image))
+        self.image_loader.exif_ready.connect(lambda gen, info: ButtonEvents.show_exif_info(self, gen, info))
+        self.image_loader.location_ready.connect(lambda gen, name: ButtonEvents.show_location(self, gen, name))
+        self.image_loader.picked_location_ready.connect(
+            lambda gen, result: ButtonEvents.show_picked_location(self, gen, result))
+        self.image_loader.failed.connect(lambda gen, stage, e: ButtonEvents.show_load_error(self, gen, stage, e))
 
 
         # 连接按钮事件
@@ -32,6 +44,17 @@ class InterfaceWindow(QMainWindow):
         self.ui.pushButton_8.clicked.connect(lambda: ButtonEvents.open_aliyun_drive_link(self)) # 绑定打开阿里云盘链接事件
         self.ui.pushButton_11.clicked.connect(lambda: ButtonEvents.save(self))  # 绑定保存Exif信息事件
         self.ui.pushButton_20.clicked.connect(lambda: ButtonEvents.open_map_dialog(self))  # 绑定打开Exif编辑器事件
+        self.ui.pushButton_9.setText("批量编辑")
+        self.ui.pushButton_9.clicked.connect(lambda: ButtonEvents.batch_edit(self))  # 绑定批量编辑事件
+        self.ui.pushButton_10.setText("导入文件夹")
+        self.ui.pushButton_10.clicked.connect(lambda: ButtonEvents.scan_folder(self))  # 绑定导入文件夹事件
+        # 不常用的功能放在“更多功能”菜单中，避免操作栏过长
+        self.tools_menu = self.add_menu_button("更多功能")
+        self.tools_menu.addAction("浏览文件夹", lambda: ButtonEvents.browse_folder(self))  # 绑定浏览文件夹事件
+        self.tools_menu.addAction("批量平移时间", lambda: ButtonEvents.shift_time(self))  # 绑定平移拍摄时间事件
+        self.tools_menu.addAction("按 GPX 轨迹写入坐标", lambda: ButtonEvents.geotag_photos(self))  # 绑定 GPX 轨迹写入坐标事件
+        # 窗口显示后空闲时预先创建地图对话框
+        QTimer.singleShot(MAP_PREWARM_DELAY_MS, lambda: ButtonEvents.prewarm_map_dialog(self))
 
 
         # 创建输出流对象
@@ -43,7 +66,35 @@ class InterfaceWindow(QMainWindow):
 
         # 显示初始提示信息
         self.append_text_to_browser(messages.INITIAL_WARNING)
+        # 初始化地理编码服务（在重定向输出之后，没有离线地名数据集时的提示会显示在日志中）
+        self.geolocator = get_reverse_geocoder()
+
+
+    def add_menu_button(self, text):
+        """
+        在左侧操作栏的保存按钮上方添加一个带菜单的按钮，样式与批量编辑等按钮相同。
 
+        参数：
+            text (str): 按钮文字。
+
+        返回：
+            QMenu: 按钮的菜单，点击按钮时弹出。
+        """
+        template = self.ui.pushButton_10
+        button = QPushButton(text, self.ui.frame_16)
+        button.setSizePolicy(template.sizePolicy())
+        button.setMinimumSize(template.minimumSize())
+        button.setIcon(template.icon())
+        menu = QMenu(button)
+        menu.setStyleSheet(
+            "QMenu { background-color: #444; color: white; border: 1px solid #333333; font-size: 14px; }"
+            "QMenu::item { padding: 6px 24px; }"
+            "QMenu::item:selected { background-color: #555; }"
+        )
+        button.setMenu(menu)
+        layout = self.ui.verticalLayout_7
+        layout.insertWidget(layout.indexOf(self.ui.pushButton_11), button)
+        return menu
 
     def mousePressEvent(self, event):
         """处理鼠标按下事件"""
@@ -92,6 +143,9 @@ class InterfaceWindow(QMainWindow):
         super().closeEvent(event)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后导入文件夹使用进程池
+    # 地图对话框在第一次打开时才导入 QtWebEngineWidgets，需要在创建 QApplication 前设置共享 OpenGL 上下文
+    QApplication.setAttribute(Qt.AA_ShareOpenGLContexts)
     app = QApplication(sys.argv)
     window = InterfaceWindow()
     window.show()
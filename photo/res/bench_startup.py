@@ -0,0 +1,81 @@
+"""
+比较两种资源注册方式的导入耗时：
+    - pyrcc5 风格：资源以字节串字面量写在 Python 模块中，导入时反序列化 .pyc 并调用 qRegisterResourceData；
+    - 二进制资源：导入 res.res_rc，由 QResource.registerResource 映射 res.rcc。
+
+两者使用同一份 res.qrc 生成的资源。每次测量都在新的子进程中进行（.pyc 已预先生成），
+先导入 PyQt5.QtCore，只统计资源模块本身的导入时间。用法（在 photo 目录下）：
+    python -m res.bench_startup --runs 20
+"""
+import argparse
+import os
+import statistics
+import struct
+import subprocess
+import sys
+import tempfile
+
+from res.build_rcc import DEFAULT_QRC, build_rcc, parse_qrc
+
+PHOTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MEASURE = """
+import sys, time
+sys.path.insert(0, {path!r})
+from PyQt5 import QtCore
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def _bytes_literal(data):
+    """按 pyrcc5 的格式输出字节串字面量：每行 16 个转义字节"""
+    lines = ['b"\\']
+    for i in range(0, len(data), 16):
+        lines.append("".join(f"\\x{b:02x}" for b in data[i:i + 16]) + "\\")
+    lines.append('"')
+    return "\n".join(lines)
+
+
+def write_legacy_module(rcc, directory):
+    """把 .rcc 的三个数据段写成 pyrcc5 风格的 legacy_rc.py"""
+    version, tree_offset, data_offset, names_offset = struct.unpack_from(">IIII", rcc, 4)
+    data = rcc[data_offset:names_offset]
+    names = rcc[names_offset:tree_offset]
+    tree = rcc[tree_offset:]
+    with open(os.path.join(directory, "legacy_rc.py"), "w") as f:
+        f.write("from PyQt5 import QtCore\n\n")
+        f.write(f"qt_resource_data = {_bytes_literal(data)}\n\n")
+        f.write(f"qt_resource_name = {_bytes_literal(names)}\n\n")
+        f.write(f"qt_resource_struct = {_bytes_literal(tree)}\n\n")
+        f.write(f"QtCore.qRegisterResourceData({version}, qt_resource_struct, qt_resource_name, qt_resource_data)\n")
+
+
+def measure(path, module, runs):
+    """在新进程中导入模块 runs 次，返回每次的耗时（秒）"""
+    code = _MEASURE.format(path=path, module=module)
+    subprocess.run([sys.executable, "-c", code], check=True, capture_output=True)  # 预先生成 .pyc
+    return [float(subprocess.run([sys.executable, "-c", code], check=True, capture_output=True, text=True).stdout)
+            for _ in range(runs)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较资源模块的导入耗时")
+    parser.add_argument("--runs", type=int, default=10, help="每种方式的测量次数")
+    args = parser.parse_args(argv)
+
+    rcc = build_rcc(parse_qrc(DEFAULT_QRC))
+    with tempfile.TemporaryDirectory() as directory:
+        write_legacy_module(rcc, directory)
+        legacy_size = os.path.getsize(os.path.join(directory, "legacy_rc.py"))
+        legacy = measure(directory, "legacy_rc", args.runs)
+    binary = measure(PHOTO_DIR, "res.res_rc", args.runs)
+
+    print(f"pyrcc5 模块（{legacy_size} 字节）：中位数 {statistics.median(legacy) * 1000:.2f} ms")
+    print(f"res.rcc（{len(rcc)} 字节）：中位数 {statistics.median(binary) * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""
+把 res.qrc 编译为 Qt 二进制资源文件 res.rcc（与 `rcc -binary` 输出的格式相同），不依赖 Qt。
+
+res.rcc 由 res_rc.py 在启动时通过 QResource.registerResource 注册，Qt 直接映射文件，
+不必像 pyrcc5 生成的 Python 模块那样在每次启动时反序列化并复制整段字节串。
+修改图标后重新运行（在 photo 目录下）：
+    python -m res.build_rcc
+"""
+import argparse
+import os
+import struct
+import sys
+import xml.etree.ElementTree as ET
+
+RES_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_QRC = os.path.join(RES_DIR, "res.qrc")
+DEFAULT_RCC = os.path.join(RES_DIR, "res.rcc")
+
+# 格式版本 2：每个节点 22 字节（含修改时间），Qt 5.8 及以上支持
+RCC_VERSION = 2
+_HEADER_SIZE = 20
+_FLAG_DIRECTORY = 0x02
+_LANGUAGE_C = 1     # QLocale::C，与 rcc 默认值一致
+_COUNTRY_ANY = 0
+
+
+def qt_hash(name):
+    """Qt 5 的 qt_hash，资源树中同一目录的子节点按该值排序后二分查找"""
+    encoded = name.encode("utf-16-be")
+    h = 0
+    for unit in struct.unpack(f">{len(encoded) // 2}H", encoded):
+        h = (h << 4) + unit
+        h ^= (h & 0xF0000000) >> 23
+        h &= 0x0FFFFFFF
+    return h
+
+
+class _Node:
+    def __init__(self, name, data=None):
+        self.name = name
+        self.data = data        # 文件内容，目录为 None
+        self.children = {}
+
+    def child(self, name):
+        if name not in self.children:
+            self.children[name] = _Node(name)
+        return self.children[name]
+
+    def sorted_children(self):
+        return sorted(self.children.values(), key=lambda node: qt_hash(node.name))
+
+
+def parse_qrc(qrc_path):
+    """
+    读取 .qrc 文件，生成资源树。
+
+    返回：
+        _Node: 根目录节点。
+
+    异常：
+        FileNotFoundError: 列出的文件不存在时抛出。
+    """
+    base_dir = os.path.dirname(os.path.abspath(qrc_path))
+    root = _Node("")
+    for resource in ET.parse(qrc_path).getroot().iter("qresource"):
+        prefix = [p for p in resource.get("prefix", "/").split("/") if p]
+        for item in resource.iter("file"):
+            with open(os.path.join(base_dir, item.text), "rb") as f:
+                data = f.read()
+            parts = prefix + [p for p in (item.get("alias") or item.text).split("/") if p]
+            node = root
+            for part in parts[:-1]:
+                node = node.child(part)
+            node.children[parts[-1]] = _Node(parts[-1], data)
+    return root
+
+
+def build_rcc(root):
+    """
+    把资源树序列化为二进制资源。
+
+    节点按广度优先编号，同一目录的子节点连续存放并按 qt_hash 排序；文件内容不压缩，
+    图标本身已是压缩格式，注册后 Qt 可以直接使用映射的数据。修改时间写为 0，
+    使同样的输入总是生成同样的文件。
+
+    返回：
+        bytes: .rcc 文件内容。
+    """
+    names = bytearray()
+    name_offsets = {}
+    data = bytearray()
+    nodes = [root]
+    tree = bytearray()
+
+    def name_offset(name):
+        if name not in name_offsets:
+            name_offsets[name] = len(names)
+            encoded = name.encode("utf-16-be")
+            names.extend(struct.pack(">HI", len(encoded) // 2, qt_hash(name)))
+            names.extend(encoded)
+        return name_offsets[name]
+
+    index = 0
+    while index < len(nodes):
+        node = nodes[index]
+        offset = 0 if node is root else name_offset(node.name)
+        if node.data is None:
+            children = node.sorted_children()
+            tree.extend(struct.pack(">IHII", offset, _FLAG_DIRECTORY, len(children), len(nodes)))
+            nodes.extend(children)
+        else:
+            tree.extend(struct.pack(">IHHHI", offset, 0, _COUNTRY_ANY, _LANGUAGE_C, len(data)))
+            data.extend(struct.pack(">I", len(node.data)))
+            data.extend(node.data)
+        tree.extend(struct.pack(">Q", 0))
+        index += 1
+
+    data_offset = _HEADER_SIZE
+    names_offset = data_offset + len(data)
+    tree_offset = names_offset + len(names)
+    header = b"qres" + struct.pack(">IIII", RCC_VERSION, tree_offset, data_offset, names_offset)
+    return header + bytes(data) + bytes(names) + bytes(tree)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="把 .qrc 编译为 Qt 二进制资源文件")
+    parser.add_argument("qrc", nargs="?", default=DEFAULT_QRC, help="输入的 .qrc 文件")
+    parser.add_argument("-o", "--output", default=DEFAULT_RCC, help="输出的 .rcc 文件")
+    args = parser.parse_args(argv)
+
+    content = build_rcc(parse_qrc(args.qrc))
+    with open(args.output, "wb") as f:
+        f.write(content)
+    print(f"已生成 {args.output}（{len(content)} 字节）")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 测试直接导入 photo 目录下的模块（utils、main_win 等）
+PHOTO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PHOTO_DIR not in sys.path:
+    sys.path.insert(0, PHOTO_DIR)
@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PHOTO_DIR
+
+PIL = pytest.importorskip("PIL")
+from PIL import Image
+
+WIDTH, HEIGHT = 3000, 2000
+# Pillow 中 RGB 和 RGBA 图片每个像素都占 4 字节，以此作为解码后的大小
+DECODED_SIZE = WIDTH * HEIGHT * 4
+
+# 在子进程中执行 convert_image_format，输出 Python 堆的峰值和进程常驻内存的峰值增量。
+# 像素数据由 Pillow 在 C 层分配，tracemalloc 看不到，因此像素缓冲区的峰值用 VmHWM 测量，
+# 测量前写 /proc/self/clear_refs 重置峰值。
+_CHILD = r"""
+import json, sys, tracemalloc
+from PIL import Image
+from utils.exif_core import convert_image_format
+
+def status(key):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(key + ":"):
+                return int(line.split()[1]) * 1024
+
+with open("/proc/self/clear_refs", "w") as f:
+    f.write("5")
+base = status("VmRSS")
+tracemalloc.start()
+img = convert_image_format(sys.argv[1])
+traced_peak = tracemalloc.get_traced_memory()[1]
+rss_peak = status("VmHWM") - base
+print(json.dumps({"mode": img.mode, "traced_peak": traced_peak, "rss_peak": rss_peak}))
+"""
+
+
+def _can_measure_rss():
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not _can_measure_rss(), reason="需要 Linux 的 /proc/self/clear_refs 测量内存峰值")
+
+
+def _measure(path):
+    env = dict(os.environ, PYTHONPATH=PHOTO_DIR)
+    result = subprocess.run([sys.executable, "-c", _CHILD, str(path)], capture_output=True, text=True,
+                            cwd=PHOTO_DIR, env=env, check=True)
+    return json.loads(result.stdout)
+
+
+@pytest.fixture(scope="module")
+def images(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("convert")
+    rgb = Image.new("RGB", (WIDTH, HEIGHT), (10, 20, 30))
+    paths = {
+        "jpeg": folder / "rgb.jpg",
+        "rgb": folder / "rgb.png",
+        "p": folder / "p.png",
+        "rgba": folder / "rgba.png",
+    }
+    rgb.save(paths["jpeg"])
+    rgb.save(paths["rgb"], compress_level=1)
+    rgb.convert("P").save(paths["p"])
+    rgb.putalpha(128)
+    rgb.save(paths["rgba"], compress_level=1)
+    return paths
+
+
+@pytest.mark.parametrize("kind", ["jpeg", "rgb", "p", "rgba"])
+def test_no_python_copies(images, kind):
+    """转换过程中不在 Python 堆上复制像素数据（tobytes、frombytes 等）"""
+    measured = _measure(images[kind])
+    assert measured["mode"] in ("RGB", "L", "CMYK")
+    assert measured["traced_peak"] < DECODED_SIZE * 0.05
+
+
+def test_jpeg_is_not_decoded(images):
+    """JPEG 原样返回，不解码像素"""
+    assert _measure(images["jpeg"])["rss_peak"] < DECODED_SIZE * 0.25
+
+
+@pytest.mark.parametrize("kind", ["rgb", "p"])
+def test_peak_memory_single_buffer(images, kind):
+    """RGB 直接使用解码结果；调色板图片的源数据每像素 1 字节，峰值都不超过解码大小的 1.5 倍"""
+    assert _measure(images[kind])["rss_peak"] < DECODED_SIZE * 1.5
+
+
+def test_peak_memory_rgba_single_conversion(images):
+    """
+    RGBA 转换为 RGB 时源图片和结果必然同时存在（各占一份解码大小），
+    只做一次转换时峰值低于 2.5 倍；多一次转换或复制就会达到 3 倍。
+    """
+    measured = _measure(images["rgba"])
+    assert measured["mode"] == "RGB"
+    assert measured["rss_peak"] < DECODED_SIZE * 2.5
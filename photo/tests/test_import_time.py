@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import PHOTO_DIR
+
+# 启动时不应导入的重量级模块：第一次打开地图、第一次打开 HEIC、第一次联网查询时才导入
+DEFERRED_MODULES = ("PyQt5.QtWebEngineWidgets", "requests", "pillow_heif", "geopy")
+# 导入主窗口模块的总耗时上限（毫秒），留有足够余量，只用于发现新增的重量级导入
+IMPORT_BUDGET_MS = 500
+
+
+def _import_times(module):
+    """
+    在新的解释器中用 -X importtime 导入模块。
+
+    返回：
+        dict: 模块名 -> 累计导入耗时（微秒）。
+    """
+    env = dict(os.environ, PYTHONPATH=PHOTO_DIR)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, cwd=PHOTO_DIR, env=env, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def _deferred_imports(times):
+    return sorted(name for name in times
+                  if any(name == module or name.startswith(module + ".") for module in DEFERRED_MODULES))
+
+
+def test_main_window_import_is_light():
+    pytest.importorskip("PyQt5.QtWidgets")
+    times = _import_times("main_win")
+    assert _deferred_imports(times) == []
+    assert times["main_win"] / 1000 < IMPORT_BUDGET_MS
+
+
+def test_cli_import_does_not_load_qt():
+    times = _import_times("cli")
+    assert _deferred_imports(times) == []
+    assert not any(name == "PyQt5" or name.startswith("PyQt5.") for name in times)
@@ -0,0 +1,42 @@
+import os
+import sys
+
+APP_NAME = "ExifEditor"
+
+
+def get_cache_dir():
+    """
+    获取应用缓存目录，不存在时自动创建。
+
+    Windows 使用 %LOCALAPPDATA%\\ExifEditor，其他系统使用 $XDG_CACHE_HOME/ExifEditor
+    （默认 ~/.cache/ExifEditor）。
+
+    返回：
+        str: 缓存目录路径。
+    """
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    cache_dir = os.path.join(base, APP_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def get_thumbnail_dir():
+    """
+    获取共享缩略图目录（freedesktop 缩略图规范），不存在时自动创建。
+
+    Linux 等系统使用 $XDG_CACHE_HOME/thumbnails（默认 ~/.cache/thumbnails），与文件管理器共用；
+    Windows 没有这一约定，使用应用缓存目录下的 thumbnails。
+
+    返回：
+        str: 缩略图目录路径。
+    """
+    if sys.platform == "win32":
+        thumbnail_dir = os.path.join(get_cache_dir(), "thumbnails")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        thumbnail_dir = os.path.join(base, "thumbnails")
+    os.makedirs(thumbnail_dir, mode=0o700, exist_ok=True)
+    return thumbnail_dir
@@ -0,0 +1,58 @@
+import os
+import shutil
+import threading
+
+
+def atomic_write(dest_path, write, fsync=False, preserve_from=None):
+    """
+    原子地写入文件：先写入同目录下的临时文件，完成后用 os.replace 替换目标文件。
+
+    写入过程中崩溃或断电时，目标文件要么是旧内容，要么是完整的新内容，不会出现半个文件；
+    临时文件与目标文件在同一目录（同一文件系统），重命名不会退化为复制。
+
+    参数：
+        dest_path (str): 目标文件路径，可以与源文件相同（原地修改）。为符号链接时替换链接指向的文件，
+            链接本身保持不变。
+        write (callable): write(临时文件路径)，负责写入完整内容。
+        fsync (bool): 重命名前把文件内容刷到磁盘，重命名后同步目录（较慢，原地修改时建议开启）。
+        preserve_from (str, 可选): 把该文件的权限和访问/修改时间复制到新文件。
+    """
+    # 解析符号链接：直接替换链接会把它变成普通文件，而指向的原文件没有被修改
+    dest_path = os.path.realpath(dest_path)
+    directory = os.path.dirname(dest_path)
+    # 临时文件名包含进程和线程编号，批量处理时互不冲突；由 write 按默认权限创建
+    tmp_path = os.path.join(directory, f".{os.path.basename(dest_path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        write(tmp_path)
+        if preserve_from is not None:
+            stat = os.stat(preserve_from)
+            shutil.copymode(preserve_from, tmp_path)
+            os.utime(tmp_path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        if fsync:
+            _fsync_path(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    if fsync:
+        _fsync_directory(directory)
+
+
+def _fsync_path(path):
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def _fsync_directory(directory):
+    """同步目录项，确保重命名本身已落盘（Windows 不支持打开目录，跳过）"""
+    if os.name == "nt":
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
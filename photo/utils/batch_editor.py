@@ -0,0 +1,168 @@
+import os
+import threading
+from concurrent import futures
+
+from utils.catalog import parse_file
+from utils.exif_core import output_extension, save_image_with_exif
+
+
+class EditSpec:
+    """
+    批量编辑的内容，值为 None（备注为空字符串）的字段保留每个文件的原值。
+
+    参数：
+        date (datetime, 可选): 新的拍摄日期。
+        gps_coords (str, 可选): GPS坐标字符串，格式为 "纬度, 经度"。
+        note (str, 可选): 图片备注。
+    """
+
+    def __init__(self, date=None, gps_coords=None, note=None):
+        self.date = date
+        self.gps_coords = gps_coords
+        self.note = note
+
+    def apply(self, image_path, dest_path, fsync=False):
+        """把编辑内容写入单个文件，dest_path 为 None 时原地修改"""
+        save_image_with_exif(image_path, dest_path, self.date, self.gps_coords, self.note or "", fsync)
+
+
+def _apply_spec(spec, image_path, dest_path, fsync):
+    """在工作线程/进程中处理单个文件（模块级函数，便于进程池序列化）"""
+    spec.apply(image_path, dest_path, fsync)
+    return dest_path or image_path
+
+
+class BatchResult:
+    """批量处理结果"""
+
+    def __init__(self):
+        self.succeeded = []     # [(源路径, 输出路径)]
+        self.failed = []        # [(源路径, 错误信息)]
+        self.cancelled = False
+
+
+class BatchEditor:
+    """
+    批量修改多个文件的 EXIF 信息。
+
+    文件在线程池（或进程池）中并行处理，同时提交的任务数有上限，
+    避免一次性为成千上万个文件创建任务。每个文件的错误单独记录，不影响其他文件。
+
+    参数：
+        spec (EditSpec): 编辑内容。
+        dest_dir (str): 导出目录，为 None 时原地修改源文件（只支持 JPEG 和 HEIC）。
+        workers (int, 可选): 并行数，默认为 CPU 核数。
+        max_pending (int, 可选): 同时排队的最大任务数，默认为并行数的 4 倍。
+        use_processes (bool): 是否使用进程池（非 JPEG 需要重新编码时可充分利用多核）。
+        fsync (bool): 每个文件替换前刷到磁盘，原地修改大型图库时防止断电丢失。
+        catalog (Catalog, 可选): 原地修改后刷新该元数据目录中的记录
+            （修改时间被保留，文件大小也可能不变，目录无法自行发现变化）。
+    """
+
+    def __init__(self, spec, dest_dir, workers=None, max_pending=None, use_processes=False,
+                 fsync=False, catalog=None):
+        self.spec = spec
+        self.dest_dir = dest_dir
+        self.fsync = fsync
+        self.catalog = catalog
+        self.workers = workers or os.cpu_count() or 4
+        self.max_pending = max_pending or self.workers * 4
+        self.use_processes = use_processes
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        """取消尚未开始处理的文件，已在处理中的文件会完成"""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def plan_destinations(self, paths):
+        """
+        为每个源文件生成输出路径，同名文件自动追加序号避免互相覆盖。
+
+        返回：
+            list: [(源路径, 输出路径)]；原地修改时输出路径为 None。
+        """
+        if self.dest_dir is None:
+            return [(image_path, None) for image_path in paths]
+        used = set()
+        jobs = []
+        for image_path in paths:
+            base = os.path.splitext(os.path.basename(image_path))[0]
+            ext = output_extension(image_path)
+            name = base + ext
+            index = 1
+            while name.lower() in used:
+                name = f"{base}_{index}{ext}"
+                index += 1
+            used.add(name.lower())
+            jobs.append((image_path, os.path.join(self.dest_dir, name)))
+        return jobs
+
+    def run(self, paths, on_progress=None, on_success=None, on_error=None):
+        """
+        处理所有文件，阻塞直到完成或被取消。
+
+        参数：
+            paths (list): 源文件路径列表。
+            on_progress (callable, 可选): on_progress(已完成数, 总数)。
+            on_success (callable, 可选): on_success(源路径, 输出路径)。
+            on_error (callable, 可选): on_error(源路径, 错误信息)。
+
+        返回：
+            BatchResult: 处理结果。
+        """
+        jobs = self.plan_destinations(paths)
+        total = len(jobs)
+        result = BatchResult()
+        done = 0
+
+        # concurrent.futures 按需加载进程池模块，只用线程池时不会导入 multiprocessing
+        executor_class = futures.ProcessPoolExecutor if self.use_processes else futures.ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            pending = {}
+            job_iter = iter(jobs)
+            exhausted = False
+
+            while True:
+                # 补充任务直到达到排队上限
+                while not exhausted and not self.is_cancelled() and len(pending) < self.max_pending:
+                    try:
+                        image_path, dest_path = next(job_iter)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    future = executor.submit(_apply_spec, self.spec, image_path, dest_path, self.fsync)
+                    pending[future] = image_path
+
+                if not pending:
+                    break
+
+                finished, _ = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in finished:
+                    image_path = pending.pop(future)
+                    try:
+                        dest_path = future.result()
+                    except Exception as e:
+                        result.failed.append((image_path, str(e)))
+                        if on_error:
+                            on_error(image_path, str(e))
+                    else:
+                        if self.dest_dir is None and self.catalog is not None:
+                            self._refresh_catalog(image_path)
+                        result.succeeded.append((image_path, dest_path))
+                        if on_success:
+                            on_success(image_path, dest_path)
+                    done += 1
+                    if on_progress:
+                        on_progress(done, total)
+
+        result.cancelled = self.is_cancelled() and done < total
+        return result
+
+    def _refresh_catalog(self, image_path):
+        try:
+            self.catalog.store(image_path, parse_file(image_path))
+        except Exception as e:
+            print(f"元数据目录更新失败：{image_path}：{e}")
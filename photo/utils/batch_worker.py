@@ -0,0 +1,111 @@
+import threading
+
+from PyQt5.QtCore import QObject, pyqtSignal
+
+
+class BatchEditWorker(QObject):
+    """
+    在后台线程中运行 BatchEditor，并把进度和结果通过信号交给界面线程。
+    """
+    progress = pyqtSignal(int, int)             # 已完成数, 总数
+    file_failed = pyqtSignal(str, str)          # 源路径, 错误信息
+    finished = pyqtSignal(int, int, bool)       # 成功数, 失败数, 是否被取消
+    error = pyqtSignal(str)                     # 整批中断时的错误信息，随后仍会发出 finished
+
+    def __init__(self, editor, paths, parent=None):
+        super().__init__(parent)
+        self.editor = editor
+        self.paths = list(paths)
+        self._thread = None
+        self._last_percent = -1
+        self._succeeded = 0
+        self._failed = 0
+
+    def start(self):
+        """开始处理"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """取消处理"""
+        self.editor.cancel()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _on_progress(self, done, total):
+        # 文件很多时只在百分比变化时通知界面，避免刷屏
+        percent = done * 100 // total if total else 100
+        if percent != self._last_percent or done == total:
+            self._last_percent = percent
+            self.progress.emit(done, total)
+
+    def _on_success(self, path, dest_path):
+        self._succeeded += 1
+
+    def _on_error(self, path, e):
+        self._failed += 1
+        self.file_failed.emit(path, e)
+
+    def _run(self):
+        try:
+            result = self.editor.run(
+                self.paths,
+                on_progress=self._on_progress,
+                on_success=self._on_success,
+                on_error=self._on_error,
+            )
+        except Exception as e:
+            # 进程池损坏、规划输出路径出错等导致整批中断时按取消处理，界面总能收到结束通知
+            self.error.emit(str(e))
+            self.finished.emit(self._succeeded, self._failed, True)
+            return
+        self.finished.emit(len(result.succeeded), len(result.failed), result.cancelled)
+
+
+class FolderScanWorker(QObject):
+    """
+    在后台线程中运行 FolderScanner，并把进度和结果通过信号交给界面线程。
+    """
+    progress = pyqtSignal(str)          # 当前统计
+    finished = pyqtSignal(str)          # 最终统计
+    error = pyqtSignal(str)             # 扫描中断时的错误信息，随后仍会发出 finished
+
+    def __init__(self, scanner, root, parent=None):
+        super().__init__(parent)
+        self.scanner = scanner
+        self.root = root
+        self.last_error = None
+        self._thread = None
+        self._last_report = 0.0
+        self._stats = None
+
+    def start(self):
+        """开始扫描"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        """取消扫描"""
+        self.scanner.cancel()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _on_progress(self, stats):
+        self._stats = stats
+        # 每秒最多通知一次界面
+        if stats.elapsed - self._last_report >= 1.0:
+            self._last_report = stats.elapsed
+            self.progress.emit(str(stats))
+
+    def _run(self):
+        try:
+            stats = self.scanner.scan(self.root, on_progress=self._on_progress)
+        except Exception as e:
+            # 进程池损坏、写入元数据目录出错等导致扫描中断时，输出已写入部分的统计，界面总能收到结束通知
+            self.last_error = str(e)
+            self.error.emit(self.last_error)
+            self.finished.emit(str(self._stats) if self._stats is not None else "")
+            return
+        self.finished.emit(str(stats))
@@ -1,11 +1,18 @@
 import webbrowser
-import requests
-from PyQt5.QtWidgets import QMessageBox, QFileDialog
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QFontMetrics
+from datetime import datetime, timedelta
+from PyQt5.QtWidgets import QMessageBox, QFileDialog, QGraphicsScene, QInputDialog, QDialog, QDialogButtonBox, QCheckBox, QVBoxLayout, QLabel
+from PyQt5.QtCore import Qt, QSize
+from PyQt5.QtGui import QIcon, QFontMetrics, QPixmap
 from utils import messages
-from utils.map_dialog import MapDialog
 from utils.exif_utils import *
+from utils.batch_editor import BatchEditor, EditSpec
+from utils.batch_worker import BatchEditWorker, FolderScanWorker
+from utils.catalog import Catalog, get_catalog, parse_file
+from utils.folder_scanner import FolderScanner
+from utils.geotag import GeotagSpec, TrackIndex
+from utils.time_shift import TimeShiftSpec, parse_time_shift
+from utils.library_watcher import LibraryWatcher
+from utils.thumbnail_browser import ThumbnailBrowser
 
 class ButtonEvents:
     @staticmethod
@@ -25,7 +32,6 @@ class ButtonEvents:
             window.append_text_to_browser(messages.FILE_LOADING) # 显示加载状态
             image_path, _ = QFileDialog.getOpenFileName(window, "选择图片", "", "Images (*.jpg *.jpeg *.png *.heic)")
             if image_path:  # 成功加载
-                window.original_file_path = image_path  # 保存原始路径
                 window.append_text_to_browser(messages.FILE_SUCCESS.format(image_path=image_path))
             elif image_path=="":    # 用户取消
                 window.append_text_to_browser(messages.FILE_CANCELLED)
@@ -33,31 +39,104 @@ class ButtonEvents:
             else: # 加载失败
                 window.append_text_to_browser(messages.FILE_FAILURE)
                 return
-            
-           # 加载图片并设置到 QGraphicsView
-            scene = load_image_to_graphics_view(window, image_path)
-            if not scene:   #图片显示失败
-                window.append_text_browser(messages.IMAGE_SHOW_FAILURE)
-                return
-            
-            #预览框显示
-            display_image_in_view(window.ui.graphicsView_2, scene)
 
-            #图片视图显示
-            display_image_in_view(window.ui.graphicsView, scene)
-            
-            # 绑定EXIF信息
-            info = parse_exif_info(window, image_path)
-            window.ui.lineEdit.setText(info.get("FileName"))
-            window.ui.label_3.setText(info.get("FilePath"))
-            window.ui.dateTimeEdit.setDateTime(info.get("DateTime"))
-            window.ui.label_4.setText(info.get("LocationName", "未知位置"))
-            window.original_gps_coords = info.get("Location", "无 GPS 数据")
-            window.ui.textEdit.setPlainText(info.get("Note", ""))
+            ButtonEvents.open_image(window, image_path)
 
         except Exception as e:
             window.append_text_to_browser(messages.EXIF_ERROR.format(e=e))
 
+    @staticmethod
+    def open_image(window, image_path):
+        """打开图片：重置上一张图片的信息，并在后台加载预览、EXIF 和地名"""
+        window.original_file_path = image_path  # 保存原始路径
+        window.original_gps_coords = "无 GPS 数据"
+        window.image_loader.load(image_path, ButtonEvents.preview_size(window))
+        if window.current_page_index == 1:
+            window.image_loader.request_full_image()
+
+    @staticmethod
+    def preview_size(window):
+        """预览框的物理像素大小"""
+        view = window.ui.graphicsView_2
+        ratio = view.devicePixelRatioF()
+        size = view.viewport().size()
+        return QSize(max(1, int(size.width() * ratio)), max(1, int(size.height() * ratio)))
+
+    @staticmethod
+    def show_thumbnail(window, generation, image):
+        """EXIF 内嵌缩略图读取完成，在预览解码完成前先显示到预览框"""
+        if not window.image_loader.is_current(generation):
+            return
+        if getattr(window, 'preview_generation', None) == generation:
+            return  # 预览已经显示
+        scene = QGraphicsScene()
+        scene.addPixmap(QPixmap.fromImage(image))
+        display_image_in_view(window.ui.graphicsView_2, scene)
+
+    @staticmethod
+    def show_preview(window, generation, image):
+        """后台预览解码完成，显示到预览框，完整分辨率图像到达前图片视图也先显示预览"""
+        if not window.image_loader.is_current(generation):
+            return
+        window.preview_generation = generation
+        scene = QGraphicsScene()
+        scene.addPixmap(QPixmap.fromImage(image))
+
+        #预览框显示
+        display_image_in_view(window.ui.graphicsView_2, scene)
+
+        #图片视图显示
+        if getattr(window, 'full_image_generation', None) != generation:
+            display_image_in_view(window.ui.graphicsView, scene)
+
+    @staticmethod
+    def show_full_image(window, generation, image):
+        """完整分辨率图像解码完成，显示到图片视图"""
+        if not window.image_loader.is_current(generation):
+            return
+        window.full_image_generation = generation
+        scene = QGraphicsScene()
+        scene.addPixmap(QPixmap.fromImage(image))
+        display_image_in_view(window.ui.graphicsView, scene)
+
+    @staticmethod
+    def show_exif_info(window, generation, info):
+        """后台 EXIF 读取完成，绑定到编辑控件"""
+        if not window.image_loader.is_current(generation):
+            return
+        if info["ExifEmpty"]:
+            window.append_text_to_browser(messages.EXIF_EMPTY)
+        window.ui.lineEdit.setText(info.get("FileName"))
+        window.ui.label_3.setText(info.get("FilePath"))
+        window.ui.dateTimeEdit.setDateTime(to_qdatetime(info.get("DateTime")))
+        if "LocationName" in info:
+            window.ui.label_4.setText(info["LocationName"])  # 元数据目录中已有地名
+        elif info["Latitude"] is not None:
+            window.ui.label_4.setText(messages.LOCATION_RESOLVING)
+        else:
+            window.ui.label_4.setText("未知位置")
+        window.original_gps_coords = info.get("Location", "无 GPS 数据")
+        window.ui.textEdit.setPlainText(info.get("Note", ""))
+
+    @staticmethod
+    def show_location(window, generation, location_name):
+        """后台地名解析完成"""
+        if not window.image_loader.is_current(generation):
+            return
+        window.ui.label_4.setText(location_name)
+
+    @staticmethod
+    def show_load_error(window, generation, stage, error):
+        """后台加载阶段失败"""
+        if not window.image_loader.is_current(generation):
+            return
+        if stage == "thumbnail":
+            return  # 没有内嵌缩略图时等待预览解码即可
+        if stage == "preview":
+            window.append_text_to_browser(messages.IMAGE_SHOW_FAILURE)
+        else:
+            window.append_text_to_browser(messages.EXIF_ERROR.format(e=error))
+
     @staticmethod
     def select_dest(window):
         """选择导出目录"""
@@ -72,6 +151,7 @@ class ButtonEvents:
             if window.current_page_index == 0:
                 window.ui.stackedWidget.setCurrentIndex(1)
                 window.current_page_index = 1
+                window.image_loader.request_full_image()  # 图片视图需要完整分辨率
                 window.ui.pushButton_6.setIcon(QIcon(":/icons/视图菜单_空心@1x.png"))  # 更新按钮图标为空心图标
                 window.append_text_to_browser(messages.VIEW_PHOTO)                                               
             else:
@@ -91,46 +171,74 @@ class ButtonEvents:
             return
         else: 
             try:
-                window.map_dialog = MapDialog(window)
-                # 连接对话框的信号到更新 GPS 的槽
-                window.map_dialog.coordinates_selected.connect(
-                    lambda lon, lat: ButtonEvents.update_gps_input(window, lon, lat)
-                )
-                window.map_dialog.exec_()
+                dialog = ButtonEvents.get_map_dialog(window)
+                coords = ButtonEvents.current_gps_coords(window)
+                if coords is None:
+                    dialog.show_position()
+                else:
+                    dialog.show_position(coords[1], coords[0])
+                dialog.exec_()
                 window.append_text_to_browser(messages.POSITION_SELECTED.format(position = window.original_position_coords))
 
             except Exception as e:
                 window.append_text_to_browser(messages.GPS_ERROR.format(e=e))
 
 
-    def update_gps_input(window, lon, lat):
-        """更新GPS输入框，显示地名"""
+    def get_map_dialog(window):
+        """获取窗口共用的地图选点对话框，第一次调用时创建（地图页面随即开始在后台加载）"""
+        if getattr(window, 'map_dialog', None) is None:
+            # QtWebEngine（Chromium）启动较慢，第一次使用地图时才导入
+            from utils.map_dialog import MapDialog
+            window.map_dialog = MapDialog(window)
+            # 连接对话框的信号到更新 GPS 的槽
+            window.map_dialog.coordinates_selected.connect(
+                lambda lon, lat: ButtonEvents.update_gps_input(window, lon, lat)
+            )
+        return window.map_dialog
 
-        # 将经纬度转换为地名
+    def prewarm_map_dialog(window):
+        """启动后空闲时预先创建地图对话框，第一次打开地图时不必等待 WebEngine 启动和地图脚本下载"""
         try:
-            location = window.geolocator.reverse((lat, lon), language="ch")
-            if location:
-                # 解析 location.raw 并重新拼接格式
-                address_components = location.raw.get("address", {})
-                # country = address_components.get("country", "")
-                state = address_components.get("state", "")
-                city = address_components.get("city", address_components.get("town", ""))
-                suburb = address_components.get("suburb", "")
-                road = address_components.get("road", "")
-                house_number = address_components.get("house_number", "")
-
-                # 重新拼接格式
-                address = f"{state}, {city}, {suburb}, {road} {house_number}".strip(", ").replace(" ,", ",")
-            else:
-                address = "未知位置"
+            ButtonEvents.get_map_dialog(window)
         except Exception as e:
-            address = "地名获取失败"
+            print(f"地图预加载失败：{e}")
+
+    def current_gps_coords(window):
+        """
+        当前照片的坐标。
+
+        返回：
+            tuple: (纬度, 经度)，没有 GPS 数据时返回 None。
+        """
+        try:
+            lat, lon = map(float, window.original_gps_coords.split(', '))
+        except (AttributeError, ValueError):
+            return None
+        return lat, lon
+
+    def update_gps_input(window, lon, lat):
+        """更新GPS输入框：先显示坐标，地名在后台解析完成后再显示"""
 
         # 更新 GPS 坐标
-        window.original_gps_coords = f"{lon}, {lat}"
+        window.original_gps_coords = f"{lat}, {lon}"  # 与 EXIF 的 Location 相同，纬度在前
+        ButtonEvents.show_position_name(window, f"{lat:.6f}, {lon:.6f}")
+        window.image_loader.resolve_picked_location(lat, lon)
 
+    @staticmethod
+    def show_picked_location(window, generation, result):
+        """地图选点的地名解析完成，期间又选了其他位置或打开了其他图片时忽略"""
+        latitude, longitude, address = result
+        if not window.image_loader.is_current(generation):
+            return
+        if ButtonEvents.current_gps_coords(window) != (latitude, longitude):
+            return
+        ButtonEvents.show_position_name(window, address)
+
+    def show_position_name(window, address):
+        """在搜索框和地点标签中显示选定位置的名称"""
         # 更新到 search_bar，显示完整地址
-        window.map_dialog.search_bar.setText(f"{address}")
+        if getattr(window, 'map_dialog', None) is not None:
+            window.map_dialog.search_bar.setText(f"{address}")
 
         # 更新到 label_4，限制显示长度
         label = window.ui.label_4
@@ -146,6 +254,8 @@ class ButtonEvents:
 
     def check_network():
         """检查网络连接"""
+        import requests
+
         try:
             response = requests.get('https://www.aliyundrive.com', timeout=5)
             return response.status_code == 200
@@ -174,9 +284,15 @@ class ButtonEvents:
                 gps_coords = window.original_gps_coords
                 note = window.ui.textEdit.toPlainText()
 
-                # 修改 Exif 信息
-                img = convert_image_format(image_path)
-                exif_bytes = set_photo_date_and_gps(img, date, gps_coords, note)
+                # JPEG 和 HEIC 可以直接覆盖原文件，不再另存一份
+                if is_jpeg(image_path) or is_heif(image_path):
+                    mode = ButtonEvents.ask_overwrite(window)
+                    if mode is None:
+                        window.append_text_to_browser(messages.SAVE_CANCELLED)
+                        return
+                    if mode:
+                        ButtonEvents.save_in_place(window, image_path, date, gps_coords, note)
+                        return
 
                 #选择导出目录
                 dest_dir = ButtonEvents.select_dest(window)
@@ -196,16 +312,328 @@ class ButtonEvents:
                 # 判断用户选择
                 if save_confirm == QMessageBox.Yes:
                     # 执行保存操作
-                    dest_path = os.path.join(dest_dir, os.path.splitext(file_name)[0] + '.jpg')
+                    dest_path = os.path.join(dest_dir, os.path.splitext(file_name)[0] + output_extension(image_path))
 
-                    # 保存图片并应用修改后的EXIF数据
-                    img.save(dest_path, "jpeg", exif=exif_bytes, quality=100)
+                    # 保存图片并应用修改后的EXIF数据（JPEG 源文件只替换 EXIF 段）
+                    save_image_with_exif(image_path, dest_path, date, gps_coords, note)
                     window.append_text_to_browser(messages.SAVE_SUCCESS.format(path=dest_path))
                 else:
                     window.append_text_to_browser(messages.SAVE_CANCELLED)
             except Exception as e:
                 window.append_text_to_browser(messages.SAVE_ERROR.format(e=e))
 
+    def ask_overwrite(window, count=None):
+        """
+        询问覆盖原文件还是导出到其他目录。
+
+        返回：
+            bool: True 为覆盖原文件，False 为导出；取消时返回 None。
+        """
+        target = "原文件" if count is None else f"{count} 个原文件"
+        box = QMessageBox(QMessageBox.Question, "保存方式", f"覆盖{target}，还是导出到其他目录？\n（覆盖只支持 JPEG 和 HEIC）",
+                          parent=window)
+        overwrite_button = box.addButton("覆盖", QMessageBox.AcceptRole)
+        export_button = box.addButton("导出", QMessageBox.ActionRole)
+        box.addButton(QMessageBox.Cancel)
+        box.exec_()
+        if box.clickedButton() == overwrite_button:
+            return True
+        if box.clickedButton() == export_button:
+            return False
+        return None
+
+    def select_output(window, count):
+        """
+        批量处理选择输出方式。
+
+        返回：
+            tuple: (是否继续, 导出目录)；覆盖原文件时导出目录为 None。
+        """
+        overwrite = ButtonEvents.ask_overwrite(window, count)
+        if overwrite is None:
+            window.append_text_to_browser(messages.SAVE_CANCELLED)
+            return False, None
+        if overwrite:
+            return True, None
+        dest_dir = ButtonEvents.select_dest(window)
+        if not dest_dir:
+            QMessageBox.warning(window, "警告", "未选择导出目录！")
+            return False, None
+        return True, dest_dir
+
+    def select_batch_fields(window, count):
+        """
+        选择批量编辑要写入的字段。日期默认不勾选，避免一次覆盖所有文件的拍摄日期；
+        当前没有 GPS 坐标或备注时对应字段不可选。
+
+        返回：
+            EditSpec: 未勾选的字段为 None（保留原值）；取消或没有勾选任何字段时返回 None。
+        """
+        date = window.ui.dateTimeEdit.dateTime().toPyDateTime()
+        gps_coords = getattr(window, 'original_gps_coords', None)
+        if gps_coords == "无 GPS 数据":
+            gps_coords = None
+        note = window.ui.textEdit.toPlainText()
+
+        dialog = QDialog(window)
+        dialog.setWindowTitle("批量编辑")
+        layout = QVBoxLayout(dialog)
+        layout.addWidget(QLabel(f"选择要写入 {count} 个文件的内容，未勾选的内容保留每个文件的原值："))
+        date_box = QCheckBox(f"拍摄日期：{date:%Y-%m-%d %H:%M:%S}（覆盖所有文件的拍摄日期）")
+        gps_box = QCheckBox(f"拍摄地点：{gps_coords}" if gps_coords else "拍摄地点：无 GPS 数据")
+        gps_box.setEnabled(bool(gps_coords))
+        gps_box.setChecked(bool(gps_coords))
+        note_box = QCheckBox(f"备注：{note}" if note else "备注：无")
+        note_box.setEnabled(bool(note))
+        note_box.setChecked(bool(note))
+        for box in (date_box, gps_box, note_box):
+            layout.addWidget(box)
+        buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
+        buttons.accepted.connect(dialog.accept)
+        buttons.rejected.connect(dialog.reject)
+        layout.addWidget(buttons)
+        if dialog.exec_() != QDialog.Accepted:
+            return None
+        if not (date_box.isChecked() or gps_box.isChecked() or note_box.isChecked()):
+            QMessageBox.warning(window, "警告", "未选择要写入的内容！")
+            return None
+        return EditSpec(
+            date=date if date_box.isChecked() else None,
+            gps_coords=gps_coords if gps_box.isChecked() else None,
+            note=note if note_box.isChecked() else None,
+        )
+
+    def batch_editor(spec, dest_dir):
+        """创建批量编辑器，覆盖原文件时刷到磁盘并刷新元数据目录"""
+        if dest_dir is None:
+            return BatchEditor(spec, None, fsync=True, catalog=get_catalog())
+        return BatchEditor(spec, dest_dir)
+
+    def save_in_place(window, image_path, date, gps_coords, note):
+        """原地修改 JPEG/HEIC 的 EXIF：写入临时文件、刷到磁盘后替换原文件，保留权限和修改时间"""
+        save_image_with_exif(image_path, None, date, gps_coords, note, fsync=True)
+        # 修改时间被保留，元数据目录无法自行发现变化
+        catalog = get_catalog()
+        if catalog is not None:
+            catalog.store(image_path, parse_file(image_path))
+        window.append_text_to_browser(messages.SAVE_SUCCESS.format(path=image_path))
+
+    def batch_edit(window):
+        """批量修改多个文件的 Exif 信息，处理过程中再次点击则取消"""
+        worker = getattr(window, 'batch_worker', None)
+        if worker is not None and worker.is_running():
+            worker.cancel()
+            window.append_text_to_browser(messages.BATCH_CANCELLING)
+            return
+
+        try:
+            image_paths, _ = QFileDialog.getOpenFileNames(window, "选择图片", "", "Images (*.jpg *.jpeg *.png *.heic)")
+            if not image_paths:
+                window.append_text_to_browser(messages.FILE_CANCELLED)
+                return
+
+            # 使用编辑区当前的内容作为批量编辑内容，只写入用户勾选的字段，其余字段保留每个文件的原值
+            spec = ButtonEvents.select_batch_fields(window, len(image_paths))
+            if spec is None:
+                window.append_text_to_browser(messages.SAVE_CANCELLED)
+                return
+
+            #选择覆盖原文件或导出目录
+            ok, dest_dir = ButtonEvents.select_output(window, len(image_paths))
+            if not ok:
+                return
+
+            fields = [name for name, value in (("日期", spec.date), ("地点", spec.gps_coords), ("备注", spec.note))
+                      if value is not None]
+            save_confirm = QMessageBox.question(
+                window,
+                "确认保存",
+                f"是否将当前{'、'.join(fields)}写入 {len(image_paths)} 个文件？",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.Yes
+            )
+            if save_confirm != QMessageBox.Yes:
+                window.append_text_to_browser(messages.SAVE_CANCELLED)
+                return
+
+            ButtonEvents.start_batch(window, ButtonEvents.batch_editor(spec, dest_dir), image_paths)
+        except Exception as e:
+            window.append_text_to_browser(messages.SAVE_ERROR.format(e=e))
+
+    def start_batch(window, editor, image_paths):
+        """在后台运行批量编辑，并把进度输出到日志"""
+        worker = BatchEditWorker(editor, image_paths, window)
+        worker.progress.connect(lambda done, total: window.append_text_to_browser(
+            messages.BATCH_PROGRESS.format(done=done, total=total)))
+        worker.file_failed.connect(lambda path, e: window.append_text_to_browser(
+            messages.BATCH_FILE_ERROR.format(path=path, e=e)))
+        worker.error.connect(lambda e: window.append_text_to_browser(messages.BATCH_ERROR.format(e=e)))
+        worker.finished.connect(lambda ok, failed, cancelled: window.append_text_to_browser(
+            (messages.BATCH_CANCELLED if cancelled else messages.BATCH_FINISHED).format(ok=ok, failed=failed)))
+        window.batch_worker = worker
+        window.append_text_to_browser(messages.BATCH_START.format(total=len(image_paths)))
+        worker.start()
+
+    def shift_time(window):
+        """把多张照片的拍摄时间平移同一偏移量（修正相机时钟误差），处理过程中再次点击则取消"""
+        worker = getattr(window, 'batch_worker', None)
+        if worker is not None and worker.is_running():
+            worker.cancel()
+            window.append_text_to_browser(messages.BATCH_CANCELLING)
+            return
+
+        try:
+            image_paths, _ = QFileDialog.getOpenFileNames(window, "选择图片", "", "Images (*.jpg *.jpeg *.png *.heic)")
+            if not image_paths:
+                window.append_text_to_browser(messages.FILE_CANCELLED)
+                return
+
+            text, ok = QInputDialog.getText(window, "平移拍摄时间", "时间偏移（如 +1d2h、-30s、-0:05:00）：")
+            if not ok or not text.strip():
+                window.append_text_to_browser(messages.SAVE_CANCELLED)
+                return
+            delta = parse_time_shift(text)
+
+            ok, dest_dir = ButtonEvents.select_output(window, len(image_paths))
+            if not ok:
+                return
+
+            ButtonEvents.start_batch(window, ButtonEvents.batch_editor(TimeShiftSpec(delta), dest_dir), image_paths)
+        except Exception as e:
+            window.append_text_to_browser(messages.SAVE_ERROR.format(e=e))
+
+    def geotag_photos(window):
+        """按 GPX 轨迹为多张照片写入 GPS 坐标，处理过程中再次点击则取消"""
+        worker = getattr(window, 'batch_worker', None)
+        if worker is not None and worker.is_running():
+            worker.cancel()
+            window.append_text_to_browser(messages.BATCH_CANCELLING)
+            return
+
+        try:
+            gpx_paths, _ = QFileDialog.getOpenFileNames(window, "选择 GPX 轨迹", "", "GPX (*.gpx)")
+            if not gpx_paths:
+                window.append_text_to_browser(messages.FILE_CANCELLED)
+                return
+            track = TrackIndex.from_gpx(gpx_paths)
+            if not len(track):
+                window.append_text_to_browser(messages.GEOTAG_NO_POINTS)
+                return
+            window.append_text_to_browser(messages.GEOTAG_TRACK_LOADED.format(count=len(track)))
+
+            image_paths, _ = QFileDialog.getOpenFileNames(window, "选择图片", "", "Images (*.jpg *.jpeg *.png *.heic)")
+            if not image_paths:
+                window.append_text_to_browser(messages.FILE_CANCELLED)
+                return
+
+            # 照片没有 OffsetTimeOriginal 时使用的相机时区，默认为本机时区
+            local_offset = datetime.now().astimezone().utcoffset().total_seconds() / 3600
+            tz_hours, ok = QInputDialog.getDouble(window, "相机时区", "相机时钟所在时区（UTC+小时）：",
+                                                  local_offset, -12, 14, 2)
+            if not ok:
+                window.append_text_to_browser(messages.SAVE_CANCELLED)
+                return
+            clock_offset, ok = QInputDialog.getInt(window, "相机时钟误差", "相机时钟比 GPS 时间快的秒数（慢为负）：",
+                                                   0, -86400 * 365, 86400 * 365)
+            if not ok:
+                window.append_text_to_browser(messages.SAVE_CANCELLED)
+                return
+
+            ok, dest_dir = ButtonEvents.select_output(window, len(image_paths))
+            if not ok:
+                return
+
+            spec = GeotagSpec(track, utc_offset=timedelta(hours=tz_hours), clock_offset=clock_offset)
+            ButtonEvents.start_batch(window, ButtonEvents.batch_editor(spec, dest_dir), image_paths)
+        except Exception as e:
+            window.append_text_to_browser(messages.GPS_ERROR.format(e=e))
+
+    def scan_folder(window):
+        """选择文件夹并递归导入到元数据目录，扫描过程中再次点击则取消"""
+        worker = getattr(window, 'scan_worker', None)
+        if worker is not None and worker.is_running():
+            worker.cancel()
+            window.append_text_to_browser(messages.SCAN_CANCELLING)
+            return
+
+        try:
+            root = QFileDialog.getExistingDirectory(window, "选择图片文件夹")
+            if not root:
+                window.append_text_to_browser(messages.FILE_CANCELLED)
+                return
+            catalog = get_catalog()
+            if catalog is None:
+                window.append_text_to_browser(messages.CATALOG_ERROR)
+                return
+
+            worker = FolderScanWorker(FolderScanner(catalog), root, window)
+            worker.progress.connect(lambda stats: window.append_text_to_browser(
+                messages.SCAN_PROGRESS.format(stats=stats)))
+            worker.error.connect(lambda e: window.append_text_to_browser(messages.SCAN_ERROR.format(e=e)))
+            worker.finished.connect(lambda stats: ButtonEvents.scan_finished(window, worker, root, stats))
+            window.scan_worker = worker
+            window.append_text_to_browser(messages.SCAN_START.format(path=root))
+            worker.start()
+        except Exception as e:
+            window.append_text_to_browser(messages.EXIF_ERROR.format(e=e))
+
+    def scan_finished(window, worker, root, stats):
+        """导入结束：完整导入后监视该目录，之后只同步变化的文件；导入中断时不监视"""
+        if worker.last_error is not None:
+            window.append_text_to_browser(messages.SCAN_INTERRUPTED.format(stats=stats))
+            return
+        window.append_text_to_browser(messages.SCAN_FINISHED.format(stats=stats))
+        ButtonEvents.watch_library(window, root)
+
+    def watch_library(window, root):
+        """监视已导入的目录"""
+        if getattr(window, 'library_watcher', None) is None:
+            window.library_watcher = LibraryWatcher(get_catalog(), window)
+            window.library_watcher.changed.connect(
+                lambda added, modified, removed: ButtonEvents.on_library_changed(window, added, modified, removed))
+        window.library_watcher.watch(root)
+        window.append_text_to_browser(messages.LIBRARY_WATCHING.format(path=root))
+
+    def browse_folder(window):
+        """以缩略图网格浏览文件夹，默认打开当前图片所在的文件夹"""
+        try:
+            if hasattr(window, 'original_file_path'):
+                directory = os.path.dirname(window.original_file_path)
+            else:
+                directory = QFileDialog.getExistingDirectory(window, "选择图片文件夹")
+                if not directory:
+                    window.append_text_to_browser(messages.FILE_CANCELLED)
+                    return
+
+            if getattr(window, 'thumbnail_browser', None) is None:
+                window.thumbnail_browser = ThumbnailBrowser(window)
+                window.thumbnail_browser.image_selected.connect(
+                    lambda image_path: ButtonEvents.open_image(window, image_path))
+            browser = window.thumbnail_browser
+            if browser.model.directory != directory:
+                browser.set_directory(directory)
+            browser.show()
+            browser.raise_()
+            window.append_text_to_browser(messages.BROWSE_FOLDER.format(path=directory))
+        except Exception as e:
+            window.append_text_to_browser(messages.EXIF_ERROR.format(e=e))
+
+    def on_library_changed(window, added, modified, removed):
+        """已导入目录中的文件发生变化，刷新当前打开的图片和缩略图浏览窗口"""
+        window.append_text_to_browser(messages.LIBRARY_CHANGED.format(
+            added=len(added), modified=len(modified), removed=len(removed)))
+        if getattr(window, 'thumbnail_browser', None) is not None:
+            window.thumbnail_browser.model.apply_changes(added, modified, removed)
+        if not hasattr(window, 'original_file_path'):
+            return
+        current = Catalog.normalize_path(window.original_file_path)
+        if current in (Catalog.normalize_path(p) for p in modified):
+            window.image_loader.load(window.original_file_path, ButtonEvents.preview_size(window))
+            if window.current_page_index == 1:
+                window.image_loader.request_full_image()
+        elif current in removed:
+            window.append_text_to_browser(messages.CURRENT_FILE_REMOVED)
+
     # def open_aliyun_drive(window):
     #         """尝试自动查找并打开本地阿里云盘客户端或跳转到网页"""
     #         aliyun_drive_path = ButtonEvents.find_aliyun_drive_path()
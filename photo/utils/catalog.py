@@ -0,0 +1,276 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.app_paths import get_cache_dir
+from utils.exif_core import display_dir, read_exif_info, read_image_size
+
+_COLUMNS = (
+    "path", "size", "mtime_ns", "file_name", "directory", "date_time",
+    "latitude", "longitude", "location_name", "note", "width", "height",
+    "exif_empty", "indexed_at",
+)
+
+
+class Catalog:
+    """
+    基于 SQLite 的图片元数据目录。
+
+    每个文件以路径为键，保存提取出的 EXIF 字段，并记录文件大小和修改时间；
+    查询时两者与磁盘上的文件不一致即视为过期，需要重新解析。
+    """
+
+    def __init__(self, db_path=None):
+        if db_path is None:
+            db_path = os.path.join(get_cache_dir(), "catalog.sqlite3")
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        # 连接在多个线程之间共享，由锁保证串行访问
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS photos ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " file_name TEXT NOT NULL,"
+            " directory TEXT NOT NULL,"
+            " date_time TEXT,"
+            " latitude REAL,"
+            " longitude REAL,"
+            " location_name TEXT,"
+            " note TEXT,"
+            " width INTEGER,"
+            " height INTEGER,"
+            " exif_empty INTEGER NOT NULL DEFAULT 0,"
+            " indexed_at REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS photos_directory ON photos (directory)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS photos_date_time ON photos (date_time)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS photos_location ON photos (latitude, longitude)")
+        self._conn.commit()
+
+    @staticmethod
+    def normalize_path(image_path):
+        """目录中统一使用绝对路径作为键"""
+        return os.path.normcase(os.path.abspath(image_path))
+
+    def lookup(self, image_path, stat=None):
+        """
+        查询文件的元数据。
+
+        参数：
+            image_path (str): 图片的文件路径。
+            stat (os.stat_result, 可选): 已获取的文件状态，避免重复 stat。
+
+        返回：
+            dict: 与 read_exif_info 相同格式的信息（另含 Width/Height，有缓存地名时含 LocationName）；
+            目录中没有记录或文件已变化时返回 None。
+        """
+        if stat is None:
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                return None
+        key = self.normalize_path(image_path)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM photos WHERE path = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(zip(_COLUMNS, row))
+        if record["size"] != stat.st_size or record["mtime_ns"] != stat.st_mtime_ns:
+            return None
+        return self._record_to_info(image_path, record)
+
+    @staticmethod
+    def _record_to_info(image_path, record):
+        """把数据库记录转换为 read_exif_info 格式"""
+        latitude, longitude = record["latitude"], record["longitude"]
+        info = {
+            "FileName": os.path.basename(image_path),
+            "FilePath": display_dir(image_path),
+            "ExifEmpty": bool(record["exif_empty"]),
+            "DateTime": record["date_time"] or "",
+            "Location": f"{latitude}, {longitude}" if latitude is not None else "无 GPS 数据",
+            "Latitude": latitude,
+            "Longitude": longitude,
+            "Note": record["note"] or "",
+            "Width": record["width"],
+            "Height": record["height"],
+        }
+        if record["location_name"]:
+            info["LocationName"] = record["location_name"]
+        return info
+
+    @staticmethod
+    def make_record(image_path, info, stat):
+        """由 read_exif_info 的结果生成数据库记录"""
+        return (
+            Catalog.normalize_path(image_path),
+            stat.st_size,
+            stat.st_mtime_ns,
+            os.path.basename(image_path),
+            os.path.normcase(os.path.dirname(os.path.abspath(image_path))),
+            info.get("DateTime") or None,
+            info.get("Latitude"),
+            info.get("Longitude"),
+            info.get("LocationName"),
+            info.get("Note") or None,
+            info.get("Width"),
+            info.get("Height"),
+            1 if info.get("ExifEmpty") else 0,
+            time.time(),
+        )
+
+    def store_records(self, records):
+        """在一个事务中写入多条记录"""
+        placeholders = ", ".join("?" * len(_COLUMNS))
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO photos ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                    records,
+                )
+
+    def store(self, image_path, info, stat=None):
+        """写入单个文件的元数据"""
+        if stat is None:
+            stat = os.stat(image_path)
+        self.store_records([self.make_record(image_path, info, stat)])
+
+    def set_location_name(self, image_path, location_name):
+        """记录解析出的地名"""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE photos SET location_name = ? WHERE path = ?",
+                    (location_name, self.normalize_path(image_path)),
+                )
+
+    def remove(self, paths):
+        """删除多个文件的记录"""
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    "DELETE FROM photos WHERE path = ?",
+                    [(self.normalize_path(p),) for p in paths],
+                )
+
+    def file_states(self, root):
+        """
+        获取目录（含子目录）下所有记录的文件状态，用于扫描时跳过未变化的文件。
+
+        返回：
+            dict: {规范化路径: (大小, 修改时间)}。
+        """
+        prefix = os.path.join(self.normalize_path(root), "")
+        with self._lock:
+            # 按主键范围查询，可以使用索引
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM photos WHERE path >= ? AND path < ?",
+                (prefix, prefix + "\U0010ffff"),
+            ).fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def directory_states(self, directory):
+        """
+        获取单个目录（不含子目录）下所有记录的文件状态。
+
+        返回：
+            dict: {规范化路径: (大小, 修改时间)}。
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM photos WHERE directory = ?",
+                (self.normalize_path(directory),),
+            ).fetchall()
+        return {path: (size, mtime_ns) for path, size, mtime_ns in rows}
+
+    def get_or_parse(self, image_path):
+        """
+        优先从目录中获取元数据，没有或已过期时解析文件并写入目录。
+
+        返回：
+            dict: 与 read_exif_info 相同格式的信息。
+        """
+        stat = os.stat(image_path)
+        info = self.lookup(image_path, stat)
+        if info is not None:
+            return info
+        info = parse_file(image_path)
+        self.store(image_path, info, stat)
+        return info
+
+    def query(self, directory=None, date_from=None, date_to=None, bbox=None, text=None, limit=None):
+        """
+        按条件查询目录。
+
+        参数：
+            directory (str, 可选): 只返回该目录（不含子目录）中的文件。
+            date_from/date_to (str, 可选): "yyyy:MM:dd hh:mm:ss" 格式的拍摄日期范围。
+            bbox (tuple, 可选): (最小纬度, 最小经度, 最大纬度, 最大经度)。
+            text (str, 可选): 在文件名、地名和备注中搜索。
+            limit (int, 可选): 最多返回的条数。
+
+        返回：
+            list: 每个元素为 {列名: 值} 字典，按拍摄日期排序。
+        """
+        conditions, params = [], []
+        if directory is not None:
+            conditions.append("directory = ?")
+            params.append(os.path.normcase(os.path.abspath(directory)))
+        if date_from is not None:
+            conditions.append("date_time >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            conditions.append("date_time <= ?")
+            params.append(date_to)
+        if bbox is not None:
+            conditions.append("latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?")
+            params.extend((bbox[0], bbox[2], bbox[1], bbox[3]))
+        if text:
+            conditions.append("(file_name LIKE ? OR location_name LIKE ? OR note LIKE ?)")
+            params.extend([f"%{text}%"] * 3)
+
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM photos"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY date_time, path"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def parse_file(image_path):
+    """解析单个文件需要写入目录的信息（只读取文件头）"""
+    info = read_exif_info(image_path)
+    info["Width"], info["Height"] = read_image_size(image_path)
+    return info
+
+
+_default_catalog = None
+_default_lock = threading.Lock()
+
+
+def get_catalog():
+    """获取全局共享的元数据目录，无法打开数据库时返回 None"""
+    global _default_catalog
+    with _default_lock:
+        if _default_catalog is None:
+            try:
+                _default_catalog = Catalog()
+            except Exception as e:
+                print(f"元数据目录不可用：{e}")
+                return None
+        return _default_catalog
@@ -0,0 +1,502 @@
+import os
+
+import piexif
+
+from utils.atomic_file import atomic_write
+from utils.geocoding import get_reverse_geocoder
+from utils.heif_exif import is_heif, read_heif_exif, read_heif_size, write_heif_exif
+from utils.jpeg_exif import is_jpeg, read_jpeg_exif, read_jpeg_size, write_jpeg_exif
+
+# 本模块不依赖 Qt，可供命令行和后台进程直接使用；
+# Pillow 和 pillow_heif 只在需要处理像素时才导入，以缩短命令行启动时间
+
+# HEIC 无法原位修改元数据、需要重新编码时使用的质量
+HEIF_QUALITY = 90
+# 重新编码是有损的，默认不做；设置 EXIF_EDITOR_HEIF_REENCODE=1 后，导出无法直接修改元数据的 HEIC 时才重新编码
+HEIF_REENCODE_ENV = "EXIF_EDITOR_HEIF_REENCODE"
+
+def set_photo_date_and_gps(img, date, gps_coords=None, note=""):
+    """
+    修改图片的日期和GPS信息。
+    
+    参数：
+        image_path (str): 图片文件路径（支持JPEG和HEIC格式）。
+        date (datetime): 新的日期时间对象。
+        gps_coords (str, 可选): GPS坐标字符串，格式为 "纬度,经度"（例如 "30.0,120.0"）。
+        need_gps (bool): 是否需要添加GPS信息。
+        note(str): 图片备注。
+
+    异常：
+        如果出现任何错误，抛出异常。
+    """
+
+    exif_dict = get_exif_data(img)
+    return build_exif_bytes(exif_dict, date, gps_coords, note)
+
+
+def build_exif_bytes(exif_dict, date, gps_coords=None, note=""):
+    """
+    在已有的 EXIF 字典上写入日期、GPS 和备注，并转换为字节。
+
+    参数：
+        exif_dict (dict): piexif 格式的 EXIF 字典，会被原地修改。
+        date (datetime): 新的日期时间对象，为 None 时保留原日期。
+        gps_coords (str, 可选): GPS坐标字符串，格式为 "纬度, 经度"。
+        note(str): 图片备注。
+
+    返回：
+        bytes: piexif.dump 生成的 EXIF 数据。
+    """
+    try:
+        # 设置新的日期时间信息
+        if date is not None:
+            date_str = date.strftime("%Y:%m:%d %H:%M:%S")
+            exif_dict['0th'][piexif.ImageIFD.DateTime] = date_str
+            exif_dict['Exif'][piexif.ExifIFD.DateTimeOriginal] = date_str
+            exif_dict['Exif'][piexif.ExifIFD.DateTimeDigitized] = date_str
+
+        # 如果需要更新GPS信息
+        if gps_coords and gps_coords != "无 GPS 数据":
+            # 分割并解析GPS坐标字符串
+            lat, lon = map(float, gps_coords.split(', '))
+            gps_ifd = {
+                piexif.GPSIFD.GPSLatitudeRef: 'N' if lat >= 0 else 'S',
+                piexif.GPSIFD.GPSLatitude: _convert_to_deg_min_sec(abs(lat)),
+                piexif.GPSIFD.GPSLongitudeRef: 'E' if lon >= 0 else 'W',
+                piexif.GPSIFD.GPSLongitude: _convert_to_deg_min_sec(abs(lon)),
+            }
+            exif_dict['GPS'] = gps_ifd  # 添加到EXIF的GPS字段中
+        
+        # 如果备注存在，添加到 EXIF 的 UserComment 字段
+        if note:
+            exif_dict['Exif'][piexif.ExifIFD.UserComment] = note.encode('utf-8')  # 保存备注信息
+        
+        # 转换EXIF字典为字节
+        exif_bytes = piexif.dump(exif_dict)
+        return exif_bytes
+    
+    except Exception as e:
+        # 抛出任何捕获的异常
+        raise e
+    
+
+def convert_heic_to_jpeg(image_path):
+    """
+    解码 HEIC 图片为 Pillow 图像。
+
+    pillow_heif 解码出的缓冲区通过 Image.frombuffer 包装：RGBA 等 Pillow 可以直接映射的模式不复制像素
+    （图像为只读，修改时 Pillow 才会复制）；RGB 在 Pillow 内部按每像素 4 字节存储，只复制一次。
+
+    参数：
+        image_path (str): HEIC文件路径。
+
+    返回：
+        Image: 解码后的 Pillow Image 对象，模式为 pillow_heif 的输出模式（RGB 或 RGBA）。
+    """
+    import pillow_heif
+
+    heif_file = pillow_heif.open_heif(image_path)
+    return _heif_to_pillow(heif_file)
+
+
+def _heif_to_pillow(heif_image):
+    """把 pillow_heif 的图像或缩略图包装为 Pillow 图像（访问 data 时才解码）"""
+    from PIL import Image
+
+    return Image.frombuffer(heif_image.mode, heif_image.size, heif_image.data,
+                            "raw", heif_image.mode, heif_image.stride, 1)
+
+
+def load_heif_preview(image_path, max_size):
+    """
+    按目标尺寸解码 HEIC 预览。
+
+    文件中有不小于目标尺寸的内嵌缩略图（iPhone 照片通常带 320 像素左右的缩略图）时只解码缩略图，
+    否则解码主图像后缩小。
+
+    参数：
+        image_path (str): HEIC 文件路径。
+        max_size (tuple): (宽, 高) 目标尺寸。
+
+    返回：
+        Image: 不超过目标尺寸的 Pillow 图像。
+    """
+    import pillow_heif
+
+    heif_file = pillow_heif.open_heif(image_path)
+    primary = heif_file[heif_file.primary_index]
+    target = max(max_size)
+    best = None
+    for index, thumbnail_size in enumerate(primary.info.get("thumbnails", [])):
+        if thumbnail_size >= target and (best is None or thumbnail_size < best[1]):
+            best = (index, thumbnail_size)
+
+    source = primary.get_thumbnail(best[0]) if best is not None else primary
+    img = _heif_to_pillow(source)
+    img.thumbnail(max_size)
+    return img
+
+
+def _convert_to_deg_min_sec(value):
+    """
+    将GPS坐标的十进制表示转换为度、分、秒的格式。
+
+    参数：
+        value (float): 十进制表示的坐标值。
+
+    返回：
+        list: 转换后的度、分、秒格式（元组表示分子和分母）。
+    """
+    deg = int(value)  # 度
+    min = int((value - deg) * 60)  # 分
+    sec = (value - deg - min / 60) * 3600  # 秒
+    return [(deg, 1), (min, 1), _convert_to_rational(sec)]
+
+
+def _convert_to_rational(number):
+    """
+    将浮点数转换为分数表示。
+
+    参数：
+        number (float): 待转换的数值。
+
+    返回：
+        tuple: 分子和分母的元组表示。
+    """
+    denominator = 1000000  # 固定分母以确保高精度
+    numerator = int(number * denominator)
+    return (numerator, denominator)
+
+# JPEG 编码器可以直接保存的模式
+_JPEG_MODES = ('RGB', 'L', 'CMYK')
+
+
+def convert_image_format(image_path):
+    """
+        通用图片格式转换方法，返回可以直接保存为 JPEG 的图片。
+
+        JPEG 文件原样返回（不解码）；其他格式最多做一次模式转换，转换后立即关闭源图片，
+        同一时刻最多只有源图片和转换结果两份像素数据。
+
+        参数：
+            image_path (str): 输入图片路径（支持 HEIC、JPEG 等格式）。
+            
+        返回：
+            img。
+
+        异常：
+            如果转换失败，抛出异常。
+    """
+    from PIL import Image
+
+    try:
+        # 检查文件格式并处理HEIC文件
+        if image_path.lower().endswith('.heic'):
+            img = convert_heic_to_jpeg(image_path)
+        else:
+            # 打开其他格式的图片（只读取文件头）
+            img = Image.open(image_path)
+            if img.format == 'JPEG':
+                return img
+
+        if img.mode in _JPEG_MODES:
+            img.load()  # 读取像素并关闭文件
+            return img
+
+        # RGBA、调色板等 JPEG 不支持的模式统一转换为 RGB，透明通道被丢弃
+        converted = img.convert('RGB')
+        img.close()
+        return converted
+    
+    except Exception as e:
+        print(f"图片格式转换失败：{e}")
+        raise e
+
+def save_image_with_exif(image_path, dest_path, date, gps_coords=None, note="", fsync=False):
+    """
+    将修改后的 EXIF 信息与图片一起保存到目标路径。
+
+    源文件为 JPEG 时只替换 EXIF 段，HEIC 只替换 Exif 项目，图像数据原样复制；
+    其他格式先转换为 JPEG 再保存。
+
+    参数：
+        image_path (str): 源图片路径。
+        dest_path (str): 输出文件路径（扩展名见 output_extension），为 None 时原地修改源文件。
+        date (datetime): 新的日期时间对象。
+        gps_coords (str, 可选): GPS坐标字符串，格式为 "纬度, 经度"。
+        note(str): 图片备注。
+        fsync (bool): 替换前把新文件刷到磁盘。
+    """
+    rewrite_exif(image_path, dest_path, lambda exif_dict: build_exif_bytes(exif_dict, date, gps_coords, note), fsync)
+
+
+def rewrite_exif(image_path, dest_path, edit, fsync=False):
+    """
+    读取图片的 EXIF 字典，交给 edit 修改后与图片一起保存到目标路径。
+
+    源文件为 JPEG 时只替换 EXIF 段，HEIC 只替换 Exif 项目，图像数据原样复制；其他格式先转换为 JPEG 再保存。
+    新文件总是先写入目标目录下的临时文件再替换，写入中断不会留下不完整的文件。
+
+    参数：
+        image_path (str): 源图片路径。
+        dest_path (str): 输出文件路径，为 None 时原地修改源文件（保留权限和修改时间）。
+        edit (callable): edit(exif_dict)，原地修改 EXIF 字典并返回 piexif.dump 的结果。
+        fsync (bool): 替换前把新文件刷到磁盘。
+
+    异常：
+        ValueError: 原地修改 JPEG 和 HEIC 以外的文件（需要转换格式），或 HEIC 的 Exif 项目无法直接替换
+            （数据存放在 idat 中等，需要重新编码）时抛出；导出时设置了 EXIF_EDITOR_HEIF_REENCODE=1 则改为重新编码。
+    """
+    in_place = dest_path is None
+    target = image_path if in_place else dest_path
+    preserve_from = image_path if in_place else None
+    if is_jpeg(image_path) or is_heif(image_path):
+        try:
+            exif_dict = load_exif_dict(image_path)
+        except Exception:
+            exif_dict = _empty_exif_dict()
+        exif_bytes = edit(exif_dict)
+        if is_jpeg(image_path):
+            write_jpeg_exif(image_path, target, exif_bytes, fsync=fsync, preserve_from=preserve_from)
+            return
+        try:
+            write_heif_exif(image_path, target, exif_bytes, fsync=fsync, preserve_from=preserve_from)
+        except ValueError as e:
+            # 重新编码是有损的，不能覆盖原图；导出到新文件时也只在显式开启后才这样做
+            if in_place:
+                raise ValueError(f"无法直接修改 HEIC 元数据（{e}），请改用导出") from e
+            if os.environ.get(HEIF_REENCODE_ENV) != "1":
+                raise ValueError(f"无法直接修改 HEIC 元数据（{e}），设置 {HEIF_REENCODE_ENV}=1 后可重新编码导出（有损）") from e
+            print(f"无法直接修改 HEIC 元数据（{e}），导出时改为重新编码")
+            _save_heif_with_pillow(image_path, target, exif_bytes, fsync)
+    else:
+        if in_place:
+            raise ValueError("原地修改只支持 JPEG 和 HEIC 文件，其他格式请导出")
+        img = convert_image_format(image_path)
+        exif_bytes = edit(get_exif_data(img))
+        atomic_write(dest_path, lambda tmp_path: img.save(tmp_path, "jpeg", exif=exif_bytes, quality=100), fsync=fsync)
+
+def _save_heif_with_pillow(image_path, dest_path, exif_bytes, fsync=False):
+    """通过 pillow_heif 解码后重新编码 HEIC 并写入 EXIF（有损，仅在导出、无法直接替换 Exif 项目且显式开启时使用）"""
+    import pillow_heif
+
+    heif_file = pillow_heif.open_heif(image_path, convert_hdr_to_8bit=False)
+    atomic_write(dest_path, lambda tmp_path: heif_file.save(tmp_path, exif=exif_bytes, quality=HEIF_QUALITY), fsync=fsync)
+
+
+def output_extension(image_path):
+    """
+    导出文件的扩展名：JPEG 和 HEIC 保持原格式，其他格式转换为 JPEG。
+
+    返回：
+        str: 以 "." 开头的扩展名。
+    """
+    if is_heif(image_path):
+        return os.path.splitext(image_path)[1].lower() or ".heic"
+    return ".jpg"
+
+
+def get_exif_data(img):
+    """
+    获取图片的 EXIF 数据。
+    
+    参数：
+        img (PIL.Image): 打开的 PIL.Image 对象。
+    
+    返回：
+        dict: 图片的 EXIF 数据字典。如果图片没有 EXIF 数据，返回空字典结构。
+    """
+    try:
+        # 尝试加载 EXIF 数据
+        exif_dict = piexif.load(img.info.get('exif', b''))
+        return exif_dict
+    except Exception as e:
+        print(f"EXIF 数据为空, 已自动新建。")
+        # 返回一个空的 EXIF 数据结构
+        return _empty_exif_dict()
+
+
+def _empty_exif_dict():
+    """返回空的 EXIF 数据结构"""
+    return {"0th": {}, "Exif": {}, "GPS": {}, "Interop": {}, "1st": {}, "thumbnail": None}
+
+
+def load_exif_dict(image_path):
+    """
+    直接从文件读取 EXIF 数据字典。
+
+    JPEG 文件只扫描文件头中的 APP1 段，HEIC 只解析 meta 盒中的 Exif 项目，不打开图像；
+    其他格式通过 Pillow 读取。
+
+    参数：
+        image_path (str): 图片的文件路径。
+
+    返回：
+        dict: 图片的 EXIF 数据字典。
+
+    异常：
+        如果文件中没有可解析的 EXIF 数据，抛出异常。
+    """
+    if is_jpeg(image_path) or is_heif(image_path):
+        exif_bytes = read_jpeg_exif(image_path) if is_jpeg(image_path) else read_heif_exif(image_path)
+        if exif_bytes is None:
+            raise ValueError("文件中没有 EXIF 数据")
+        return piexif.load(exif_bytes)
+
+    from PIL import Image
+
+    with Image.open(image_path) as img:
+        return piexif.load(img.info.get('exif', b''))
+
+
+def display_dir(image_path):
+    """返回用于界面显示的存储位置，过长时截断"""
+    file_path = os.path.dirname(image_path)
+    MAX_LENGTH = 30
+    if len(file_path) > MAX_LENGTH:
+        file_path = file_path[:MAX_LENGTH] + "..."  # 截取并加上省略号
+    return file_path
+
+
+def read_image_size(image_path):
+    """
+    只读取文件头获取图片尺寸。
+
+    返回：
+        tuple: (宽, 高)，无法获取时返回 (None, None)。
+    """
+    try:
+        if is_jpeg(image_path):
+            size = read_jpeg_size(image_path)
+            if size is not None:
+                return size
+        elif is_heif(image_path):
+            size = read_heif_size(image_path)
+            if size is not None:
+                return size
+        from PIL import Image
+
+        # Image.open 只解析文件头，不解码像素
+        with Image.open(image_path) as img:
+            return img.size
+    except Exception:
+        return None, None
+
+
+def read_exif_info(image_path):
+    """
+    提取文件名称、存储位置、拍摄日期、GPS 坐标以及备注，不进行地名解析。
+
+    只读取文件头，不依赖界面，可在后台线程中调用。
+
+    参数：
+        image_path (str): 图片的文件路径。
+
+    返回：
+        dict: 提取的必要信息。DateTime 为 "yyyy:MM:dd hh:mm:ss" 格式的字符串（没有时为空字符串），
+        Latitude/Longitude 在没有 GPS 数据时为 None，ExifEmpty 表示 EXIF 数据是否为空。
+    """
+
+    required_info = {}
+
+    # 获取文件名称
+    required_info["FileName"] = os.path.basename(image_path)
+
+    # 获取存储位置
+    required_info["FilePath"] = display_dir(image_path)
+
+    # 打开图片并获取 EXIF 信息
+    try:
+        # 尝试加载 EXIF 数据（JPEG 只读取文件头）
+        exif_data = load_exif_dict(image_path)
+        required_info["ExifEmpty"] = False
+    except Exception as e:
+        exif_data = _empty_exif_dict()
+        required_info["ExifEmpty"] = True
+
+    # 提取拍摄日期
+    try:
+        # EXIF 标签 36867 对应拍摄日期 (DateTimeOriginal)
+        required_info["DateTime"] = exif_data.get("Exif", {}).get(piexif.ExifIFD.DateTimeOriginal, b"").decode()
+    except Exception as e:
+        required_info["DateTime"] = ""
+
+    # 提取 GPS 信息
+    required_info["Location"] = "无 GPS 数据"
+    required_info["Latitude"] = None
+    required_info["Longitude"] = None
+    try:
+        gps_info = exif_data.get("GPS", {})
+        if gps_info:
+            # 提取纬度和经度
+            lat = gps_info.get(piexif.GPSIFD.GPSLatitude)
+            lat_ref = gps_info.get(piexif.GPSIFD.GPSLatitudeRef, b"N").decode()
+            lon = gps_info.get(piexif.GPSIFD.GPSLongitude)
+            lon_ref = gps_info.get(piexif.GPSIFD.GPSLongitudeRef, b"E").decode()
+
+            if lat and lon:
+                latitude = _convert_gps_to_decimal(lat, lat_ref)
+                longitude = _convert_gps_to_decimal(lon, lon_ref)
+                required_info["Location"] = f"{latitude}, {longitude}"
+                required_info["Latitude"] = latitude
+                required_info["Longitude"] = longitude
+    except Exception as e:
+        pass
+
+    # 提取备注信息
+    try:
+        # 尝试从 EXIF 的 UserComment 字段获取备注
+        user_comment = exif_data.get("Exif", {}).get(piexif.ExifIFD.UserComment, b"").decode(errors="ignore").strip()
+        required_info["Note"] = user_comment if user_comment else ""
+    except Exception as e:
+        # print(f"解析备注信息时发生错误: {e}")
+        required_info["Note"] = ""
+
+    return required_info
+
+
+def resolve_location_name(latitude, longitude):
+    """
+    根据经纬度获取地名。
+
+    参数：
+        latitude (float): 纬度。
+        longitude (float): 经度。
+
+    返回：
+        str: 地名，获取失败时返回 "未知位置"。
+    """
+    try:
+        # 本地数据集优先，必要时回退到在线服务
+        location = get_reverse_geocoder().reverse(latitude, longitude)
+        return location if location else "未知位置"
+    except Exception as e:
+        return "未知位置"
+
+
+def _convert_gps_to_decimal(gps_data, ref):
+    """
+    将 EXIF GPS 数据转换为十进制格式。
+
+    参数：
+        gps_data (list): EXIF GPS 数据（度、分、秒格式）。
+        ref (str): 坐标参考（N, S, E, W）。
+
+    返回：
+        float: GPS 坐标的十进制表示。
+    """
+    try:
+        degrees = gps_data[0][0] / gps_data[0][1]
+        minutes = gps_data[1][0] / gps_data[1][1]
+        seconds = gps_data[2][0] / gps_data[2][1]
+
+        decimal = degrees + (minutes / 60.0) + (seconds / 3600.0)
+
+        # 如果是南半球或西经，需要取负值
+        if ref in ['S', 'W']:
+            decimal = -decimal
+
+        return decimal
+    except Exception as e:
+        print(f"GPS 数据转换错误: {e}")
+        return 0.0
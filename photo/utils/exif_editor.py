@@ -3,7 +3,6 @@ import datetime
 import sys
 from PyQt5 import QtWidgets, QtGui
 from PyQt5.QtWidgets import QFileDialog, QMessageBox
-from utils.map_dialog import MapDialog  # 导入地图选点对话框
 from utils.exif_utils import set_photo_date_and_gps  # 导入用于修改Exif信息的工具
 
 
@@ -139,8 +138,12 @@ class ExifEditorApp(QtWidgets.QWidget):
 
     def open_map_dialog(self):
         """打开地图选点对话框"""
-        self.map_dialog = MapDialog(self)
-        self.map_dialog.coordinates_selected.connect(self.update_gps_input)
+        if getattr(self, 'map_dialog', None) is None:
+            from utils.map_dialog import MapDialog  # 第一次打开地图时才导入 QtWebEngine
+
+            # 对话框保留复用，地图页面只加载一次
+            self.map_dialog = MapDialog(self)
+            self.map_dialog.coordinates_selected.connect(self.update_gps_input)
         self.map_dialog.exec_()
 
     def update_gps_input(self, lon, lat):
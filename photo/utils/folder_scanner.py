@@ -0,0 +1,180 @@
+import os
+import time
+from concurrent import futures
+
+from utils.catalog import Catalog, parse_file
+
+# 支持导入的图片格式
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.heic')
+
+
+def iter_image_files(root, on_directory=None):
+    """
+    用 os.scandir 递归遍历目录，返回图片文件及其状态。
+
+    scandir 的目录项自带类型信息，在 Windows 上还自带 stat 结果，比 os.walk + os.stat 少一次系统调用。
+
+    参数：
+        root (str): 根目录。
+        on_directory (callable, 可选): on_directory(目录路径)，遍历到每个目录（包括根目录）时调用。
+
+    返回：
+        generator: (文件路径, os.stat_result)。
+    """
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        if on_directory:
+            on_directory(directory)
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not entry.name.startswith('.'):
+                                stack.append(entry.path)
+                        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                            yield entry.path, entry.stat()
+                    except OSError:
+                        continue
+        except OSError as e:
+            print(f"无法读取目录 {directory}：{e}")
+
+
+def _parse_chunk(files):
+    """
+    在工作进程中解析一组文件（只读取文件头）。
+
+    返回：
+        tuple: (记录列表, [(路径, 错误信息)])。
+    """
+    records, errors = [], []
+    for image_path, stat in files:
+        try:
+            records.append(Catalog.make_record(image_path, parse_file(image_path), stat))
+        except Exception as e:
+            errors.append((image_path, str(e)))
+    return records, errors
+
+
+class ScanStats:
+    """扫描统计"""
+
+    def __init__(self):
+        self.seen = 0       # 找到的图片文件数
+        self.parsed = 0     # 重新解析的文件数
+        self.skipped = 0    # 未变化而跳过的文件数
+        self.failed = 0     # 解析失败的文件数
+        self.removed = 0    # 已从磁盘删除、从目录中移除的记录数
+        self.elapsed = 0.0
+
+    @property
+    def files_per_sec(self):
+        return self.seen / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __str__(self):
+        return (f"共 {self.seen} 个文件：解析 {self.parsed}，未变化 {self.skipped}，失败 {self.failed}，"
+                f"移除 {self.removed}；耗时 {self.elapsed:.1f} 秒（{self.files_per_sec:.0f} 个/秒）")
+
+
+class FolderScanner:
+    """
+    递归扫描目录并把 EXIF 信息写入元数据目录。
+
+    大小和修改时间与目录记录一致的文件直接跳过；其余文件分组提交到进程池中解析，
+    结果按批在一个事务中写入 SQLite。
+
+    参数：
+        catalog (Catalog): 元数据目录。
+        workers (int, 可选): 并行数，默认为 CPU 核数。
+        chunk_size (int): 每个任务解析的文件数，减少进程间通信开销。
+        batch_size (int): 每个事务写入的记录数。
+        use_processes (bool): 使用进程池还是线程池。
+    """
+
+    def __init__(self, catalog, workers=None, chunk_size=64, batch_size=1000, use_processes=True):
+        self.catalog = catalog
+        self.workers = workers or os.cpu_count() or 4
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.use_processes = use_processes
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def scan(self, root, on_progress=None, on_error=None, remove_missing=True):
+        """
+        扫描目录，阻塞直到完成。
+
+        参数：
+            root (str): 根目录。
+            on_progress (callable, 可选): on_progress(ScanStats)，每写入一批后调用。
+            on_error (callable, 可选): on_error(路径, 错误信息)。
+            remove_missing (bool): 是否移除目录中已不存在的文件记录。
+
+        返回：
+            ScanStats: 扫描统计。
+        """
+        started = time.perf_counter()
+        stats = ScanStats()
+        known = self.catalog.file_states(root)
+        seen_keys = set()
+        pending_records = []
+
+        def flush():
+            if pending_records:
+                self.catalog.store_records(pending_records)
+                pending_records.clear()
+            stats.elapsed = time.perf_counter() - started
+            if on_progress:
+                on_progress(stats)
+
+        def collect(future):
+            records, errors = future.result()
+            stats.parsed += len(records)
+            stats.failed += len(errors)
+            pending_records.extend(records)
+            if on_error:
+                for image_path, e in errors:
+                    on_error(image_path, e)
+            if len(pending_records) >= self.batch_size:
+                flush()
+
+        executor_class = futures.ProcessPoolExecutor if self.use_processes else futures.ThreadPoolExecutor
+        with executor_class(max_workers=self.workers) as executor:
+            pending = set()
+            chunk = []
+            for image_path, stat in iter_image_files(root):
+                if self._cancelled:
+                    break
+                stats.seen += 1
+                key = Catalog.normalize_path(image_path)
+                seen_keys.add(key)
+                if known.get(key) == (stat.st_size, stat.st_mtime_ns):
+                    stats.skipped += 1
+                    continue
+
+                chunk.append((image_path, stat))
+                if len(chunk) >= self.chunk_size:
+                    pending.add(executor.submit(_parse_chunk, chunk))
+                    chunk = []
+                    # 限制排队的任务数，边遍历边写入
+                    if len(pending) >= self.workers * 2:
+                        done, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                        for future in done:
+                            collect(future)
+
+            if chunk and not self._cancelled:
+                pending.add(executor.submit(_parse_chunk, chunk))
+            for future in futures.as_completed(pending):
+                collect(future)
+
+        if remove_missing and not self._cancelled:
+            missing = [path for path in known if path not in seen_keys]
+            if missing:
+                self.catalog.remove(missing)
+                stats.removed = len(missing)
+
+        flush()
+        return stats
@@ -0,0 +1,117 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.app_paths import get_cache_dir
+
+# 默认精度：小数点后 3 位，约 110 米
+DEFAULT_PRECISION = 3
+# 默认有效期：90 天
+DEFAULT_TTL = 90 * 24 * 3600
+# 无法解析的坐标的默认有效期：1 天（网络恢复或更换数据集后能较快重新解析）
+DEFAULT_NEGATIVE_TTL = 24 * 3600
+# 记录“无法解析”的特殊地名
+NOT_FOUND = ""
+# 默认最多保存的条目数
+DEFAULT_MAX_ENTRIES = 100000
+# 每写入多少条检查一次是否需要淘汰
+_EVICT_INTERVAL = 100
+
+
+class GeocodeCache:
+    """
+    基于 SQLite 的逆地理编码结果缓存。
+
+    坐标按指定精度取整后作为键，同一拍摄地点的照片只需解析一次。无法解析的坐标记录为 NOT_FOUND，
+    使用较短的有效期，没有网络时同一地点不会每次都等到超时。
+    超过有效期的条目视为未命中，条目数超过上限时按最近访问时间淘汰（LRU）。
+    """
+
+    def __init__(self, db_path=None, precision=DEFAULT_PRECISION, ttl=DEFAULT_TTL,
+                 max_entries=DEFAULT_MAX_ENTRIES, negative_ttl=DEFAULT_NEGATIVE_TTL):
+        if db_path is None:
+            db_path = os.path.join(get_cache_dir(), "geocode_cache.sqlite3")
+        self.db_path = db_path
+        self.precision = precision
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        # 连接在后台线程和界面线程之间共享，由锁保证串行访问
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS places ("
+            " key TEXT PRIMARY KEY,"
+            " name TEXT NOT NULL,"
+            " created REAL NOT NULL,"
+            " accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS places_accessed ON places (accessed)")
+        self._conn.commit()
+
+    def make_key(self, latitude, longitude):
+        """按精度取整生成缓存键"""
+        return f"{round(latitude, self.precision):.{self.precision}f},{round(longitude, self.precision):.{self.precision}f}"
+
+    def get(self, latitude, longitude):
+        """
+        查询缓存。
+
+        返回：
+            str: 缓存的地名，记录为无法解析时返回 NOT_FOUND，未命中或已过期时返回 None。
+        """
+        key = self.make_key(latitude, longitude)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT name, created FROM places WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            name, created = row
+            ttl = self.negative_ttl if name == NOT_FOUND else self.ttl
+            if ttl is not None and now - created > ttl:
+                self._conn.execute("DELETE FROM places WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE places SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            return name
+
+    def put(self, latitude, longitude, name):
+        """写入缓存，name 为 NOT_FOUND 时记录该坐标无法解析"""
+        key = self.make_key(latitude, longitude)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO places (key, name, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, name, now, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_INTERVAL == 0:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """删除过期条目，并按最近访问时间淘汰超出上限的条目（调用方持有锁）"""
+        now = time.time()
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM places WHERE created < ?", (now - self.ttl,))
+        if self.negative_ttl is not None:
+            self._conn.execute("DELETE FROM places WHERE name = ? AND created < ?", (NOT_FOUND, now - self.negative_ttl))
+        count = self._conn.execute("SELECT COUNT(*) FROM places").fetchone()[0]
+        if count > self.max_entries:
+            self._conn.execute(
+                "DELETE FROM places WHERE key IN (SELECT key FROM places ORDER BY accessed LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM places")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
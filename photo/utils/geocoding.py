@@ -0,0 +1,289 @@
+import csv
+import math
+import os
+import threading
+
+from utils.geocode_cache import NOT_FOUND, GeocodeCache
+
+# 本地地名数据集默认路径，可通过环境变量 EXIF_EDITOR_PLACES 指定
+# 支持 GeoNames 导出的 cities500/cities1000/cities15000.txt（制表符分隔），
+# 或带表头 name,latitude,longitude[,admin,country] 的 CSV 文件
+DEFAULT_PLACES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "res", "places.txt")
+
+# 设置 EXIF_EDITOR_OFFLINE=1 时不使用任何网络服务
+OFFLINE_ENV = "EXIF_EDITOR_OFFLINE"
+PLACES_ENV = "EXIF_EDITOR_PLACES"
+
+EARTH_RADIUS_KM = 6371.0
+
+
+class ReverseGeocoder:
+    """
+    逆地理编码后端接口：根据经纬度返回地名。
+    """
+
+    def reverse(self, latitude, longitude):
+        """
+        参数：
+            latitude (float): 纬度。
+            longitude (float): 经度。
+
+        返回：
+            str: 地名，无法解析时返回 None。
+        """
+        raise NotImplementedError
+
+
+def _to_xyz(latitude, longitude):
+    """经纬度转换为单位球面上的三维坐标，欧氏距离最近即球面距离最近"""
+    lat = math.radians(latitude)
+    lon = math.radians(longitude)
+    cos_lat = math.cos(lat)
+    return (cos_lat * math.cos(lon), cos_lat * math.sin(lon), math.sin(lat))
+
+
+class _KDTree:
+    """三维点的静态 k-d 树，只支持最近邻查询"""
+
+    def __init__(self, points):
+        self.points = points
+        # 节点以数组保存：索引、分割轴、左子树、右子树
+        self.index = []
+        self.axis = []
+        self.left = []
+        self.right = []
+        self.root = self._build(list(range(len(points))), 0)
+
+    def _build(self, indices, depth):
+        if not indices:
+            return -1
+        axis = depth % 3
+        indices.sort(key=lambda i: self.points[i][axis])
+        mid = len(indices) // 2
+
+        node = len(self.index)
+        self.index.append(indices[mid])
+        self.axis.append(axis)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.left[node] = self._build(indices[:mid], depth + 1)
+        self.right[node] = self._build(indices[mid + 1:], depth + 1)
+        return node
+
+    def nearest(self, target):
+        """
+        返回 (点索引, 欧氏距离的平方)，树为空时返回 (-1, inf)。
+        """
+        best_index, best_dist = -1, float("inf")
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node < 0:
+                continue
+            point = self.points[self.index[node]]
+            dist = ((point[0] - target[0]) ** 2 + (point[1] - target[1]) ** 2
+                    + (point[2] - target[2]) ** 2)
+            if dist < best_dist:
+                best_index, best_dist = self.index[node], dist
+
+            diff = target[self.axis[node]] - point[self.axis[node]]
+            near, far = (self.left[node], self.right[node]) if diff < 0 else (self.right[node], self.left[node])
+            # 只有分割面与当前最优半径相交时才需要搜索另一侧
+            if diff * diff < best_dist:
+                stack.append(far)
+            stack.append(near)
+        return best_index, best_dist
+
+
+class OfflineGeocoder(ReverseGeocoder):
+    """
+    基于本地地名数据集的离线逆地理编码，返回距离最近的地点。
+
+    数据集在第一次查询时加载并建立 k-d 树，之后每次查询只需对数时间。
+    """
+
+    def __init__(self, places_path=DEFAULT_PLACES_PATH, max_distance_km=50.0):
+        self.places_path = places_path
+        self.max_distance_km = max_distance_km
+        self._names = None
+        self._tree = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """数据集文件是否存在"""
+        return bool(self.places_path) and os.path.isfile(self.places_path)
+
+    def _load(self):
+        """加载数据集并建立空间索引（线程安全，只执行一次）"""
+        with self._lock:
+            if self._tree is not None:
+                return
+            names, points = [], []
+            if self.available():
+                for name, latitude, longitude in _read_places(self.places_path):
+                    names.append(name)
+                    points.append(_to_xyz(latitude, longitude))
+            self._names = names
+            self._tree = _KDTree(points)
+
+    def reverse(self, latitude, longitude):
+        if self._tree is None:
+            self._load()
+        index, dist_sq = self._tree.nearest(_to_xyz(latitude, longitude))
+        if index < 0:
+            return None
+        # 弦长换算为球面距离
+        chord = math.sqrt(dist_sq)
+        distance_km = 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+        if distance_km > self.max_distance_km:
+            return None
+        return self._names[index]
+
+
+def _read_places(places_path):
+    """
+    读取地名数据集。
+
+    返回：
+        generator: (地名, 纬度, 经度)。
+    """
+    with open(places_path, encoding="utf-8", newline="") as f:
+        if places_path.lower().endswith(".csv"):
+            for row in csv.DictReader(f):
+                try:
+                    latitude, longitude = float(row["latitude"]), float(row["longitude"])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                parts = [row.get("name"), row.get("admin"), row.get("country")]
+                yield ", ".join(p for p in parts if p), latitude, longitude
+        else:
+            # GeoNames 格式：1 名称，4 纬度，5 经度，8 国家代码
+            for line in f:
+                fields = line.rstrip("\n").split("\t")
+                if len(fields) < 11:
+                    continue
+                try:
+                    latitude, longitude = float(fields[4]), float(fields[5])
+                except ValueError:
+                    continue
+                yield ", ".join(p for p in (fields[1], fields[8]) if p), latitude, longitude
+
+
+class NominatimGeocoder(ReverseGeocoder):
+    """
+    通过 OpenStreetMap Nominatim 在线服务进行逆地理编码（需要网络）。
+    """
+
+    def __init__(self, user_agent="photo_exif_app", language="ch", timeout=10):
+        self.user_agent = user_agent
+        self.language = language
+        self.timeout = timeout
+        self._geolocator = None
+
+    def reverse(self, latitude, longitude):
+        if self._geolocator is None:
+            from geopy.geocoders import Nominatim  # 只有使用在线服务时才导入 geopy
+            self._geolocator = Nominatim(user_agent=self.user_agent)
+        location = self._geolocator.reverse((latitude, longitude), language=self.language, timeout=self.timeout)
+        if not location:
+            return None
+        return format_nominatim_address(location)
+
+
+def format_nominatim_address(location):
+    """
+    将 Nominatim 返回结果拼接为 "省, 市, 区, 街道 门牌号" 格式，缺少地址组成部分时使用完整地址。
+    """
+    address_components = location.raw.get("address", {})
+    if not address_components:
+        return location.address
+    # country = address_components.get("country", "")
+    state = address_components.get("state", "")
+    city = address_components.get("city", address_components.get("town", ""))
+    suburb = address_components.get("suburb", "")
+    road = address_components.get("road", "")
+    house_number = address_components.get("house_number", "")
+
+    # 重新拼接格式
+    return f"{state}, {city}, {suburb}, {road} {house_number}".strip(", ").replace(" ,", ",")
+
+
+class ChainGeocoder(ReverseGeocoder):
+    """
+    依次尝试多个后端，返回第一个成功的结果。
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+
+    def reverse(self, latitude, longitude):
+        for backend in self.backends:
+            try:
+                name = backend.reverse(latitude, longitude)
+            except Exception as e:
+                print(f"地名解析失败（{type(backend).__name__}）：{e}")
+                continue
+            if name:
+                return name
+        return None
+
+
+class CachedGeocoder(ReverseGeocoder):
+    """
+    为后端增加持久化缓存，相近坐标（按缓存精度取整后相同）只解析一次；
+    无法解析的结果也会缓存（有效期较短），期间直接返回 None，不再调用后端。
+    """
+
+    def __init__(self, backend, cache):
+        self.backend = backend
+        self.cache = cache
+
+    def reverse(self, latitude, longitude):
+        name = self.cache.get(latitude, longitude)
+        if name == NOT_FOUND:
+            return None
+        if name is not None:
+            return name
+        name = self.backend.reverse(latitude, longitude)
+        self.cache.put(latitude, longitude, name or NOT_FOUND)
+        return name or None
+
+
+_default_geocoder = None
+_default_lock = threading.Lock()
+
+
+def get_reverse_geocoder():
+    """
+    获取全局共享的逆地理编码器：优先使用本地数据集，未设置离线模式时再回退到 Nominatim，
+    结果保存在磁盘缓存中。
+    """
+    global _default_geocoder
+    with _default_lock:
+        if _default_geocoder is None:
+            backends = []
+            offline = OfflineGeocoder(os.environ.get(PLACES_ENV, DEFAULT_PLACES_PATH))
+            online = os.environ.get(OFFLINE_ENV) != "1"
+            if offline.available():
+                backends.append(offline)
+            elif online:
+                print(f"警告: 未找到离线地名数据集 {offline.places_path}，地名解析只能使用在线服务 Nominatim，"
+                      f"没有网络时每次解析都要等到超时（可通过 {PLACES_ENV} 指定数据集）")
+            else:
+                print(f"警告: 未找到离线地名数据集 {offline.places_path}，且已设置 {OFFLINE_ENV}=1，无法解析地名")
+            if online:
+                backends.append(NominatimGeocoder())
+            geocoder = ChainGeocoder(backends)
+            try:
+                geocoder = CachedGeocoder(geocoder, GeocodeCache())
+            except Exception as e:
+                print(f"地名缓存不可用：{e}")
+            _default_geocoder = geocoder
+        return _default_geocoder
+
+
+def set_reverse_geocoder(geocoder):
+    """替换全局逆地理编码器（例如只使用离线数据集）"""
+    global _default_geocoder
+    with _default_lock:
+        _default_geocoder = geocoder
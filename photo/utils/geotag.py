@@ -0,0 +1,250 @@
+import bisect
+import xml.etree.ElementTree as ET
+from array import array
+from datetime import datetime, timedelta, timezone
+
+import piexif
+
+from utils.exif_core import build_exif_bytes, load_exif_dict, rewrite_exif
+from utils.time_shift import parse_utc_offset
+
+# 默认的最大间隔：相邻轨迹点相隔超过 5 分钟时不插值（通常是记录器关机或信号丢失）
+DEFAULT_MAX_GAP = 300
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def _local_name(tag):
+    """去掉 XML 命名空间，GPX 1.0 和 1.1 的命名空间不同"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def parse_gpx_time(text):
+    """
+    解析 GPX 中的 ISO 8601 时间。
+
+    返回：
+        float: UTC 时间戳（秒）。没有时区的时间按 GPX 规范视为 UTC。
+    """
+    text = text.strip()
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+    value = datetime.fromisoformat(text)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH).total_seconds()
+
+
+class TrackIndex:
+    """
+    按时间排序的 GPS 轨迹，用二分查找为任意时刻插值坐标。
+
+    时间、纬度、经度分别保存在 array('d') 中，百万个轨迹点只占约 24 MB，
+    单次查找为 O(log n)，一万张照片对百万个轨迹点也只需毫秒级。
+    """
+
+    def __init__(self, times, latitudes, longitudes):
+        self.times = times
+        self.latitudes = latitudes
+        self.longitudes = longitudes
+
+    def __len__(self):
+        return len(self.times)
+
+    @classmethod
+    def from_points(cls, points):
+        """
+        由 (时间戳, 纬度, 经度) 序列创建索引，自动排序并去除重复时间。
+        """
+        points = sorted(points)
+        times, latitudes, longitudes = array('d'), array('d'), array('d')
+        for t, lat, lon in points:
+            if times and t == times[-1]:
+                continue
+            times.append(t)
+            latitudes.append(lat)
+            longitudes.append(lon)
+        return cls(times, latitudes, longitudes)
+
+    @classmethod
+    def from_gpx(cls, paths):
+        """
+        读取一个或多个 GPX 文件中的轨迹点（trkpt）和路线点（rtept）。
+
+        使用 iterparse 边读边释放元素，大文件也不会把整棵 XML 树放进内存。
+        """
+        if isinstance(paths, str):
+            paths = [paths]
+        points = []
+        for path in paths:
+            for _, elem in ET.iterparse(path, events=("end",)):
+                name = _local_name(elem.tag)
+                if name not in ("trkpt", "rtept"):
+                    if name in ("trkseg", "trk", "rte"):
+                        elem.clear()
+                    continue
+                time_text = None
+                for child in elem:
+                    if _local_name(child.tag) == "time":
+                        time_text = child.text
+                        break
+                if time_text:
+                    try:
+                        points.append((parse_gpx_time(time_text), float(elem.get("lat")), float(elem.get("lon"))))
+                    except (TypeError, ValueError):
+                        pass    # 跳过格式错误的点
+                elem.clear()
+        return cls.from_points(points)
+
+    def locate(self, timestamp, max_gap=DEFAULT_MAX_GAP):
+        """
+        查找某一时刻的坐标。
+
+        参数：
+            timestamp (float): UTC 时间戳（秒）。
+            max_gap (float): 允许插值的相邻轨迹点最大间隔（秒）；也是轨迹首尾之外允许的最大距离。
+
+        返回：
+            tuple: (纬度, 经度)；超出轨迹范围或落在间隔过大的空档中时返回 None。
+        """
+        times = self.times
+        if not times:
+            return None
+        i = bisect.bisect_left(times, timestamp)
+        if i < len(times) and times[i] == timestamp:
+            return self.latitudes[i], self.longitudes[i]
+        if i == 0:
+            return (self.latitudes[0], self.longitudes[0]) if times[0] - timestamp <= max_gap else None
+        if i == len(times):
+            return (self.latitudes[-1], self.longitudes[-1]) if timestamp - times[-1] <= max_gap else None
+
+        t0, t1 = times[i - 1], times[i]
+        if t1 - t0 > max_gap:
+            # 空档中只使用足够近的一端
+            if timestamp - t0 <= max_gap / 2:
+                return self.latitudes[i - 1], self.longitudes[i - 1]
+            if t1 - timestamp <= max_gap / 2:
+                return self.latitudes[i], self.longitudes[i]
+            return None
+
+        ratio = (timestamp - t0) / (t1 - t0)
+        lat0, lon0 = self.latitudes[i - 1], self.longitudes[i - 1]
+        lat1, lon1 = self.latitudes[i], self.longitudes[i]
+        if lon1 - lon0 > 180:       # 跨越 180° 经线时沿较短的方向插值
+            lon1 -= 360
+        elif lon0 - lon1 > 180:
+            lon1 += 360
+        lon = lon0 + (lon1 - lon0) * ratio
+        if lon > 180:
+            lon -= 360
+        elif lon < -180:
+            lon += 360
+        return lat0 + (lat1 - lat0) * ratio, lon
+
+
+def photo_timestamp(exif_dict, utc_offset=None, clock_offset=0.0):
+    """
+    计算照片拍摄时刻的 UTC 时间戳。
+
+    DateTimeOriginal 是相机时钟的本地时间；有 OffsetTimeOriginal 标签时使用照片自带的时区，
+    否则使用 utc_offset。
+
+    参数：
+        exif_dict (dict): piexif 格式的 EXIF 字典。
+        utc_offset (timedelta, 可选): 相机时钟所在时区，默认为本机时区。
+        clock_offset (float): 相机时钟比实际时间快的秒数，慢时为负。
+
+    返回：
+        float: UTC 时间戳；照片没有拍摄日期时返回 None。
+    """
+    exif = exif_dict.get("Exif", {})
+    raw = exif.get(piexif.ExifIFD.DateTimeOriginal) or exif_dict.get("0th", {}).get(piexif.ImageIFD.DateTime)
+    if not raw:
+        return None
+    try:
+        local = datetime.strptime(raw.decode().strip('\x00 '), "%Y:%m:%d %H:%M:%S")
+    except ValueError:
+        return None
+    subsec = exif.get(piexif.ExifIFD.SubSecTimeOriginal)
+    if subsec:
+        try:
+            local += timedelta(seconds=float("0." + subsec.decode().strip('\x00 ')))
+        except ValueError:
+            pass
+
+    offset = None
+    raw_offset = exif.get(piexif.ExifIFD.OffsetTimeOriginal)
+    if raw_offset:
+        offset = parse_utc_offset(raw_offset.decode())
+    if offset is None:
+        offset = utc_offset
+    if offset is None:
+        # 按本机时区（含夏令时）解释
+        timestamp = local.timestamp()
+    else:
+        timestamp = (local.replace(tzinfo=timezone(offset)) - _EPOCH).total_seconds()
+    return timestamp - clock_offset
+
+
+class GeotagSpec:
+    """
+    按 GPS 轨迹为照片写入坐标的批量编辑内容，可直接交给 BatchEditor。
+
+    轨迹索引较大，BatchEditor 应使用线程池（JPEG 只改写文件头，本身就是 I/O 密集）。
+
+    参数：
+        track (TrackIndex): GPS 轨迹。
+        utc_offset (timedelta, 可选): 相机时钟所在时区，默认为本机时区。
+        clock_offset (float): 相机时钟比实际时间快的秒数。
+        max_gap (float): 允许插值的最大间隔（秒）。
+    """
+
+    def __init__(self, track, utc_offset=None, clock_offset=0.0, max_gap=DEFAULT_MAX_GAP):
+        self.track = track
+        self.utc_offset = utc_offset
+        self.clock_offset = clock_offset
+        self.max_gap = max_gap
+
+    def locate(self, image_path):
+        """
+        计算照片的坐标。
+
+        返回：
+            tuple: (纬度, 经度)。
+
+        异常：
+            LookupError: 照片没有拍摄日期或不在轨迹范围内。
+        """
+        try:
+            exif_dict = load_exif_dict(image_path)
+        except Exception:
+            raise LookupError("没有拍摄日期")
+        return self.locate_exif(exif_dict)
+
+    def locate_exif(self, exif_dict):
+        """
+        按已读取的 EXIF 字典计算照片的坐标。
+
+        返回：
+            tuple: (纬度, 经度)。
+
+        异常：
+            LookupError: 照片没有拍摄日期或不在轨迹范围内。
+        """
+        timestamp = photo_timestamp(exif_dict, self.utc_offset, self.clock_offset)
+        if timestamp is None:
+            raise LookupError("没有拍摄日期")
+        coords = self.track.locate(timestamp, self.max_gap)
+        if coords is None:
+            taken = datetime.fromtimestamp(timestamp, timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+            raise LookupError(f"拍摄时间 {taken} UTC 没有匹配的轨迹点")
+        return coords
+
+    def apply(self, image_path, dest_path, fsync=False):
+        """把插值得到的坐标写入单个文件，日期和备注保持不变；dest_path 为 None 时原地修改"""
+        def edit(exif_dict):
+            # 与写入共用同一次读取的 EXIF 字典，每个文件只解析一次
+            lat, lon = self.locate_exif(exif_dict)
+            return build_exif_bytes(exif_dict, None, f"{round(lat, 7)}, {round(lon, 7)}", "")
+
+        rewrite_exif(image_path, dest_path, edit, fsync)
@@ -0,0 +1,606 @@
+import os
+import shutil
+import struct
+
+from utils.atomic_file import atomic_write
+from utils.jpeg_exif import COPY_CHUNK_SIZE, EXIF_HEADER, _check_tiff_header
+
+# ftyp 中表示 HEIF 图片的品牌
+HEIF_BRANDS = {b"heic", b"heix", b"heim", b"heis", b"hevc", b"hevx", b"mif1", b"msf1"}
+
+# iloc 中 Exif 项目的数据存放方式：0 为文件偏移，1 为 meta 中的 idat
+_CONSTRUCTION_FILE = 0
+_CONSTRUCTION_IDAT = 1
+
+
+def is_heif(image_path):
+    """
+    通过 ftyp 盒判断是否为 HEIF/HEIC 文件。
+
+    返回：
+        bool: ftyp 的主品牌或兼容品牌中包含 HEIF 品牌时返回 True。
+    """
+    try:
+        with open(image_path, "rb") as f:
+            header = f.read(64)
+    except OSError:
+        return False
+    if len(header) < 16 or header[4:8] != b"ftyp":
+        return False
+    size = min(struct.unpack(">I", header[:4])[0], len(header))
+    brands = [header[8:12]] + [header[i:i + 4] for i in range(16, size - 3, 4)]
+    return any(brand in HEIF_BRANDS for brand in brands)
+
+
+def _read_box_header(data, pos, end):
+    """
+    解析盒头。
+
+    返回：
+        tuple: (类型, 内容起始位置, 盒结束位置)；size 为 0 时盒延伸到 end。
+    """
+    if pos + 8 > end:
+        raise ValueError(f"HEIF 盒头不完整（偏移 {pos}）")
+    size, box_type = struct.unpack(">I4s", data[pos:pos + 8])
+    header_size = 8
+    if size == 1:
+        size = struct.unpack(">Q", data[pos + 8:pos + 16])[0]
+        header_size = 16
+    elif size == 0:
+        size = end - pos
+    if size < header_size or pos + size > end:
+        raise ValueError(f"HEIF 盒大小无效（偏移 {pos}）")
+    return box_type, pos + header_size, pos + size
+
+
+def _iter_boxes(data, start, end):
+    pos = start
+    while pos < end:
+        box_type, content, box_end = _read_box_header(data, pos, end)
+        yield box_type, pos, content, box_end
+        pos = box_end
+
+
+def _read_uint(data, pos, size):
+    """读取 0/4/8 字节的大端无符号整数（iloc 中字段长度可变）"""
+    if size == 0:
+        return 0
+    if size == 4:
+        return struct.unpack(">I", data[pos:pos + 4])[0]
+    if size == 8:
+        return struct.unpack(">Q", data[pos:pos + 8])[0]
+    if size == 2:
+        return struct.unpack(">H", data[pos:pos + 2])[0]
+    raise ValueError(f"不支持的字段长度 {size}")
+
+
+def _write_uint(buffer, pos, size, value):
+    """把无符号整数写入 0/4/8 字节的字段"""
+    if value >= 1 << (8 * size):
+        raise ValueError("偏移超出 iloc 字段范围")
+    if size:
+        struct.pack_into(">I" if size == 4 else ">Q", buffer, pos, value)
+
+
+def _extend_box(data, start, end, extra):
+    """返回在盒末尾追加 extra 后的新盒，盒头中的大小随之更新（只支持 32 位大小字段）"""
+    size = struct.unpack_from(">I", data, start)[0]
+    if size in (0, 1) or end - start + len(extra) >= 1 << 32:
+        raise ValueError("不支持的 HEIF 盒结构")
+    box = bytearray(data[start:end]) + extra
+    struct.pack_into(">I", box, 0, len(box))
+    return box
+
+
+def _increment_count(box, pos, fmt):
+    """把盒中的项目数加一"""
+    count = struct.unpack_from(fmt, box, pos)[0] + 1
+    if count >= 1 << (8 * struct.calcsize(fmt)):
+        raise ValueError("HEIF 项目数超出字段范围")
+    struct.pack_into(fmt, box, pos, count)
+
+
+class _HeifLayout:
+    """
+    HEIF 文件中与 Exif 项目相关的结构：顶层盒、meta 盒以及 Exif 项目在 iloc 中的位置。
+
+    所有位置都是文件内的绝对偏移。只读取 ftyp 和 meta，图像数据（mdat）不会被读取。
+    """
+
+    def __init__(self, f):
+        file_size = os.fstat(f.fileno()).st_size
+        self.file_size = file_size
+        self.top_boxes = []     # [(类型, 起始, 结束, 盒头中的 size 字段是否为 0)]
+        meta_range = None
+
+        pos = 0
+        while pos < file_size:
+            f.seek(pos)
+            header = f.read(16)
+            if len(header) < 8:
+                raise ValueError("HEIF 文件不完整")
+            size, box_type = struct.unpack(">I4s", header[:8])
+            if size == 1:
+                size = struct.unpack(">Q", header[8:16])[0]
+            to_end = size == 0
+            if to_end:
+                size = file_size - pos
+            if size < 8 or pos + size > file_size:
+                raise ValueError(f"HEIF 盒大小无效（偏移 {pos}）")
+            self.top_boxes.append((box_type, pos, pos + size, to_end))
+            if box_type == b"meta":
+                meta_range = (pos, pos + size)
+            pos += size
+
+        if meta_range is None:
+            raise ValueError("HEIF 文件中没有 meta 盒")
+        self.meta_start = meta_range[0]
+        f.seek(self.meta_start)
+        self.meta = f.read(meta_range[1] - meta_range[0])
+        self._parse_meta()
+
+    def _parse_meta(self):
+        meta = self.meta
+        _, content, end = _read_box_header(meta, 0, len(meta))
+        content += 4    # meta 是 FullBox，跳过版本和标志
+
+        self.exif_item_id = None
+        self.primary_item_id = None
+        self.item_ids = set()
+        self.idat = None
+        self.iprp = None
+        # iinf、iloc、iref 的 (起始, 内容起始, 结束)，添加 Exif 项目时需要改写
+        self.iinf = None
+        self.iloc = None
+        self.iref = None
+        for box_type, start, box_content, box_end in _iter_boxes(meta, content, end):
+            if box_type == b"pitm":
+                fmt = ">H" if meta[box_content] == 0 else ">I"
+                self.primary_item_id = struct.unpack_from(fmt, meta, box_content + 4)[0]
+            elif box_type == b"iprp":
+                self.iprp = (box_content, box_end)
+            elif box_type == b"iinf":
+                self.iinf = (start, box_content, box_end)
+                self.exif_item_id = self._find_exif_item(box_content, box_end)
+            elif box_type == b"iloc":
+                self.iloc = (start, box_content, box_end)
+            elif box_type == b"iref":
+                self.iref = (start, box_content, box_end)
+            elif box_type == b"idat":
+                self.idat = (box_content, box_end)
+
+        self.items = {}
+        if self.iloc is not None:
+            self.items = self._parse_iloc(self.iloc[1], self.iloc[2])
+        self.exif_entry = None
+        if self.exif_item_id is not None:
+            self.exif_entry = self.items.get(self.exif_item_id)
+
+    def _find_exif_item(self, content, end):
+        """在 iinf 中查找类型为 Exif 的项目编号，同时记录所有项目编号"""
+        meta = self.meta
+        version = meta[content]
+        pos = content + 4 + (2 if version == 0 else 4)
+        exif_item_id = None
+        for box_type, _, box_content, _ in _iter_boxes(meta, pos, end):
+            if box_type != b"infe":
+                continue
+            infe_version = meta[box_content]
+            pos = box_content + 4
+            if infe_version < 3:
+                item_id = struct.unpack(">H", meta[pos:pos + 2])[0]
+                pos += 2
+            else:
+                item_id = struct.unpack(">I", meta[pos:pos + 4])[0]
+                pos += 4
+            self.item_ids.add(item_id)
+            if infe_version < 2:
+                continue    # 旧版本的 infe 没有项目类型
+            item_type = meta[pos + 2:pos + 6]
+            if item_type == b"Exif" and exif_item_id is None:
+                exif_item_id = item_id
+        return exif_item_id
+
+    def _parse_iloc(self, content, end):
+        """
+        解析 iloc。
+
+        返回：
+            dict: {项目编号: 项目位置信息}，其中的 *_pos 为字段在文件中的绝对偏移。
+        """
+        meta = self.meta
+        version = meta[content]
+        pos = content + 4
+        offset_size, length_size = meta[pos] >> 4, meta[pos] & 0x0F
+        base_offset_size, index_size = meta[pos + 1] >> 4, meta[pos + 1] & 0x0F
+        if version not in (1, 2):
+            index_size = 0
+        self.iloc_fields = {
+            "version": version,
+            "offset_size": offset_size,
+            "length_size": length_size,
+            "base_offset_size": base_offset_size,
+            "index_size": index_size,
+        }
+        pos += 2
+        if version < 2:
+            item_count = struct.unpack(">H", meta[pos:pos + 2])[0]
+            pos += 2
+        else:
+            item_count = struct.unpack(">I", meta[pos:pos + 4])[0]
+            pos += 4
+
+        entries = {}
+        for _ in range(item_count):
+            if version < 2:
+                item_id = struct.unpack(">H", meta[pos:pos + 2])[0]
+                pos += 2
+            else:
+                item_id = struct.unpack(">I", meta[pos:pos + 4])[0]
+                pos += 4
+            construction_method = _CONSTRUCTION_FILE
+            if version in (1, 2):
+                construction_method = struct.unpack(">H", meta[pos:pos + 2])[0] & 0x0F
+                pos += 2
+            data_reference_index = struct.unpack(">H", meta[pos:pos + 2])[0]
+            pos += 2
+            base_offset_pos = pos
+            base_offset = _read_uint(meta, pos, base_offset_size)
+            pos += base_offset_size
+            extent_count = struct.unpack(">H", meta[pos:pos + 2])[0]
+            pos += 2
+            extents = []
+            for _ in range(extent_count):
+                pos += index_size
+                offset_pos = pos
+                extent_offset = _read_uint(meta, pos, offset_size)
+                pos += offset_size
+                length_pos = pos
+                extent_length = _read_uint(meta, pos, length_size)
+                pos += length_size
+                extents.append((extent_offset, extent_length,
+                                self.meta_start + offset_pos, self.meta_start + length_pos))
+            if pos > end:
+                raise ValueError("iloc 盒不完整")
+            entries[item_id] = {
+                "construction_method": construction_method,
+                "data_reference_index": data_reference_index,
+                "base_offset": base_offset,
+                "base_offset_pos": self.meta_start + base_offset_pos,
+                "offset_size": offset_size,
+                "length_size": length_size,
+                "extents": extents,
+            }
+        return entries
+
+    def meta_with_exif_item(self, payload_length):
+        """
+        构造添加了 Exif 项目的新 meta 盒，Exif 数据放在追加到文件末尾的新 mdat 盒中。
+
+        iinf 中新增类型为 Exif 的 infe，iref 中新增从 Exif 项目指向主图像的 cdsc 引用，iloc 中新增一项。
+        meta 变大后位于其后的内容整体后移，iloc 中指向这些内容的偏移相应调整。
+
+        参数：
+            payload_length (int): Exif 项目数据的长度。
+
+        返回：
+            tuple: (新 meta 盒, Exif 数据在新文件中的偏移)。
+
+        异常：
+            ValueError: 盒结构不支持添加项目。
+        """
+        meta = self.meta
+        if self.primary_item_id is None or self.iinf is None or self.iloc is None:
+            raise ValueError("HEIF 文件缺少 pitm、iinf 或 iloc 盒")
+        if any(box[0] == b"moov" for box in self.top_boxes):
+            # 图像序列的采样偏移记录在 moov 中，meta 变大后无法一并调整
+            raise ValueError("不支持为图像序列添加 Exif 项目")
+        _, meta_content, meta_end = _read_box_header(meta, 0, len(meta))
+        if meta_content != 8:
+            raise ValueError("不支持的 HEIF 盒结构")
+        fields = self.iloc_fields
+        if fields["offset_size"] not in (4, 8) or fields["length_size"] not in (4, 8):
+            raise ValueError("不支持的 iloc 字段长度")
+        item_id = max(self.item_ids | set(self.items) | {self.primary_item_id}) + 1
+        id_code = "I" if item_id > 0xFFFF else "H"
+
+        # iinf：新增 infe（版本 2 的项目编号为 16 位，版本 3 为 32 位），标志为 1 表示隐藏项目
+        start, content, end = self.iinf
+        infe_version = 3 if id_code == "I" else 2
+        infe = struct.pack(f">I4sI{id_code}H4s", 21 + struct.calcsize(id_code) - 2, b"infe",
+                           (infe_version << 24) | 1, item_id, 0, b"Exif") + b"\x00"
+        iinf = _extend_box(meta, start, end, infe)
+        _increment_count(iinf, content - start + 4, ">H" if meta[content] == 0 else ">I")
+
+        # iref：Exif 项目通过 cdsc（内容描述）引用主图像；版本 0 的项目编号为 16 位
+        if self.iref is not None:
+            start, content, end = self.iref
+            ref_code = "H" if meta[content] == 0 else "I"
+        else:
+            ref_code = "I" if max(item_id, self.primary_item_id) > 0xFFFF else "H"
+        if ref_code == "H" and max(item_id, self.primary_item_id) > 0xFFFF:
+            raise ValueError("项目编号超出 iref 字段范围")
+        cdsc = struct.pack(f">I4s{ref_code}H{ref_code}", 10 + 2 * struct.calcsize(ref_code), b"cdsc",
+                           item_id, 1, self.primary_item_id)
+        if self.iref is not None:
+            iref = _extend_box(meta, start, end, cdsc)
+        else:
+            iref = struct.pack(">I4sI", 12 + len(cdsc), b"iref", 0 if ref_code == "H" else 1 << 24) + cdsc
+
+        # iloc：新增一项，construction_method、data_reference_index 和 base_offset 均为 0
+        start, content, end = self.iloc
+        version = fields["version"]
+        if version < 2 and id_code == "I":
+            raise ValueError("项目编号超出 iloc 字段范围")
+        entry = struct.pack(">H" if version < 2 else ">I", item_id)
+        if version in (1, 2):
+            entry += bytes(2)
+        entry += bytes(2 + fields["base_offset_size"])
+        entry += struct.pack(">H", 1) + bytes(fields["index_size"])
+        offset_pos = end - start + len(entry)
+        entry += bytes(fields["offset_size"])
+        entry += struct.pack(">I" if fields["length_size"] == 4 else ">Q", payload_length)
+        iloc = _extend_box(meta, start, end, entry)
+        _increment_count(iloc, content - start + 6, ">H" if version < 2 else ">I")
+
+        growth = len(infe) + len(entry) + (len(cdsc) if self.iref is not None else len(iref))
+        self._shift_offsets(iloc, self.meta_start + start, growth)
+        # 新 mdat 的盒头 8 字节
+        payload_offset = self.file_size + growth + 8
+        _write_uint(iloc, offset_pos, fields["offset_size"], payload_offset)
+
+        replaced = {b"iinf": iinf, b"iloc": iloc, b"iref": iref}
+        children = []
+        for box_type, start, _, end in _iter_boxes(meta, meta_content + 4, meta_end):
+            children.append(replaced.pop(box_type, None) or meta[start:end])
+        children.extend(replaced.values())      # 原来没有 iref 时追加在 meta 末尾
+        body = b"".join(children)
+        if len(meta) + growth >= 1 << 32:
+            raise ValueError("不支持的 HEIF 盒结构")
+        new_meta = struct.pack(">I4s", len(meta) + growth, b"meta") + meta[8:12] + body
+        assert len(new_meta) == len(meta) + growth
+        return new_meta, payload_offset
+
+    def _shift_offsets(self, iloc, iloc_start, growth):
+        """
+        把 iloc 中指向 meta 之后内容的偏移加上 growth。
+
+        参数：
+            iloc (bytearray): 新的 iloc 盒，原有字段的位置不变。
+            iloc_start (int): 原 iloc 盒在文件中的偏移。
+            growth (int): meta 增加的字节数。
+        """
+        meta_end = self.meta_start + len(self.meta)
+        for entry in self.items.values():
+            if entry["construction_method"] != _CONSTRUCTION_FILE or entry["data_reference_index"] != 0:
+                continue    # idat 中的数据相对 idat 定位；引用外部文件的项目不受影响
+            base_offset = entry["base_offset"]
+            if base_offset >= meta_end and self.iloc_fields["base_offset_size"]:
+                _write_uint(iloc, entry["base_offset_pos"] - iloc_start,
+                            self.iloc_fields["base_offset_size"], base_offset + growth)
+                continue
+            for extent_offset, _, offset_pos, _ in entry["extents"]:
+                position = base_offset + extent_offset
+                if self.meta_start <= position < meta_end:
+                    raise ValueError("项目数据位于 meta 盒内，无法调整偏移")
+                if position >= meta_end:
+                    _write_uint(iloc, offset_pos - iloc_start, entry["offset_size"], extent_offset + growth)
+
+    def primary_size(self):
+        """
+        从主图像关联的 ispe 属性读取宽高，按 irot 旋转后返回。
+
+        返回：
+            tuple: (宽, 高)；找不到 ispe 时返回 None。
+        """
+        if self.iprp is None or self.primary_item_id is None:
+            return None
+        meta = self.meta
+        properties = []     # ipco 中的属性按出现顺序编号（从 1 开始）
+        associations = None
+        for box_type, _, content, end in _iter_boxes(meta, *self.iprp):
+            if box_type == b"ipco":
+                properties = [(t, c, e) for t, _, c, e in _iter_boxes(meta, content, end)]
+            elif box_type == b"ipma" and associations is None:
+                associations = self._find_associations(content, self.primary_item_id)
+        if not associations:
+            return None
+
+        size, rotation = None, 0
+        for index in associations:
+            if not 1 <= index <= len(properties):
+                continue
+            prop_type, content, _ = properties[index - 1]
+            if prop_type == b"ispe":
+                size = struct.unpack_from(">II", meta, content + 4)
+            elif prop_type == b"irot":
+                rotation = meta[content] & 0x03
+        if size is None:
+            return None
+        return (size[1], size[0]) if rotation % 2 else size
+
+    def _find_associations(self, content, item_id):
+        """在 ipma 中查找项目关联的属性编号"""
+        meta = self.meta
+        version, flags = meta[content], meta[content + 3]
+        pos = content + 4
+        entry_count = struct.unpack_from(">I", meta, pos)[0]
+        pos += 4
+        for _ in range(entry_count):
+            if version < 1:
+                current_id = struct.unpack_from(">H", meta, pos)[0]
+                pos += 2
+            else:
+                current_id = struct.unpack_from(">I", meta, pos)[0]
+                pos += 4
+            count = meta[pos]
+            pos += 1
+            indices = []
+            for _ in range(count):
+                if flags & 1:
+                    indices.append(struct.unpack_from(">H", meta, pos)[0] & 0x7FFF)
+                    pos += 2
+                else:
+                    indices.append(meta[pos] & 0x7F)
+                    pos += 1
+            if current_id == item_id:
+                return indices
+        return None
+
+    def read_exif_payload(self, f):
+        """读取 Exif 项目的原始数据（含 4 字节 TIFF 头偏移）"""
+        entry = self.exif_entry
+        chunks = []
+        for extent_offset, extent_length, _, _ in entry["extents"]:
+            if entry["construction_method"] == _CONSTRUCTION_FILE:
+                f.seek(entry["base_offset"] + extent_offset)
+                chunks.append(f.read(extent_length))
+            elif entry["construction_method"] == _CONSTRUCTION_IDAT and self.idat is not None:
+                start = self.idat[0] + entry["base_offset"] + extent_offset
+                chunks.append(self.meta[start:start + extent_length])
+            else:
+                raise ValueError("不支持的 Exif 项目存储方式")
+        return b"".join(chunks)
+
+
+def read_heif_exif(image_path):
+    """
+    只解析 HEIF 的 meta 盒，读取 Exif 项目，不解码图像。
+
+    返回：
+        bytes: 以 b"Exif\x00\x00" 开头的 EXIF 数据（与 read_jpeg_exif 相同）；没有 Exif 项目时返回 None。
+
+    异常：
+        ValueError: 文件不是有效的 HEIF。
+    """
+    with open(image_path, "rb") as f:
+        layout = _HeifLayout(f)
+        if layout.exif_entry is None:
+            return None
+        payload = layout.read_exif_payload(f)
+    if len(payload) < 4:
+        return None
+    # Exif 项目以 4 字节的 TIFF 头偏移开始，iPhone 等设备在 TIFF 头之前还有 "Exif\0\0"
+    tiff_offset = struct.unpack(">I", payload[:4])[0]
+    tiff = payload[4 + tiff_offset:]
+    if not _check_tiff_header(tiff):
+        return None
+    return EXIF_HEADER + tiff
+
+
+def read_heif_size(image_path):
+    """
+    从主图像的 ispe 属性读取 HEIF 图像的宽和高，不解码图像。
+
+    返回：
+        tuple: (宽, 高)，找不到时返回 None。
+    """
+    with open(image_path, "rb") as f:
+        return _HeifLayout(f).primary_size()
+
+
+def write_heif_exif(src_path, dest_path, exif_bytes, fsync=False, preserve_from=None):
+    """
+    替换 HEIF 文件中 Exif 项目的内容，HEVC 图像数据原样保留，不做解码和重新编码。
+
+    新的 EXIF 不超过原 Exif 项目的长度时原位覆盖；否则追加到文件末尾的新 mdat 盒中，
+    并把 iloc 中该项目的偏移和长度改为指向新位置。两种情况下 iloc 的大小都不变，
+    其他项目（图像、缩略图）的偏移无需调整。
+
+    没有 Exif 项目时新增一个（见 _HeifLayout.meta_with_exif_item），数据同样追加到文件末尾。
+
+    参数：
+        src_path (str): 源 HEIF 文件路径。
+        dest_path (str): 输出文件路径，可以与源文件相同。
+        exif_bytes (bytes): piexif.dump 生成的 EXIF 数据。
+        fsync (bool): 替换前把新文件刷到磁盘。
+        preserve_from (str, 可选): 保留该文件的权限和修改时间。
+
+    异常：
+        ValueError: 文件不是有效的 HEIF，或盒结构不支持原位修改
+            （Exif 数据分为多段或位于 idat 中、图像序列等），调用方可改用重新编码。
+    """
+    if not exif_bytes.startswith(EXIF_HEADER):
+        exif_bytes = EXIF_HEADER + exif_bytes
+    payload = struct.pack(">I", len(EXIF_HEADER)) + exif_bytes
+
+    with open(src_path, "rb") as f:
+        layout = _HeifLayout(f)
+    entry = layout.exif_entry
+    if entry is None:
+        _insert_heif_exif(src_path, dest_path, layout, payload, fsync, preserve_from)
+        return
+    if entry["construction_method"] != _CONSTRUCTION_FILE or len(entry["extents"]) != 1:
+        raise ValueError("不支持的 Exif 项目存储方式")
+    offset_size, length_size = entry["offset_size"], entry["length_size"]
+    if offset_size not in (4, 8) or length_size not in (4, 8):
+        raise ValueError("不支持的 iloc 字段长度")
+
+    old_offset, old_length, offset_pos, length_pos = entry["extents"][0]
+    base_offset = entry["base_offset"]
+    append = len(payload) > old_length
+    if append:
+        # 追加到文件末尾的新 mdat 盒，盒头 8 字节
+        new_offset = layout.file_size + 8 - base_offset
+        if new_offset < 0 or (offset_size == 4 and new_offset >= 1 << 32):
+            raise ValueError("新的 Exif 位置超出 iloc 偏移字段范围")
+    else:
+        new_offset = old_offset
+    last_box = layout.top_boxes[-1]
+
+    def write(tmp_path):
+        with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+        with open(tmp_path, "r+b") as dst:
+            if append:
+                if last_box[3]:
+                    # 最后一个盒的 size 为 0（延伸到文件末尾），先写入实际大小，否则新盒会被当作它的一部分
+                    box_size = last_box[2] - last_box[1]
+                    if box_size >= 1 << 32:
+                        raise ValueError("不支持的 HEIF 盒结构")
+                    dst.seek(last_box[1])
+                    dst.write(struct.pack(">I", box_size))
+                dst.seek(layout.file_size)
+                dst.write(struct.pack(">I4s", 8 + len(payload), b"mdat"))
+                dst.write(payload)
+            else:
+                dst.seek(base_offset + old_offset)
+                dst.write(payload)
+            dst.seek(offset_pos)
+            dst.write(struct.pack(">I" if offset_size == 4 else ">Q", new_offset))
+            dst.seek(length_pos)
+            dst.write(struct.pack(">I" if length_size == 4 else ">Q", len(payload)))
+
+    atomic_write(dest_path, write, fsync=fsync, preserve_from=preserve_from)
+
+
+def _insert_heif_exif(src_path, dest_path, layout, payload, fsync, preserve_from):
+    """为没有 Exif 项目的 HEIF 添加 Exif 项目：meta 换成新的，其余内容原样复制，Exif 数据追加到文件末尾"""
+    new_meta, _ = layout.meta_with_exif_item(len(payload))
+    meta_end = layout.meta_start + len(layout.meta)
+    growth = len(new_meta) - len(layout.meta)
+    last_type, last_start, last_end, last_to_end = layout.top_boxes[-1]
+    # 最后一个盒的 size 为 0（延伸到文件末尾）时要写入实际大小，否则新盒会被当作它的一部分；meta 已写入实际大小
+    fix_last_box = last_to_end and last_type != b"meta"
+    if fix_last_box and last_end - last_start >= 1 << 32:
+        raise ValueError("不支持的 HEIF 盒结构")
+
+    def write(tmp_path):
+        with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+            remaining = layout.meta_start
+            while remaining:
+                chunk = src.read(min(remaining, COPY_CHUNK_SIZE))
+                if not chunk:
+                    raise ValueError("HEIF 文件不完整")
+                dst.write(chunk)
+                remaining -= len(chunk)
+            dst.write(new_meta)
+            src.seek(meta_end)
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            dst.write(struct.pack(">I4s", 8 + len(payload), b"mdat"))
+            dst.write(payload)
+            if fix_last_box:
+                dst.seek(last_start + (growth if last_start >= meta_end else 0))
+                dst.write(struct.pack(">I", last_end - last_start))
+
+    atomic_write(dest_path, write, fsync=fsync, preserve_from=preserve_from)
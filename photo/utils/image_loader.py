@@ -0,0 +1,161 @@
+from PyQt5.QtCore import QObject, QRunnable, QSize, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QImage, QImageReader
+
+from utils.catalog import get_catalog
+from utils.exif_utils import load_exif_thumbnail, load_preview_image, read_exif_info, resolve_location_name
+from utils.thumbnail_cache import get_thumbnail_store
+
+
+class ImageLoader(QObject):
+    """
+    后台图片加载器。
+
+    每次加载分为内嵌缩略图、预览解码、EXIF 读取和地名解析四个任务，在 QThreadPool 中独立执行，
+    每完成一个阶段就通过信号把结果交给界面线程。预览按显示区域大小解码，
+    完整分辨率图像只在图片视图需要时通过 request_full_image 解码。每次加载都有递增的编号，
+    开始新的加载后，旧加载中尚未执行或尚未返回的任务会被丢弃。
+    """
+    thumbnail_ready = pyqtSignal(int, QImage)   # 加载编号, EXIF 内嵌缩略图
+    preview_ready = pyqtSignal(int, QImage)     # 加载编号, 预览图像
+    full_image_ready = pyqtSignal(int, QImage)  # 加载编号, 完整分辨率图像
+    exif_ready = pyqtSignal(int, object)        # 加载编号, read_exif_info 的结果
+    location_ready = pyqtSignal(int, str)       # 加载编号, 地名
+    picked_location_ready = pyqtSignal(int, object)     # 加载编号, 地图选点的 (纬度, 经度, 地名)
+    failed = pyqtSignal(int, str, str)          # 加载编号, 阶段名称, 错误信息
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pool = QThreadPool(self)
+        self.generation = 0
+        self.image_path = None
+        self.full_requested = False
+        # EXIF 读取完成后再提交地名解析任务
+        self.exif_ready.connect(self._on_exif_ready)
+
+    def load(self, image_path, preview_size):
+        """
+        开始加载图片，并取消之前尚未完成的加载。
+
+        参数：
+            image_path (str): 图片的文件路径。
+            preview_size (QSize): 预览区域大小（物理像素）。
+
+        返回：
+            int: 本次加载的编号。
+        """
+        self.generation += 1
+        self.pool.clear()  # 移除尚未开始执行的旧任务
+        generation = self.generation
+        self.image_path = image_path
+        self.full_requested = False
+
+        # 内嵌缩略图只需读取文件头，最先提交以便立即显示
+        self._start(generation, "thumbnail", lambda: self._read_thumbnail(image_path), self.thumbnail_ready)
+        self._start(generation, "preview", lambda: self._decode_preview(image_path, preview_size), self.preview_ready)
+        self._start(generation, "exif", lambda: self._read_info(image_path), self.exif_ready)
+        return generation
+
+    def request_full_image(self):
+        """为图片视图解码当前图片的完整分辨率图像，每次加载只解码一次"""
+        if self.image_path is None or self.full_requested:
+            return
+        self.full_requested = True
+        image_path = self.image_path
+        self._start(self.generation, "full", lambda: self._decode_full(image_path), self.full_image_ready)
+
+    def resolve_picked_location(self, latitude, longitude):
+        """
+        在后台解析地图选点的地名（没有网络时在线服务要等到超时，不能在界面线程中执行）。
+        之后打开了其他图片时结果会被丢弃。
+        """
+        self._start(self.generation, "picked_location",
+                    lambda: (latitude, longitude, resolve_location_name(latitude, longitude)),
+                    self.picked_location_ready)
+
+    def is_current(self, generation):
+        """判断加载编号是否仍是最新的一次加载"""
+        return generation == self.generation
+
+    def _start(self, generation, stage, func, signal):
+        """提交一个加载任务"""
+        self.pool.start(_LoadJob(self, generation, stage, func, signal))
+
+    def _read_thumbnail(self, image_path):
+        """读取 EXIF 内嵌缩略图"""
+        image = load_exif_thumbnail(image_path)
+        if image is None:
+            raise LookupError("没有内嵌缩略图")
+        return image
+
+    def _decode_preview(self, image_path, preview_size):
+        """
+        按预览区域大小解码（QImage 可以在后台线程中使用，QPixmap 不行）。
+        预览区域不超过最大缩略图尺寸时使用磁盘缩略图缓存，再次打开同一张图片只需读取 PNG。
+        """
+        store = get_thumbnail_store()
+        size = max(preview_size.width(), preview_size.height())
+        if store is not None and store.flavor_for(size) is not None:
+            image = store.get_or_create(image_path, size, lambda path, s: load_preview_image(path, QSize(s, s)))
+        else:
+            image = load_preview_image(image_path, preview_size)
+        if image is None:
+            raise ValueError("无法解码图片")
+        return image
+
+    def _decode_full(self, image_path):
+        """按原始分辨率解码"""
+        reader = QImageReader(image_path)
+        reader.setAutoTransform(True)
+        image = reader.read()
+        if image.isNull():
+            raise ValueError(reader.errorString())
+        return image
+
+    def _read_info(self, image_path):
+        """读取 EXIF 信息，元数据目录中有未过期的记录时直接使用"""
+        catalog = get_catalog()
+        if catalog is None:
+            return read_exif_info(image_path)
+        return catalog.get_or_parse(image_path)
+
+    def _resolve_location(self, image_path, latitude, longitude):
+        """解析地名并记录到元数据目录"""
+        location_name = resolve_location_name(latitude, longitude)
+        catalog = get_catalog()
+        if catalog is not None and location_name != "未知位置":
+            catalog.set_location_name(image_path, location_name)
+        return location_name
+
+    def _on_exif_ready(self, generation, info):
+        """有 GPS 坐标且目录中没有地名时提交地名解析任务"""
+        if info["Latitude"] is None or "LocationName" in info or not self.is_current(generation):
+            return
+        image_path, latitude, longitude = self.image_path, info["Latitude"], info["Longitude"]
+        self._start(generation, "location",
+                    lambda: self._resolve_location(image_path, latitude, longitude),
+                    self.location_ready)
+
+
+class _LoadJob(QRunnable):
+    """在线程池中执行的单个加载阶段"""
+
+    def __init__(self, loader, generation, stage, func, signal):
+        super().__init__()
+        self.loader = loader
+        self.generation = generation
+        self.stage = stage
+        self.func = func
+        self.signal = signal
+
+    def run(self):
+        # 已被新的加载取代，直接跳过
+        if not self.loader.is_current(self.generation):
+            return
+        try:
+            result = self.func()
+        except Exception as e:
+            if self.loader.is_current(self.generation):
+                self.loader.failed.emit(self.generation, self.stage, str(e))
+            return
+        if self.loader.is_current(self.generation):
+            self.signal.emit(self.generation, result)
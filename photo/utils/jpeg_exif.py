@@ -0,0 +1,254 @@
+import mmap
+import os
+import shutil
+import struct
+
+from utils.atomic_file import atomic_write
+
+# JPEG 标记
+SOI = b"\xff\xd8"
+APP0 = 0xE0
+APP1 = 0xE1
+SOS = 0xDA
+EOI = 0xD9
+
+EXIF_HEADER = b"Exif\x00\x00"
+
+# 无长度字段的独立标记（RST0-RST7、TEM）
+_STANDALONE_MARKERS = set(range(0xD0, 0xD8)) | {0x01}
+
+# 复制图像数据时使用的块大小
+COPY_CHUNK_SIZE = 1024 * 1024
+
+
+def is_jpeg(image_path):
+    """
+    通过文件头判断是否为 JPEG 文件。
+
+    参数：
+        image_path (str): 图片文件路径。
+
+    返回：
+        bool: 文件以 SOI 标记开头时返回 True。
+    """
+    try:
+        with open(image_path, "rb") as f:
+            return f.read(2) == SOI
+    except OSError:
+        return False
+
+
+def _check_tiff_header(tiff):
+    """检查 APP1 中 TIFF 头的字节序标记和魔数"""
+    return tiff[:4] in (b"II*\x00", b"MM\x00*")
+
+
+def read_jpeg_exif(image_path):
+    """
+    只扫描 JPEG 文件头，读取 APP1 段中的 EXIF 数据，不解码图像。
+
+    使用 mmap 按标记段跳转，遇到 SOS 即停止，因此只会访问文件开头的几 KB 数据。
+
+    参数：
+        image_path (str): JPEG 文件路径。
+
+    返回：
+        bytes: 以 b"Exif\x00\x00" 开头的 EXIF 数据；文件中没有 EXIF 时返回 None。
+
+    异常：
+        ValueError: 文件不是有效的 JPEG。
+    """
+    with open(image_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 4:
+            raise ValueError("不是有效的 JPEG 文件")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:2] != SOI:
+                raise ValueError("不是有效的 JPEG 文件")
+
+            size = len(mm)
+            pos = 2
+            while pos + 4 <= size:
+                if mm[pos] != 0xFF:
+                    raise ValueError(f"JPEG 标记无效（偏移 {pos}）")
+                marker = mm[pos + 1]
+                if marker == 0xFF:  # 填充字节
+                    pos += 1
+                    continue
+                if marker in (SOS, EOI):
+                    return None
+                if marker in _STANDALONE_MARKERS:
+                    pos += 2
+                    continue
+
+                length = struct.unpack(">H", mm[pos + 2:pos + 4])[0]
+                if marker == APP1 and mm[pos + 4:pos + 10] == EXIF_HEADER:
+                    payload = mm[pos + 4:pos + 2 + length]
+                    if _check_tiff_header(payload[len(EXIF_HEADER):]):
+                        return payload
+                pos += 2 + length
+    return None
+
+
+# 帧起始标记 SOF0-SOF15（不含 DHT、JPG、DAC）
+_SOF_MARKERS = set(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def read_jpeg_size(image_path):
+    """
+    从 SOF 段读取 JPEG 图像的宽和高，不解码图像。
+
+    返回：
+        tuple: (宽, 高)，找不到 SOF 段时返回 None。
+    """
+    with open(image_path, "rb") as f:
+        if os.fstat(f.fileno()).st_size < 4:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:2] != SOI:
+                return None
+            size = len(mm)
+            pos = 2
+            while pos + 4 <= size:
+                if mm[pos] != 0xFF:
+                    return None
+                marker = mm[pos + 1]
+                if marker == 0xFF:
+                    pos += 1
+                    continue
+                if marker in (SOS, EOI):
+                    return None
+                if marker in _STANDALONE_MARKERS:
+                    pos += 2
+                    continue
+                length = struct.unpack(">H", mm[pos + 2:pos + 4])[0]
+                if marker in _SOF_MARKERS and pos + 9 <= size:
+                    height, width = struct.unpack(">HH", mm[pos + 5:pos + 9])
+                    return width, height
+                pos += 2 + length
+    return None
+
+
+def _read_header_segments(f):
+    """
+    从文件头开始读取 SOS 之前的所有标记段。
+
+    参数：
+        f (file): 以二进制方式打开的 JPEG 文件，位于文件开头。
+
+    返回：
+        tuple: (段列表, SOS 标记的偏移)。段列表元素为 (marker, 完整段字节)。
+
+    异常：
+        ValueError: 文件不是有效的 JPEG。
+    """
+    if f.read(2) != SOI:
+        raise ValueError("不是有效的 JPEG 文件")
+
+    segments = []
+    while True:
+        offset = f.tell()
+        prefix = f.read(1)
+        if not prefix:
+            raise ValueError("JPEG 文件在 SOS 之前结束")
+        if prefix != b"\xff":
+            raise ValueError(f"JPEG 标记无效（偏移 {offset}）")
+
+        marker = f.read(1)
+        # 标记前允许有填充的 0xFF
+        while marker == b"\xff":
+            marker = f.read(1)
+        if not marker:
+            raise ValueError("JPEG 文件在 SOS 之前结束")
+        marker = marker[0]
+
+        if marker == SOS:
+            return segments, offset
+        if marker == EOI:
+            raise ValueError("JPEG 文件缺少图像数据")
+        if marker in _STANDALONE_MARKERS:
+            segments.append((marker, b"\xff" + bytes([marker])))
+            continue
+
+        length_bytes = f.read(2)
+        if len(length_bytes) != 2:
+            raise ValueError("JPEG 标记段被截断")
+        length = struct.unpack(">H", length_bytes)[0]
+        payload = f.read(length - 2)
+        if len(payload) != length - 2:
+            raise ValueError("JPEG 标记段被截断")
+        segments.append((marker, b"\xff" + bytes([marker]) + length_bytes + payload))
+
+
+def _is_exif_segment(marker, segment):
+    """判断标记段是否为 APP1 EXIF 段（排除同为 APP1 的 XMP 段）"""
+    return marker == APP1 and segment[4:10] == EXIF_HEADER
+
+
+def build_exif_segment(exif_bytes):
+    """
+    将 piexif.dump 生成的 EXIF 字节封装为完整的 APP1 标记段。
+
+    参数：
+        exif_bytes (bytes): 以 b"Exif\\x00\\x00" 开头的 EXIF 数据。
+
+    返回：
+        bytes: APP1 标记段。
+
+    异常：
+        ValueError: EXIF 数据超出单个 APP1 段的容量。
+    """
+    if not exif_bytes.startswith(EXIF_HEADER):
+        exif_bytes = EXIF_HEADER + exif_bytes
+    length = len(exif_bytes) + 2
+    if length > 0xFFFF:
+        raise ValueError("EXIF 数据过大，无法写入单个 APP1 段")
+    return b"\xff" + bytes([APP1]) + struct.pack(">H", length) + exif_bytes
+
+
+def write_jpeg_exif(src_path, dest_path, exif_bytes, fsync=False, preserve_from=None):
+    """
+    以无损方式替换 JPEG 文件中的 EXIF 信息。
+
+    只重写 SOS 之前的文件头：原有 APP1 EXIF 段被原位替换，没有时插入到 SOI（以及 JFIF APP0）
+    之后，其余标记段和压缩图像数据按原样复制，不做解码和重新编码。
+
+    参数：
+        src_path (str): 源 JPEG 文件路径。
+        dest_path (str): 输出文件路径，可以与源文件相同。
+        exif_bytes (bytes): piexif.dump 生成的 EXIF 数据。
+        fsync (bool): 替换前把新文件刷到磁盘。
+        preserve_from (str, 可选): 保留该文件的权限和修改时间。
+
+    异常：
+        ValueError: 源文件不是有效的 JPEG。
+    """
+    exif_segment = build_exif_segment(exif_bytes)
+
+    def write(tmp_path):
+        with open(src_path, "rb") as src, open(tmp_path, "wb") as dst:
+            segments, sos_offset = _read_header_segments(src)
+
+            # 已有 EXIF 段时原位替换，否则插入到 SOI 和 JFIF APP0 之后
+            has_exif = any(_is_exif_segment(m, seg) for m, seg in segments)
+
+            dst.write(SOI)
+            inserted = False
+            for marker, segment in segments:
+                if _is_exif_segment(marker, segment):
+                    if not inserted:
+                        dst.write(exif_segment)
+                        inserted = True
+                    continue  # 丢弃多余的 EXIF 段
+                if not inserted and not has_exif and marker != APP0:
+                    dst.write(exif_segment)
+                    inserted = True
+                dst.write(segment)
+            if not inserted:
+                dst.write(exif_segment)
+
+            # 从 SOS 开始按原样复制压缩图像数据
+            src.seek(sos_offset)
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+
+    # 先写入同目录的临时文件再替换，源文件与目标文件相同时也不会被截断
+    atomic_write(dest_path, write, fsync=fsync, preserve_from=preserve_from)
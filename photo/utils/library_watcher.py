@@ -0,0 +1,161 @@
+import os
+import time
+
+from PyQt5.QtCore import QFileSystemWatcher, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+
+from utils.catalog import Catalog, parse_file
+from utils.folder_scanner import IMAGE_EXTENSIONS, iter_image_files
+
+
+class LibraryWatcher(QObject):
+    """
+    监视已导入的图片目录，只重新解析新增、修改和删除的文件。
+
+    目录变化事件（Linux 上为 inotify）先收集起来，在短时间内没有新事件时统一处理，
+    复制整张存储卡这类连续变化会合并为少数几次批量更新。处理在后台线程中进行，
+    结果写入元数据目录后通过 changed 信号通知界面。
+
+    已知的目录单独记录（不根据元数据目录中有没有记录来判断），只有新出现的子目录才会被完整遍历，
+    只包含 RAW、附属文件的子目录和空目录不会在每次变化时被重新遍历。
+    """
+    changed = pyqtSignal(list, list, list)      # 新增路径, 修改路径, 删除路径
+
+    def __init__(self, catalog, parent=None, debounce_ms=500, max_delay_ms=3000):
+        super().__init__(parent)
+        self.catalog = catalog
+        self.max_delay = max_delay_ms / 1000
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(1)  # 同一时间只处理一批，保证更新顺序
+        self._dirty = set()
+        self._known_directories = set()
+        self._first_event = None
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(debounce_ms)
+        self._timer.timeout.connect(self._flush)
+        self._signals = _SyncSignals()
+        self._signals.synced.connect(self._on_synced)
+
+    def watch(self, root):
+        """监视目录及其所有子目录"""
+        directories = [root]
+        for directory, subdirs, _ in os.walk(root):
+            subdirs[:] = [d for d in subdirs if not d.startswith('.')]
+            directories.extend(os.path.join(directory, d) for d in subdirs)
+        self._known_directories.update(os.path.normpath(d) for d in directories)
+        self._add_directories(directories)
+
+    def unwatch_all(self):
+        """停止监视所有目录"""
+        directories = self.watcher.directories()
+        if directories:
+            self.watcher.removePaths(directories)
+        self._known_directories.clear()
+
+    def _add_directories(self, directories):
+        watched = set(self.watcher.directories())
+        new = [d for d in directories if d not in watched and os.path.isdir(d)]
+        if new:
+            # 系统的监视数量有上限（如 Linux 的 fs.inotify.max_user_watches），失败的目录会被返回
+            failed = self.watcher.addPaths(new)
+            if failed:
+                print(f"警告: {len(failed)} 个目录无法监视")
+
+    def _on_directory_changed(self, directory):
+        self._dirty.add(directory)
+        now = time.monotonic()
+        if self._first_event is None:
+            self._first_event = now
+        # 持续有事件时不无限推迟，超过最大延迟后立即处理
+        if now - self._first_event < self.max_delay or not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        directories = self._dirty
+        self._dirty = set()
+        self._first_event = None
+        if directories:
+            # 传入已知目录的快照，后台线程不访问界面线程中的集合
+            self.pool.start(_SyncJob(self.catalog, directories, frozenset(self._known_directories), self._signals))
+
+    def _on_synced(self, added, modified, removed, new_directories, removed_directories):
+        for gone in removed_directories:
+            # 目录被删除后其子目录也不再存在，之后重新创建时按新目录处理
+            prefix = gone + os.sep
+            self._known_directories = {d for d in self._known_directories if d != gone and not d.startswith(prefix)}
+        self._known_directories.update(os.path.normpath(d) for d in new_directories)
+        self._add_directories(new_directories)
+        if added or modified or removed:
+            self.changed.emit(added, modified, removed)
+
+
+class _SyncSignals(QObject):
+    synced = pyqtSignal(list, list, list, list, list)  # 新增, 修改, 删除, 新目录, 已删除的目录
+
+
+class _SyncJob(QRunnable):
+    """在后台线程中比对变化的目录并更新元数据目录"""
+
+    def __init__(self, catalog, directories, known_directories, signals):
+        super().__init__()
+        self.catalog = catalog
+        self.directories = directories
+        self.known_directories = known_directories
+        self.signals = signals
+
+    def run(self):
+        added, modified, removed, new_directories, removed_directories = [], [], [], [], []
+        changed_files = []
+
+        for directory in self.directories:
+            if not os.path.isdir(directory):
+                # 整个目录被删除，移除其下的全部记录
+                removed.extend(self.catalog.file_states(directory))
+                removed_directories.append(os.path.normpath(directory))
+                continue
+
+            known = self.catalog.directory_states(directory)
+            present = set()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name.startswith('.'):
+                                    continue
+                                if os.path.normpath(entry.path) not in self.known_directories:
+                                    # 新目录（例如复制进来的整个文件夹），记录其下的所有子目录
+                                    for image_path, stat in iter_image_files(entry.path, new_directories.append):
+                                        changed_files.append((image_path, stat, added))
+                                continue
+                            if not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                                continue
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        key = Catalog.normalize_path(entry.path)
+                        present.add(key)
+                        state = known.get(key)
+                        if state is None:
+                            changed_files.append((entry.path, stat, added))
+                        elif state != (stat.st_size, stat.st_mtime_ns):
+                            changed_files.append((entry.path, stat, modified))
+            except OSError:
+                continue
+            removed.extend(path for path in known if path not in present)
+
+        records = []
+        for image_path, stat, bucket in changed_files:
+            try:
+                records.append(Catalog.make_record(image_path, parse_file(image_path), stat))
+                bucket.append(image_path)
+            except Exception as e:
+                print(f"错误，{image_path} 解析失败：{e}")
+        if records:
+            self.catalog.store_records(records)
+        if removed:
+            self.catalog.remove(removed)
+
+        self.signals.synced.emit(added, modified, removed, sorted(set(new_directories)), removed_directories)
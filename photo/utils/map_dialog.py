@@ -1,10 +1,35 @@
+import os
+
 from PyQt5 import QtWidgets, QtWebEngineWidgets, QtWebChannel, QtCore
 from PyQt5.QtWidgets import QMessageBox
-import requests
+
+from utils.geocoding import OFFLINE_ENV
+from utils.place_search_worker import PlaceSearchWorker
+from utils.tile_cache import MAX_ZOOM
+
+# 地图后端：amap 使用高德在线地图，tiles 使用本地瓦片缓存（离线可用），可通过环境变量 EXIF_EDITOR_MAP 指定
+MAP_BACKEND_ENV = "EXIF_EDITOR_MAP"
+OFFLINE_MAP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "res", "offline_map.html")
+
+# 输入联想：停止输入 300 毫秒后再搜索，关键词至少 2 个字符
+SUGGEST_DELAY_MS = 300
+SUGGEST_MIN_LENGTH = 2
+
+
+def map_backend():
+    """当前使用的地图后端，默认在线地图，设置 EXIF_EDITOR_OFFLINE=1 时使用本地瓦片"""
+    backend = os.environ.get(MAP_BACKEND_ENV)
+    if backend in ("amap", "tiles"):
+        return backend
+    return "tiles" if os.environ.get(OFFLINE_ENV) == "1" else "amap"
+
 
 class MapDialog(QtWidgets.QDialog):
     """
     地图选点对话框，允许用户在地图上点击选择坐标或通过搜索地名定位。
+
+    对话框创建后一直保留并重复使用，地图页面只加载一次，再次打开时保留上次的中心和缩放级别。
+    两种地图页面提供相同的脚本接口：showPosition、clearPosition 和 selectedPosition。
     """
     coordinates_selected = QtCore.pyqtSignal(float, float)
 
@@ -25,6 +50,9 @@ class MapDialog(QtWidgets.QDialog):
         self.web_view.page().setWebChannel(self.channel)
         self.channel.registerObject("qt", self)
 
+        # 地图脚本和 WebChannel 都初始化完成前，要执行的脚本先排队
+        self._map_ready = False
+        self._pending_scripts = []
         self.load_map()
         layout.addWidget(self.web_view)
 
@@ -47,6 +75,7 @@ class MapDialog(QtWidgets.QDialog):
             }
         """)
         self.search_button.clicked.connect(self.search_location)
+        self.search_bar.returnPressed.connect(self._on_return_pressed)
         search_layout.addWidget(self.search_bar)
         search_layout.addWidget(self.search_button)
 
@@ -69,6 +98,24 @@ class MapDialog(QtWidgets.QDialog):
         self.select_button.clicked.connect(self.select_coordinates)
         layout.addWidget(self.select_button)
 
+        # 地名搜索在后台线程中执行；输入联想的结果显示在搜索框下方
+        self.searcher = PlaceSearchWorker(parent=self)
+        self.searcher.results_ready.connect(self._on_search_results)
+        self.searcher.failed.connect(self._on_search_failed)
+        self._locate_request = None     # 点击搜索时的搜索编号，结果返回后定位到第一个地点
+        self._suggestions = {}          # 联想文本 -> Place
+        self.suggestion_model = QtCore.QStringListModel(self)
+        self.completer = QtWidgets.QCompleter(self.suggestion_model, self)
+        self.completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        self.completer.activated[str].connect(self._on_suggestion_activated)
+        self.search_bar.setCompleter(self.completer)
+        self._suggest_timer = QtCore.QTimer(self)
+        self._suggest_timer.setSingleShot(True)
+        self._suggest_timer.setInterval(SUGGEST_DELAY_MS)
+        self._suggest_timer.timeout.connect(self._request_suggestions)
+        # 只响应用户输入，程序设置地名时不触发联想
+        self.search_bar.textEdited.connect(lambda _: self._suggest_timer.start())
+
     @QtCore.pyqtSlot(float, float)
     def coordinatesSelected(self, lon, lat):
         """
@@ -77,6 +124,32 @@ class MapDialog(QtWidgets.QDialog):
         print(f"选取坐标: 经度={lon}, 纬度={lat}")
         self.coordinates_selected.emit(lon, lat)
 
+    @QtCore.pyqtSlot()
+    def mapReady(self):
+        """
+        地图和 WebChannel 都初始化完成后由 JavaScript 调用，执行排队的脚本。
+        """
+        self._map_ready = True
+        for script in self._pending_scripts:
+            self.web_view.page().runJavaScript(script)
+        self._pending_scripts.clear()
+
+    def run_map_script(self, script):
+        """在地图页面中执行脚本，地图尚未加载完成时等加载完成后再执行"""
+        if self._map_ready:
+            self.web_view.page().runJavaScript(script)
+        else:
+            self._pending_scripts.append(script)
+
+    def show_position(self, lon=None, lat=None):
+        """
+        把标记移到照片的坐标并居中显示，保留当前缩放级别；没有坐标时移除标记，地图停留在上次的位置。
+        """
+        if lon is None or lat is None:
+            self.run_map_script("clearPosition();")
+        else:
+            self.run_map_script(f"showPosition({lon}, {lat});")
+
     @QtCore.pyqtSlot()
     def closeDialog(self):
         """
@@ -85,6 +158,40 @@ class MapDialog(QtWidgets.QDialog):
         self.close()
 
     def load_map(self):
+        """
+        按地图后端加载地图页面，本地瓦片服务不可用时使用高德地图。
+        """
+        if map_backend() == "tiles" and self.load_tile_map():
+            return
+        self.load_amap()
+
+    def load_tile_map(self, center=(121.4737, 31.2304), zoom=12):
+        """
+        加载本地瓦片地图页面，瓦片由进程内的瓦片服务提供（见 utils.tile_server）。
+
+        返回：
+            bool: 瓦片服务不可用时返回 False。
+        """
+        from utils.tile_server import get_tile_server
+
+        server = get_tile_server()
+        if server is None:
+            return False
+        with open(OFFLINE_MAP_PATH, encoding="utf-8") as f:
+            html = f.read()
+        replacements = {
+            "%TILE_URL%": server.tile_url_template,
+            "%MAX_ZOOM%": str(MAX_ZOOM),
+            "%ZOOM%": str(zoom),
+            "%CENTER_LNG%": str(center[0]),
+            "%CENTER_LAT%": str(center[1]),
+        }
+        for placeholder, value in replacements.items():
+            html = html.replace(placeholder, value)
+        self.web_view.setHtml(html)
+        return True
+
+    def load_amap(self):
         """
         加载高德地图 HTML 页面，嵌入到 WebEngineView 中。
         """
@@ -111,6 +218,31 @@ class MapDialog(QtWidgets.QDialog):
             <script>
                 var map;
                 var marker;
+                var notified = false;
+
+                // 地图和 WebChannel 都就绪后通知 Python 端
+                function notifyReady() {{
+                    if (!notified && map && window.qt && typeof window.qt.mapReady === 'function') {{
+                        notified = true;
+                        window.qt.mapReady();
+                    }}
+                }}
+
+                function showPosition(lng, lat) {{
+                    marker.setPosition([lng, lat]);
+                    map.add(marker);
+                    map.setCenter([lng, lat]);
+                }}
+
+                function clearPosition() {{
+                    map.remove(marker);
+                    marker = new AMap.Marker();
+                }}
+
+                function selectedPosition() {{
+                    var pos = marker.getPosition();
+                    return pos ? {{lng: pos.lng, lat: pos.lat}} : null;
+                }}
 
                 function initMap() {{
                     // 初始化地图
@@ -134,11 +266,13 @@ class MapDialog(QtWidgets.QDialog):
                             console.error("qt.coordinatesSelected 方法不可用");
                         }}
                     }});
+                    notifyReady();
                 }}
 
                 // 初始化 Qt WebChannel
                 new QWebChannel(qt.webChannelTransport, function(channel) {{
                     window.qt = channel.objects.qt;
+                    notifyReady();
                 }});
             </script>
         </body>
@@ -148,38 +282,75 @@ class MapDialog(QtWidgets.QDialog):
 
     def search_location(self):
         """
-        搜索地名并在地图上定位。
+        搜索地名，结果返回后在地图上定位到第一个地点（不阻塞对话框）。
         """
         query = self.search_bar.text().strip()
         if query:
-            api_key = "3ae19a6382bf7b93aff090e8691e62b2"  # 替换为实际的高德地图API密钥
-            url = f"https://restapi.amap.com/v3/place/text?key={api_key}&keywords={query}&city=""&output=JSON"
-            response = requests.get(url)
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("pois"):
-                    location = data["pois"][0]["location"]
-                    lon, lat = map(float, location.split(","))
-
-                    self.web_view.page().runJavaScript(f"""
-                        map.setCenter([{lon}, {lat}]);
-                        if (!marker) {{
-                            marker = new AMap.Marker();
-                        }}
-                        marker.setPosition([{lon}, {lat}]);
-                        map.add(marker);
-                    """)
-                else:
-                    QMessageBox.warning(self, "提示", "未找到相关位置！")
+            self._suggest_timer.stop()
+            self.completer.popup().hide()
+            self._locate_request = self.searcher.search(query)
+            self.search_button.setEnabled(False)
+
+    def _on_return_pressed(self):
+        # 在联想列表中按回车时先触发 returnPressed 再触发 activated，由 activated 处理
+        if self.completer.popup().isVisible():
+            return
+        self.search_location()
+
+    def _request_suggestions(self):
+        """输入停顿后搜索联想结果"""
+        query = self.search_bar.text().strip()
+        if len(query) >= SUGGEST_MIN_LENGTH:
+            self._locate_request = None
+            self.search_button.setEnabled(True)
+            self.searcher.search(query)
+
+    def _on_search_results(self, generation, query, places):
+        if not self.searcher.is_current(generation):
+            return
+        self._suggestions = {}
+        for place in places:
+            text = f"{place.name}（{place.address}）" if place.address else place.name
+            self._suggestions.setdefault(text, place)
+        self.suggestion_model.setStringList(list(self._suggestions))
+
+        if generation == self._locate_request:
+            self._locate_request = None
+            self.search_button.setEnabled(True)
+            if places:
+                self.show_place(places[0])
             else:
-                QMessageBox.critical(self, "错误", "地图API请求失败！")
+                QMessageBox.warning(self, "提示", "未找到相关位置！")
+        elif places and self.search_bar.hasFocus() and self.search_bar.text().strip() == query:
+            self.completer.complete()
+
+    def _on_search_failed(self, generation, query, error):
+        if generation != self._locate_request:
+            return  # 联想失败不打扰用户
+        self._locate_request = None
+        self.search_button.setEnabled(True)
+        QMessageBox.critical(self, "错误", f"地图API请求失败！{error}")
+
+    def _on_suggestion_activated(self, text):
+        place = self._suggestions.get(text)
+        if place is not None:
+            self._suggest_timer.stop()
+            self._locate_request = None
+            self.search_button.setEnabled(True)
+            # 搜索框会在本信号之后填入带地址的联想文本，稍后再换成地名
+            QtCore.QTimer.singleShot(0, lambda: self.search_bar.setText(place.name))
+            self.show_place(place)
+
+    def show_place(self, place):
+        """把标记移到搜索到的地点并居中显示"""
+        self.run_map_script(f"showPosition({place.longitude}, {place.latitude});")
 
     def select_coordinates(self):
         """
         从 JavaScript 获取当前选定的坐标，判断是否已选择坐标。
         """
         self.web_view.page().runJavaScript("""
-            var pos = marker.getPosition();
+            var pos = selectedPosition();
             if (pos) {
                 // 调用 PyQt 注册的 method 传递坐标
                 window.qt.coordinatesSelected(pos.lng, pos.lat);
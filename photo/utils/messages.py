@@ -9,6 +9,7 @@ FILE_FAILURE = "警告: 文件加载失败，请检查格式！"
 EXIF_EMPTY = "提示：EXIF 数据为空, 已自动新建"
 IMAGE_SHOW_FAILURE= "错误: 图片显示失败"
 EXIF_ERROR = "错误，无法加载图片信息：{e}"
+LOCATION_RESOLVING = "正在获取地名..."
 
 VIEW_EDITOR = "切换至元数据视图"
 VIEW_PHOTO = "切换至图像视图"
@@ -21,4 +22,26 @@ SAVE_SUCCESS = "保存成功！保存至{path}"
 SAVE_CANCELLED = "提示: 取消保存!"
 SAVE_ERROR = "错误，保存失败：{e}"
 POSITION_SELECTED = "已选择地点：{position}"
-GPS_ERROR = "错误，无法获取GPS信息：{e}"
\ No newline at end of file
+GPS_ERROR = "错误，无法获取GPS信息：{e}"
+
+BATCH_START = "开始批量处理 {total} 个文件..."
+BATCH_PROGRESS = "批量处理进度：{done}/{total}"
+BATCH_FILE_ERROR = "错误，{path} 处理失败：{e}"
+BATCH_FINISHED = "批量处理完成：成功 {ok} 个，失败 {failed} 个"
+BATCH_CANCELLING = "提示: 正在取消批量处理..."
+BATCH_CANCELLED = "提示: 批量处理已取消，成功 {ok} 个，失败 {failed} 个"
+BATCH_ERROR = "错误，批量处理中断：{e}"
+GEOTAG_TRACK_LOADED = "已读取 {count} 个轨迹点"
+GEOTAG_NO_POINTS = "错误: GPX 文件中没有带时间的轨迹点"
+
+SCAN_START = "开始导入文件夹：{path}"
+SCAN_PROGRESS = "导入中：{stats}"
+SCAN_FINISHED = "导入完成：{stats}"
+SCAN_CANCELLING = "提示: 正在取消导入..."
+SCAN_ERROR = "错误，导入中断：{e}"
+SCAN_INTERRUPTED = "提示: 导入未完成：{stats}"
+CATALOG_ERROR = "错误: 元数据目录不可用"
+LIBRARY_WATCHING = "正在监视文件夹变化：{path}"
+LIBRARY_CHANGED = "文件夹已同步：新增 {added} 个，修改 {modified} 个，删除 {removed} 个"
+CURRENT_FILE_REMOVED = "警告: 当前打开的图片已被删除"
+BROWSE_FOLDER = "浏览文件夹：{path}"
@@ -0,0 +1,193 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from utils.geocoding import DEFAULT_PLACES_PATH, OFFLINE_ENV, PLACES_ENV, _read_places
+
+# 高德地图 Web 服务密钥，可通过环境变量 EXIF_EDITOR_AMAP_KEY 替换
+AMAP_KEY_ENV = "EXIF_EDITOR_AMAP_KEY"
+DEFAULT_AMAP_KEY = "3ae19a6382bf7b93aff090e8691e62b2"
+AMAP_PLACE_URL = "https://restapi.amap.com/v3/place/text"
+
+# 搜索结果：名称、地址（可能为空）、经度、纬度
+Place = namedtuple("Place", "name address longitude latitude")
+
+
+class PlaceSearch:
+    """
+    地名搜索后端接口：根据关键词返回匹配的地点。
+    """
+
+    def search(self, query, limit=10):
+        """
+        参数：
+            query (str): 关键词。
+            limit (int): 最多返回的结果数。
+
+        返回：
+            list: Place 列表，按匹配程度排序，没有结果时为空列表。
+        """
+        raise NotImplementedError
+
+
+class AMapPlaceSearch(PlaceSearch):
+    """
+    通过高德地图关键字搜索接口查询地点（需要网络）。
+
+    每个线程使用自己的 requests.Session 复用 HTTPS 连接；连接和读取都有超时，
+    网络不好时很快失败，不会一直等待。
+    """
+
+    def __init__(self, api_key=None, timeout=(3.05, 5)):
+        self.api_key = api_key or os.environ.get(AMAP_KEY_ENV) or DEFAULT_AMAP_KEY
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests  # 只有使用在线搜索时才导入
+
+            session = requests.Session()
+            self._local.session = session
+        return session
+
+    def search(self, query, limit=10):
+        params = {"key": self.api_key, "keywords": query, "offset": limit, "page": 1, "output": "JSON"}
+        response = self._session().get(AMAP_PLACE_URL, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        data = response.json()
+        if data.get("status") != "1":
+            raise OSError(f"地图API请求失败：{data.get('info', '未知错误')}")
+        places = []
+        for poi in data.get("pois") or []:
+            try:
+                longitude, latitude = map(float, poi["location"].split(","))
+            except (KeyError, AttributeError, ValueError):
+                continue
+            # 没有地址时高德返回空列表
+            address = poi.get("address") if isinstance(poi.get("address"), str) else ""
+            places.append(Place(poi.get("name", ""), address, longitude, latitude))
+        return places[:limit]
+
+
+class GazetteerPlaceSearch(PlaceSearch):
+    """
+    基于本地地名数据集的离线搜索（与离线逆地理编码使用同一份数据集）。
+
+    名称以关键词开头的地点排在前面，其次是包含关键词的地点。数据集在第一次搜索时加载。
+    """
+
+    def __init__(self, places_path=DEFAULT_PLACES_PATH):
+        self.places_path = places_path
+        self._places = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """数据集文件是否存在"""
+        return bool(self.places_path) and os.path.isfile(self.places_path)
+
+    def _load(self):
+        """加载数据集（线程安全，只执行一次）"""
+        with self._lock:
+            if self._places is not None:
+                return
+            places = []
+            if self.available():
+                for name, latitude, longitude in _read_places(self.places_path):
+                    places.append((name.casefold(), Place(name, "", longitude, latitude)))
+            self._places = places
+
+    def search(self, query, limit=10):
+        if self._places is None:
+            self._load()
+        key = query.strip().casefold()
+        if not key:
+            return []
+        prefix, contains = [], []
+        for folded, place in self._places:
+            if folded.startswith(key):
+                prefix.append(place)
+                if len(prefix) >= limit:
+                    break
+            elif len(contains) < limit and key in folded:
+                contains.append(place)
+        return (prefix + contains)[:limit]
+
+
+class ChainPlaceSearch(PlaceSearch):
+    """
+    依次尝试多个后端，返回第一个有结果的后端的结果；所有后端都出错时抛出最后一个异常。
+    """
+
+    def __init__(self, backends):
+        self.backends = list(backends)
+
+    def search(self, query, limit=10):
+        error = None
+        for backend in self.backends:
+            try:
+                places = backend.search(query, limit)
+            except Exception as e:
+                print(f"地名搜索失败（{type(backend).__name__}）：{e}")
+                error = e
+                continue
+            if places:
+                return places
+        if error is not None:
+            raise error
+        return []
+
+
+class CachedPlaceSearch(PlaceSearch):
+    """
+    为后端增加内存中的结果缓存（LRU），同一关键词只查询一次；输入联想时反复出现的前缀可以直接返回。
+    """
+
+    def __init__(self, backend, max_entries=256):
+        self.backend = backend
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def search(self, query, limit=10):
+        key = (query.strip().casefold(), limit)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+        places = self.backend.search(query, limit)
+        with self._lock:
+            self._entries[key] = places
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return places
+
+
+_default_search = None
+_default_lock = threading.Lock()
+
+
+def get_place_search():
+    """
+    获取全局共享的地名搜索：未设置离线模式时优先使用高德搜索，本地数据集作为后备；
+    结果缓存在内存中。
+    """
+    global _default_search
+    with _default_lock:
+        if _default_search is None:
+            backends = []
+            if os.environ.get(OFFLINE_ENV) != "1":
+                backends.append(AMapPlaceSearch())
+            gazetteer = GazetteerPlaceSearch(os.environ.get(PLACES_ENV, DEFAULT_PLACES_PATH))
+            if gazetteer.available():
+                backends.append(gazetteer)
+            _default_search = CachedPlaceSearch(ChainPlaceSearch(backends))
+        return _default_search
+
+
+def set_place_search(search):
+    """替换全局地名搜索（例如只使用本地数据集）"""
+    global _default_search
+    with _default_lock:
+        _default_search = search
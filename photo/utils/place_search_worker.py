@@ -0,0 +1,67 @@
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from utils.place_search import get_place_search
+
+
+class PlaceSearchWorker(QObject):
+    """
+    在线程池中执行地名搜索，结果通过信号交给界面线程，网络请求不会阻塞对话框。
+
+    每次搜索都有递增的编号，开始新的搜索后，旧搜索尚未执行或尚未返回的结果会被丢弃，
+    输入联想时只显示最后一次输入的结果。
+
+    参数：
+        search (PlaceSearch, 可选): 搜索后端，默认为 get_place_search()。
+    """
+    results_ready = pyqtSignal(int, str, object)    # 搜索编号, 关键词, Place 列表
+    failed = pyqtSignal(int, str, str)              # 搜索编号, 关键词, 错误信息
+
+    def __init__(self, search=None, parent=None):
+        super().__init__(parent)
+        self.backend = search
+        self.pool = QThreadPool(self)
+        self.pool.setMaxThreadCount(2)
+        self.generation = 0
+
+    def search(self, query, limit=10):
+        """
+        提交一次搜索，并丢弃之前尚未开始的搜索。
+
+        返回：
+            int: 本次搜索的编号。
+        """
+        self.generation += 1
+        self.pool.clear()
+        if self.backend is None:
+            self.backend = get_place_search()
+        self.pool.start(_SearchJob(self, self.generation, self.backend, query, limit))
+        return self.generation
+
+    def is_current(self, generation):
+        """判断搜索编号是否仍是最新的一次搜索"""
+        return generation == self.generation
+
+
+class _SearchJob(QRunnable):
+    """在线程池中执行的单次搜索"""
+
+    def __init__(self, worker, generation, backend, query, limit):
+        super().__init__()
+        self.worker = worker
+        self.generation = generation
+        self.backend = backend
+        self.query = query
+        self.limit = limit
+
+    def run(self):
+        # 已被新的搜索取代，直接跳过
+        if not self.worker.is_current(self.generation):
+            return
+        try:
+            places = self.backend.search(self.query, self.limit)
+        except Exception as e:
+            if self.worker.is_current(self.generation):
+                self.worker.failed.emit(self.generation, self.query, str(e))
+            return
+        if self.worker.is_current(self.generation):
+            self.worker.results_ready.emit(self.generation, self.query, places)
@@ -0,0 +1,368 @@
+import os
+import threading
+from collections import OrderedDict
+
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QObject, QRunnable, QSize, Qt, QThreadPool, pyqtSignal
+from PyQt5.QtGui import QColor, QPixmap, QImage
+from PyQt5.QtWidgets import QDialog, QFileDialog, QHBoxLayout, QLabel, QListView, QPushButton, QVBoxLayout
+
+from utils.catalog import Catalog
+from utils.exif_utils import load_exif_thumbnail, load_preview_image
+from utils.folder_scanner import IMAGE_EXTENSIONS
+from utils.thumbnail_cache import get_thumbnail_store
+
+# 缩略图边长（物理像素）
+THUMBNAIL_SIZE = 128
+
+
+def list_image_files(directory):
+    """
+    列出目录（不含子目录）中的图片文件，按文件名排序。
+
+    返回：
+        list: 文件路径列表。
+    """
+    paths = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.name.lower().endswith(IMAGE_EXTENSIONS) and entry.is_file():
+                    paths.append(entry.path)
+            except OSError:
+                continue
+    paths.sort(key=lambda p: os.path.basename(p).lower())
+    return paths
+
+
+def decode_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """
+    解码缩略图：优先使用足够大的 EXIF 内嵌缩略图，否则按缩略图尺寸缩小解码。
+
+    返回：
+        QImage: 缩略图，解码失败时返回 None。可在后台线程中调用。
+    """
+    image = load_exif_thumbnail(image_path)
+    if image is not None and max(image.width(), image.height()) >= size:
+        return image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+    return load_preview_image(image_path, QSize(size, size))
+
+
+def load_thumbnail(image_path, size=THUMBNAIL_SIZE):
+    """
+    获取缩略图，优先读取磁盘缩略图缓存，没有时解码并写入缓存。
+
+    返回：
+        QImage: 缩略图，失败时返回 None。可在后台线程中调用。
+    """
+    store = get_thumbnail_store()
+    if store is None:
+        return decode_thumbnail(image_path, size)
+    return store.get_or_create(image_path, size, decode_thumbnail)
+
+
+class PixmapCache:
+    """
+    按像素占用限制大小的 QPixmap LRU 缓存。QPixmap 只能在界面线程中使用。
+
+    参数：
+        max_bytes (int): 缓存的最大字节数（按每像素 4 字节估算）。
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def get(self, key):
+        pixmap = self._items.get(key)
+        if pixmap is not None:
+            self._items.move_to_end(key)
+        return pixmap
+
+    def put(self, key, pixmap):
+        self.discard(key)
+        self._items[key] = pixmap
+        self._bytes += self._cost(pixmap)
+        while self._bytes > self.max_bytes and len(self._items) > 1:
+            _, evicted = self._items.popitem(last=False)
+            self._bytes -= self._cost(evicted)
+
+    def discard(self, key):
+        pixmap = self._items.pop(key, None)
+        if pixmap is not None:
+            self._bytes -= self._cost(pixmap)
+
+    def clear(self):
+        self._items.clear()
+        self._bytes = 0
+
+    @staticmethod
+    def _cost(pixmap):
+        return pixmap.width() * pixmap.height() * 4
+
+
+class ThumbnailModel(QAbstractListModel):
+    """
+    文件夹缩略图列表模型。
+
+    视图只对可见的行调用 data()，缩略图在第一次被请求时提交到线程池解码，
+    解码完成后放入 PixmapCache 并通知视图刷新该行。待解码的请求后进先出，
+    快速滚动时优先解码当前可见的缩略图，超出 max_pending 的旧请求直接丢弃，
+    之后再次滚动到这些行时会重新请求。
+    """
+    PathRole = Qt.UserRole + 1
+
+    def __init__(self, parent=None, thumbnail_size=THUMBNAIL_SIZE, cache=None, max_pending=256):
+        super().__init__(parent)
+        self.thumbnail_size = thumbnail_size
+        self.cache = cache if cache is not None else PixmapCache()
+        self.max_pending = max_pending
+        self.directory = None
+        self._paths = []
+        self._rows = {}
+        self._failed = set()
+        self._placeholder = QPixmap(thumbnail_size, thumbnail_size)
+        self._placeholder.fill(QColor(60, 60, 60))
+
+        # 以下状态在界面线程和解码线程之间共享，由锁保护
+        self._lock = threading.Lock()
+        self._pending = OrderedDict()
+        self._loading = set()
+        self._active_jobs = 0
+        self.generation = 0
+
+        self.pool = QThreadPool(self)
+        self._signals = _ThumbnailSignals()
+        self._signals.ready.connect(self._on_ready)
+        self._signals.failed.connect(self._on_failed)
+
+    def set_directory(self, directory):
+        """显示目录中的图片，取消上一个目录尚未开始的解码"""
+        paths = list_image_files(directory)
+        self.beginResetModel()
+        with self._lock:
+            self.generation += 1
+            self._pending.clear()
+            self._loading.clear()
+        self.directory = directory
+        self._paths = paths
+        self._failed.clear()
+        self._rebuild_rows()
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._paths)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._paths):
+            return None
+        image_path = self._paths[index.row()]
+        if role == Qt.DisplayRole:
+            return os.path.basename(image_path)
+        if role == Qt.DecorationRole:
+            pixmap = self.cache.get(image_path)
+            if pixmap is not None:
+                return pixmap
+            if image_path not in self._failed:
+                self._request(image_path)
+            return self._placeholder
+        if role == Qt.ToolTipRole or role == self.PathRole:
+            return image_path
+        return None
+
+    def path_at(self, row):
+        return self._paths[row]
+
+    def apply_changes(self, added, modified, removed):
+        """
+        根据文件夹监视的结果更新列表（路径为 LibraryWatcher.changed 的参数）。
+        """
+        if self.directory is None:
+            return
+        directory = Catalog.normalize_path(self.directory)
+
+        for image_path in modified:
+            row = self._rows.get(Catalog.normalize_path(image_path))
+            if row is not None:
+                path = self._paths[row]
+                self.cache.discard(path)
+                self._failed.discard(path)
+                index = self.index(row)
+                self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+        removed_rows = sorted((self._rows[key] for key in map(Catalog.normalize_path, removed) if key in self._rows),
+                              reverse=True)
+        for row in removed_rows:
+            self.beginRemoveRows(QModelIndex(), row, row)
+            self.cache.discard(self._paths.pop(row))
+            self.endRemoveRows()
+
+        new_paths = [p for p in added
+                     if os.path.dirname(Catalog.normalize_path(p)) == directory
+                     and Catalog.normalize_path(p) not in self._rows]
+        if new_paths:
+            first = len(self._paths)
+            self.beginInsertRows(QModelIndex(), first, first + len(new_paths) - 1)
+            self._paths.extend(new_paths)
+            self.endInsertRows()
+
+        if removed_rows or new_paths:
+            self._rebuild_rows()
+
+    def _rebuild_rows(self):
+        self._rows = {Catalog.normalize_path(p): row for row, p in enumerate(self._paths)}
+
+    def _request(self, image_path):
+        """加入待解码队列，空闲的解码任务不足时再提交一个"""
+        with self._lock:
+            if image_path in self._loading:
+                return
+            if image_path in self._pending:
+                self._pending.move_to_end(image_path)  # 重新可见，提前解码
+                return
+            self._pending[image_path] = None
+            while len(self._pending) > self.max_pending:
+                self._pending.popitem(last=False)
+            if self._active_jobs >= self.pool.maxThreadCount():
+                return
+            self._active_jobs += 1
+        self.pool.start(_ThumbnailJob(self))
+
+    def _next_request(self):
+        """
+        解码线程取出最近请求的路径。
+
+        返回：
+            tuple: (目录编号, 路径)；队列为空时返回 None，任务随之结束。
+        """
+        with self._lock:
+            if not self._pending:
+                self._active_jobs -= 1
+                return None
+            image_path, _ = self._pending.popitem(last=True)
+            self._loading.add(image_path)
+            return self.generation, image_path
+
+    def _on_ready(self, generation, image_path, image):
+        with self._lock:
+            self._loading.discard(image_path)
+        if generation != self.generation:
+            return
+        self.cache.put(image_path, QPixmap.fromImage(image))
+        self._notify(image_path)
+
+    def _on_failed(self, generation, image_path):
+        with self._lock:
+            self._loading.discard(image_path)
+        if generation != self.generation:
+            return
+        self._failed.add(image_path)
+
+    def _notify(self, image_path):
+        row = self._rows.get(Catalog.normalize_path(image_path))
+        if row is not None:
+            index = self.index(row)
+            self.dataChanged.emit(index, index, [Qt.DecorationRole])
+
+
+class _ThumbnailSignals(QObject):
+    ready = pyqtSignal(int, str, QImage)    # 目录编号, 路径, 缩略图
+    failed = pyqtSignal(int, str)           # 目录编号, 路径
+
+
+class _ThumbnailJob(QRunnable):
+    """在线程池中不断取出最近请求的缩略图解码，直到队列为空"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+        self.signals = model._signals
+        self.size = model.thumbnail_size
+
+    def run(self):
+        while True:
+            request = self.model._next_request()
+            if request is None:
+                return
+            generation, image_path = request
+            try:
+                image = load_thumbnail(image_path, self.size)
+            except Exception:
+                image = None
+            if image is None or image.isNull():
+                self.signals.failed.emit(generation, image_path)
+            else:
+                self.signals.ready.emit(generation, image_path, image)
+
+
+class ThumbnailBrowser(QDialog):
+    """
+    文件夹缩略图浏览窗口。
+
+    QListView 使用统一的项目尺寸和分批布局，五万张图片的文件夹也只需布局和解码可见部分。
+    选中的图片通过 image_selected 信号交给主窗口加载。
+    """
+    image_selected = pyqtSignal(str)
+
+    def __init__(self, parent=None, thumbnail_size=THUMBNAIL_SIZE):
+        super().__init__(parent)
+        self.setWindowTitle("浏览文件夹")
+        self.setGeometry(200, 200, 900, 650)
+        self.setStyleSheet("background-color: #2b2b2b; color: white; font-family: Arial, sans-serif;")
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(12, 12, 12, 12)
+
+        # 目录和切换按钮
+        top_layout = QHBoxLayout()
+        self.path_label = QLabel()
+        self.count_label = QLabel()
+        self.open_button = QPushButton("选择文件夹")
+        self.open_button.setStyleSheet("background-color: #007AFF; color: white; border-radius: 10px; padding: 6px 14px;")
+        self.open_button.clicked.connect(self.choose_directory)
+        top_layout.addWidget(self.path_label, 1)
+        top_layout.addWidget(self.count_label)
+        top_layout.addWidget(self.open_button)
+        layout.addLayout(top_layout)
+
+        self.model = ThumbnailModel(self, thumbnail_size)
+        self.view = QListView()
+        self.view.setViewMode(QListView.IconMode)
+        self.view.setResizeMode(QListView.Adjust)
+        self.view.setMovement(QListView.Static)
+        self.view.setUniformItemSizes(True)         # 只按第一项计算尺寸
+        self.view.setLayoutMode(QListView.Batched)  # 分批布局，不阻塞界面
+        self.view.setBatchSize(500)
+        self.view.setIconSize(QSize(thumbnail_size, thumbnail_size))
+        self.view.setGridSize(QSize(thumbnail_size + 24, thumbnail_size + 36))
+        self.view.setTextElideMode(Qt.ElideMiddle)
+        self.view.setWordWrap(False)
+        self.view.setModel(self.model)
+        self.view.selectionModel().currentChanged.connect(self._on_current_changed)
+        self.model.modelReset.connect(self._update_count)
+        self.model.rowsInserted.connect(self._update_count)
+        self.model.rowsRemoved.connect(self._update_count)
+        layout.addWidget(self.view)
+
+    def set_directory(self, directory):
+        self.model.set_directory(directory)
+        self.path_label.setText(directory)
+        self.view.scrollToTop()
+
+    def choose_directory(self):
+        directory = QFileDialog.getExistingDirectory(self, "选择图片文件夹", self.model.directory or "")
+        if directory:
+            self.set_directory(directory)
+
+    def _update_count(self, *args):
+        self.count_label.setText(f"{self.model.rowCount()} 张")
+
+    def _on_current_changed(self, current, previous):
+        if current.isValid():
+            self.image_selected.emit(self.model.path_at(current.row()))
@@ -0,0 +1,203 @@
+import hashlib
+import os
+import pathlib
+import threading
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QImage, QImageReader
+
+from utils.app_paths import APP_NAME, get_thumbnail_dir
+
+# freedesktop 缩略图规范中的尺寸目录和最大边长
+THUMBNAIL_FLAVORS = (
+    ("normal", 128),
+    ("large", 256),
+    ("x-large", 512),
+    ("xx-large", 1024),
+)
+
+
+class ThumbnailStore:
+    """
+    按 freedesktop 缩略图规范保存的磁盘缩略图缓存。
+
+    缩略图以文件 URI 的 MD5 命名，保存为 PNG，并在 Thumb::URI 和 Thumb::MTime 文本块中
+    记录原图的 URI 和修改时间；两者与原图不一致即视为过期。在 Linux 上与文件管理器共用
+    ~/.cache/thumbnails，已生成过缩略图的文件夹再次打开时只需读取小 PNG。
+
+    参数：
+        root (str, 可选): 缩略图目录，默认为 get_thumbnail_dir()。
+    """
+
+    def __init__(self, root=None):
+        self.root = root if root is not None else get_thumbnail_dir()
+        self._fail_dir = os.path.join(self.root, "fail", APP_NAME)
+
+    @staticmethod
+    def uri_for(image_path):
+        """原图的文件 URI（规范要求使用绝对路径并按 RFC 2396 转义）"""
+        return pathlib.Path(os.path.abspath(image_path)).as_uri()
+
+    @staticmethod
+    def flavor_for(size):
+        """
+        选择不小于 size 的最小缩略图尺寸。
+
+        返回：
+            tuple: (目录名, 最大边长)；size 超过最大尺寸时返回 None。
+        """
+        for flavor in THUMBNAIL_FLAVORS:
+            if flavor[1] >= size:
+                return flavor
+        return None
+
+    def path_for(self, image_path, flavor_name):
+        name = hashlib.md5(self.uri_for(image_path).encode("utf-8")).hexdigest() + ".png"
+        return os.path.join(self.root, flavor_name, name)
+
+    def load(self, image_path, size, stat=None):
+        """
+        读取未过期的缩略图。
+
+        参数：
+            image_path (str): 原图路径。
+            size (int): 需要的最大边长，使用不小于该尺寸的缩略图。
+            stat (os.stat_result, 可选): 已获取的原图状态。
+
+        返回：
+            QImage: 缩略图；没有可用的缩略图时返回 None。可在后台线程中调用。
+        """
+        flavor = self.flavor_for(size)
+        if flavor is None:
+            return None
+        if stat is None:
+            try:
+                stat = os.stat(image_path)
+            except OSError:
+                return None
+        uri = self.uri_for(image_path)
+        mtime = str(int(stat.st_mtime))
+
+        # 从请求的尺寸开始查找，更大的缩略图同样可用
+        for flavor_name, _ in THUMBNAIL_FLAVORS[THUMBNAIL_FLAVORS.index(flavor):]:
+            thumbnail_path = self.path_for(image_path, flavor_name)
+            if not os.path.exists(thumbnail_path):
+                continue
+            reader = QImageReader(thumbnail_path, b"png")
+            # 文本块位于图像数据之前，不解码像素即可校验
+            if reader.text("Thumb::URI") != uri or reader.text("Thumb::MTime") != mtime:
+                continue
+            image = reader.read()
+            if not image.isNull():
+                return image
+        return None
+
+    def save(self, image_path, image, size, stat=None):
+        """
+        写入缩略图。先写入同目录下的临时文件再重命名，其他程序不会读到不完整的文件。
+
+        参数：
+            image_path (str): 原图路径。
+            image (QImage): 缩略图，大于目标尺寸时先缩小。
+            size (int): 需要的最大边长。
+            stat (os.stat_result, 可选): 已获取的原图状态。
+
+        返回：
+            QImage: 实际保存的缩略图；size 超过最大尺寸或写入失败时返回原图像。
+        """
+        flavor = self.flavor_for(size)
+        if flavor is None:
+            return image
+        flavor_name, max_size = flavor
+        if image.width() > max_size or image.height() > max_size:
+            image = image.scaled(max_size, max_size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+        try:
+            if stat is None:
+                stat = os.stat(image_path)
+            thumbnail = QImage(image)
+            thumbnail.setText("Thumb::URI", self.uri_for(image_path))
+            thumbnail.setText("Thumb::MTime", str(int(stat.st_mtime)))
+            thumbnail.setText("Thumb::Size", str(stat.st_size))
+            thumbnail.setText("Software", APP_NAME)
+
+            thumbnail_path = self.path_for(image_path, flavor_name)
+            os.makedirs(os.path.dirname(thumbnail_path), mode=0o700, exist_ok=True)
+            temp_path = f"{thumbnail_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            if not thumbnail.save(temp_path, "PNG"):
+                raise OSError(f"无法写入 {temp_path}")
+            os.chmod(temp_path, 0o600)  # 规范要求缩略图只对所有者可读
+            os.replace(temp_path, thumbnail_path)
+        except OSError as e:
+            print(f"缩略图缓存写入失败：{e}")
+        return image
+
+    def has_failed(self, image_path, stat=None):
+        """原图在未修改的情况下是否已生成失败过"""
+        thumbnail_path = self.path_for(image_path, os.path.join("fail", APP_NAME))
+        if not os.path.exists(thumbnail_path):
+            return False
+        try:
+            if stat is None:
+                stat = os.stat(image_path)
+        except OSError:
+            return False
+        return QImageReader(thumbnail_path, b"png").text("Thumb::MTime") == str(int(stat.st_mtime))
+
+    def mark_failed(self, image_path, stat=None):
+        """按规范在 fail 目录中写入 1x1 的占位 PNG，避免反复解码损坏的文件"""
+        try:
+            if stat is None:
+                stat = os.stat(image_path)
+            marker = QImage(1, 1, QImage.Format_ARGB32)
+            marker.fill(Qt.transparent)
+            marker.setText("Thumb::URI", self.uri_for(image_path))
+            marker.setText("Thumb::MTime", str(int(stat.st_mtime)))
+            os.makedirs(self._fail_dir, mode=0o700, exist_ok=True)
+            marker.save(self.path_for(image_path, os.path.join("fail", APP_NAME)), "PNG")
+        except OSError:
+            pass
+
+    def get_or_create(self, image_path, size, decode):
+        """
+        读取缩略图，没有或已过期时调用 decode(image_path, 边长) 生成并写入缓存。
+
+        返回：
+            QImage: 缩略图，生成失败时返回 None。可在后台线程中调用。
+        """
+        try:
+            stat = os.stat(image_path)
+        except OSError:
+            return None
+        image = self.load(image_path, size, stat)
+        if image is not None:
+            return image
+        flavor = self.flavor_for(size)
+        if flavor is None:
+            return decode(image_path, size)
+        if self.has_failed(image_path, stat):
+            return None
+
+        # 按缩略图目录的尺寸解码，同一尺寸的其他请求也能复用
+        image = decode(image_path, flavor[1])
+        if image is None or image.isNull():
+            self.mark_failed(image_path, stat)
+            return None
+        return self.save(image_path, image, size, stat)
+
+
+_default_store = None
+_default_lock = threading.Lock()
+
+
+def get_thumbnail_store():
+    """获取全局共享的缩略图缓存，无法创建目录时返回 None"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            try:
+                _default_store = ThumbnailStore()
+            except OSError as e:
+                print(f"缩略图缓存不可用：{e}")
+                return None
+        return _default_store
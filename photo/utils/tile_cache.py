@@ -0,0 +1,350 @@
+import itertools
+import math
+import os
+import sqlite3
+import threading
+import time
+from concurrent import futures
+
+from utils.app_paths import get_cache_dir
+
+# 瓦片数据库路径，可通过环境变量 EXIF_EDITOR_TILES 指定（例如内网机器上预先下载好的 .mbtiles）
+TILES_ENV = "EXIF_EDITOR_TILES"
+# 上游瓦片地址模板，可通过环境变量 EXIF_EDITOR_TILE_URL 替换；{s} 依次取 SUBDOMAINS 中的值
+TILE_URL_ENV = "EXIF_EDITOR_TILE_URL"
+# 默认使用高德栅格瓦片，与在线地图使用同一坐标系（GCJ-02）
+DEFAULT_TILE_URL = "https://webrd0{s}.is.autonavi.com/appmaptile?lang=zh_cn&size=1&scale=1&style=8&x={x}&y={y}&z={z}"
+SUBDOMAINS = "1234"
+
+TILE_SIZE = 256
+MAX_ZOOM = 18
+# Web 墨卡托投影的纬度范围
+MAX_LATITUDE = 85.0511287798
+
+# 默认最多占用 512 MB
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# 每写入多少个瓦片检查一次是否需要淘汰
+_EVICT_INTERVAL = 200
+# 淘汰时降到上限的比例，避免每次写入都触发淘汰
+_EVICT_TARGET = 0.9
+# 访问时间的更新间隔（秒），避免每次读取都写数据库
+_TOUCH_INTERVAL = 60
+
+
+def lonlat_to_tile(longitude, latitude, zoom):
+    """
+    经纬度转换为瓦片编号（XYZ 方案，y 轴向下）。
+
+    返回：
+        tuple: (x, y)。
+    """
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    n = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * n)
+    lat = math.radians(latitude)
+    y = int((1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def tiles_in_bbox(min_lon, min_lat, max_lon, max_lat, min_zoom, max_zoom):
+    """
+    生成范围内各级别的所有瓦片编号。
+
+    返回：
+        generator: (z, x, y)。
+    """
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, zoom)
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, zoom)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                yield zoom, x, y
+
+
+def count_tiles(min_lon, min_lat, max_lon, max_lat, min_zoom, max_zoom):
+    """范围内各级别的瓦片总数"""
+    total = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        x0, y0 = lonlat_to_tile(min_lon, max_lat, zoom)
+        x1, y1 = lonlat_to_tile(max_lon, min_lat, zoom)
+        total += (x1 - x0 + 1) * (y1 - y0 + 1)
+    return total
+
+
+class TileCache:
+    """
+    基于 SQLite 的地图瓦片缓存，采用 MBTiles 格式，可以直接拷贝到没有网络的机器上使用，
+    也可以用 QGIS 等工具打开。
+
+    tiles 表按 MBTiles 规范使用 TMS 行号（y 轴向上），另外记录每个瓦片的大小和最近访问时间，
+    总大小超过上限时按最近访问时间淘汰（LRU）。
+
+    参数：
+        db_path (str, 可选): 数据库路径，默认为环境变量 EXIF_EDITOR_TILES 或缓存目录下的 map_tiles.mbtiles。
+        max_bytes (int): 瓦片总大小上限，为 None 时不限制。
+    """
+
+    def __init__(self, db_path=None, max_bytes=DEFAULT_MAX_BYTES):
+        if db_path is None:
+            db_path = os.environ.get(TILES_ENV) or os.path.join(get_cache_dir(), "map_tiles.mbtiles")
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._writes = 0
+        # 连接在瓦片服务线程、下载线程和界面线程之间共享，由锁保证串行访问
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tiles ("
+            " zoom_level INTEGER NOT NULL,"
+            " tile_column INTEGER NOT NULL,"
+            " tile_row INTEGER NOT NULL,"
+            " tile_data BLOB NOT NULL,"
+            " size INTEGER NOT NULL DEFAULT 0,"
+            " accessed REAL NOT NULL DEFAULT 0,"
+            " PRIMARY KEY (zoom_level, tile_column, tile_row))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tiles_accessed ON tiles (accessed)")
+        self._conn.execute(
+            "INSERT OR IGNORE INTO metadata (name, value) VALUES"
+            " ('name', 'ExifEditor'), ('format', 'png'), ('type', 'baselayer')"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _tms_row(zoom, y):
+        return (1 << zoom) - 1 - y
+
+    def get(self, zoom, x, y):
+        """
+        读取瓦片。
+
+        返回：
+            bytes: 瓦片数据，未命中时返回 None。
+        """
+        row = self._tms_row(zoom, y)
+        now = time.time()
+        with self._lock:
+            result = self._conn.execute(
+                "SELECT tile_data, accessed FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (zoom, x, row),
+            ).fetchone()
+            if result is None:
+                return None
+            data, accessed = result
+            if now - accessed > _TOUCH_INTERVAL:
+                self._conn.execute(
+                    "UPDATE tiles SET accessed = ? WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                    (now, zoom, x, row),
+                )
+                self._conn.commit()
+            return bytes(data)
+
+    def contains(self, zoom, x, y):
+        """瓦片是否已缓存"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?",
+                (zoom, x, self._tms_row(zoom, y)),
+            ).fetchone() is not None
+
+    def put(self, zoom, x, y, data):
+        """写入瓦片"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data, size, accessed)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (zoom, x, self._tms_row(zoom, y), sqlite3.Binary(data), len(data), now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_INTERVAL == 0:
+                self._evict()
+            self._conn.commit()
+
+    def set_metadata(self, **values):
+        """写入 MBTiles 元数据（bounds、minzoom、maxzoom 等）"""
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                [(name, str(value)) for name, value in values.items()],
+            )
+            self._conn.commit()
+
+    def get_metadata(self):
+        """
+        返回：
+            dict: MBTiles 元数据。
+        """
+        with self._lock:
+            return dict(self._conn.execute("SELECT name, value FROM metadata").fetchall())
+
+    def stats(self):
+        """
+        返回：
+            tuple: (瓦片数, 总字节数)。
+        """
+        with self._lock:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM tiles").fetchone()
+        return count, total
+
+    def _evict(self):
+        """按最近访问时间淘汰瓦片，直到总大小降到上限的 90%（调用方持有锁）"""
+        if self.max_bytes is None:
+            return
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM tiles").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * _EVICT_TARGET)
+        removed = 0
+        victims = []
+        for zoom, column, row, size in self._conn.execute(
+                "SELECT zoom_level, tile_column, tile_row, size FROM tiles ORDER BY accessed"):
+            victims.append((zoom, column, row))
+            removed += size
+            if removed >= excess:
+                break
+        self._conn.executemany(
+            "DELETE FROM tiles WHERE zoom_level = ? AND tile_column = ? AND tile_row = ?", victims)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM tiles")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class TileDownloader:
+    """
+    从上游瓦片服务下载瓦片。每个线程使用自己的 requests.Session，复用 HTTP 连接。
+
+    参数：
+        url_template (str): 瓦片地址模板，包含 {x}、{y}、{z}，可选 {s}。
+        timeout (float): 单个请求的超时时间（秒）。
+    """
+
+    def __init__(self, url_template=None, timeout=10, user_agent="photo_exif_app"):
+        self.url_template = url_template or os.environ.get(TILE_URL_ENV) or DEFAULT_TILE_URL
+        self.timeout = timeout
+        self.user_agent = user_agent
+        self._local = threading.local()
+        self._subdomains = itertools.cycle(SUBDOMAINS)
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            import requests  # 只有需要下载时才导入
+
+            session = requests.Session()
+            session.headers["User-Agent"] = self.user_agent
+            self._local.session = session
+        return session
+
+    def fetch(self, zoom, x, y):
+        """
+        下载单个瓦片。
+
+        返回：
+            bytes: 瓦片数据。
+
+        异常：
+            OSError: 请求失败或返回的不是图片时抛出。
+        """
+        url = self.url_template.format(s=next(self._subdomains), x=x, y=y, z=zoom)
+        try:
+            response = self._session().get(url, timeout=self.timeout)
+        except Exception as e:
+            raise OSError(f"瓦片下载失败：{e}") from e
+        if response.status_code != 200 or not response.headers.get("Content-Type", "").startswith("image/"):
+            raise OSError(f"瓦片下载失败：HTTP {response.status_code}")
+        return response.content
+
+
+def prefetch_tiles(cache, downloader, bbox, min_zoom, max_zoom, workers=4, on_progress=None, should_stop=None):
+    """
+    下载范围内尚未缓存的瓦片。
+
+    参数：
+        cache (TileCache): 瓦片缓存。
+        downloader (TileDownloader): 瓦片下载器。
+        bbox (tuple): (最小经度, 最小纬度, 最大经度, 最大纬度)。
+        min_zoom, max_zoom (int): 缩放级别范围（包含两端）。
+        workers (int): 并行下载数，公共瓦片服务通常限制并发，不宜过大。
+        on_progress (callable, 可选): on_progress(已处理数, 总数, 失败数)。
+        should_stop (callable, 可选): 返回 True 时停止提交新的下载。
+
+    返回：
+        tuple: (下载数, 跳过数, 失败数)。
+    """
+    total = count_tiles(*bbox, min_zoom, max_zoom)
+    downloaded = skipped = failed = 0
+
+    def download(tile):
+        zoom, x, y = tile
+        cache.put(zoom, x, y, downloader.fetch(zoom, x, y))
+
+    with futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pending = set()
+        done_count = 0
+        for tile in tiles_in_bbox(*bbox, min_zoom, max_zoom):
+            if should_stop is not None and should_stop():
+                break
+            if cache.contains(*tile):
+                skipped += 1
+                done_count += 1
+                continue
+            pending.add(executor.submit(download, tile))
+            # 限制排队的任务数，大范围预下载时不会一次生成上百万个 Future
+            if len(pending) >= workers * 4:
+                finished, pending = futures.wait(pending, return_when=futures.FIRST_COMPLETED)
+                for future in finished:
+                    done_count += 1
+                    if future.exception() is None:
+                        downloaded += 1
+                    else:
+                        failed += 1
+                if on_progress is not None:
+                    on_progress(done_count, total, failed)
+        for future in futures.as_completed(pending):
+            done_count += 1
+            if future.exception() is None:
+                downloaded += 1
+            else:
+                failed += 1
+        if on_progress is not None:
+            on_progress(done_count, total, failed)
+
+    # 与之前下载的范围合并
+    metadata = cache.get_metadata()
+    try:
+        old = [float(v) for v in metadata["bounds"].split(",")]
+        bbox = (min(old[0], bbox[0]), min(old[1], bbox[1]), max(old[2], bbox[2]), max(old[3], bbox[3]))
+        min_zoom = min(min_zoom, int(metadata["minzoom"]))
+        max_zoom = max(max_zoom, int(metadata["maxzoom"]))
+    except (KeyError, ValueError, IndexError):
+        pass
+    cache.set_metadata(bounds=",".join(str(v) for v in bbox), minzoom=min_zoom, maxzoom=max_zoom)
+    return downloaded, skipped, failed
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_tile_cache():
+    """获取全局共享的瓦片缓存，无法打开数据库时返回 None"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            try:
+                _default_cache = TileCache()
+            except (OSError, sqlite3.Error) as e:
+                print(f"瓦片缓存不可用：{e}")
+                return None
+        return _default_cache
@@ -0,0 +1,136 @@
+import os
+import re
+import sqlite3
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.geocoding import OFFLINE_ENV
+from utils.tile_cache import TileDownloader, get_tile_cache
+
+_TILE_PATH = re.compile(r"^/tiles/(\d+)/(\d+)/(\d+)(?:\.\w+)?$")
+
+
+def _content_type(data):
+    """按文件头判断瓦片格式"""
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data[8:12] == b"WEBP":
+        return "image/webp"
+    return "application/octet-stream"
+
+
+class _TileRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # 保持连接，地图一次会请求几十个瓦片
+
+    def do_GET(self):
+        match = _TILE_PATH.match(self.path.split("?", 1)[0])
+        if match is None:
+            self.send_error(404)
+            return
+        data = self.server.tile_server.get_tile(*(int(v) for v in match.groups()))
+        if data is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", _content_type(data))
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "max-age=86400")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass    # 不输出访问日志
+
+
+class TileServer:
+    """
+    进程内的本地瓦片服务，只监听 127.0.0.1，在后台线程中运行。
+
+    地图页面从 http://127.0.0.1:端口/tiles/{z}/{x}/{y} 读取瓦片：已缓存的瓦片直接返回；
+    未缓存且设置了下载器时从上游下载并写入缓存，没有网络时返回 404，页面显示空白瓦片。
+
+    参数：
+        cache (TileCache): 瓦片缓存。
+        downloader (TileDownloader, 可选): 上游下载器，为 None 时只使用缓存。
+    """
+
+    def __init__(self, cache, downloader=None):
+        self.cache = cache
+        self.downloader = downloader
+        self._httpd = None
+        self._thread = None
+
+    @property
+    def url(self):
+        """服务地址，未启动时为 None"""
+        if self._httpd is None:
+            return None
+        return f"http://127.0.0.1:{self._httpd.server_address[1]}"
+
+    @property
+    def tile_url_template(self):
+        return f"{self.url}/tiles/{{z}}/{{x}}/{{y}}"
+
+    def get_tile(self, zoom, x, y):
+        """从缓存读取瓦片，未命中时尝试下载（在服务线程中调用）"""
+        if zoom > 30 or x >= (1 << zoom) or y >= (1 << zoom):
+            return None
+        data = self.cache.get(zoom, x, y)
+        if data is None and self.downloader is not None:
+            try:
+                data = self.downloader.fetch(zoom, x, y)
+            except OSError:
+                return None
+            try:
+                self.cache.put(zoom, x, y, data)
+            except sqlite3.Error as e:
+                # 磁盘已满或数据库被锁定时只是无法缓存，瓦片照常返回
+                print(f"瓦片缓存写入失败：{e}")
+        return data
+
+    def start(self):
+        """
+        在随机端口上启动服务（重复调用不会启动多个）。
+
+        返回：
+            str: 服务地址。
+        """
+        if self._httpd is None:
+            self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _TileRequestHandler)
+            self._httpd.daemon_threads = True
+            self._httpd.tile_server = self
+            self._thread = threading.Thread(target=self._httpd.serve_forever, name="TileServer", daemon=True)
+            self._thread.start()
+        return self.url
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+            self._thread = None
+
+
+_default_server = None
+_default_lock = threading.Lock()
+
+
+def get_tile_server():
+    """
+    获取全局共享的瓦片服务（第一次调用时启动），瓦片缓存不可用时返回 None。
+
+    设置 EXIF_EDITOR_OFFLINE=1 时只使用本地缓存，不下载瓦片。
+    """
+    global _default_server
+    with _default_lock:
+        if _default_server is None:
+            cache = get_tile_cache()
+            if cache is None:
+                return None
+            downloader = None if os.environ.get(OFFLINE_ENV) == "1" else TileDownloader()
+            _default_server = TileServer(cache, downloader)
+            _default_server.start()
+        return _default_server
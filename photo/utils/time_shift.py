@@ -0,0 +1,139 @@
+import re
+from datetime import datetime, timedelta
+
+import piexif
+
+from utils.exif_core import rewrite_exif
+
+EXIF_DATE_FORMAT = "%Y:%m:%d %H:%M:%S"
+
+# (IFD, 日期标签, 对应的时区标签)
+_DATE_TAGS = (
+    ("0th", piexif.ImageIFD.DateTime, piexif.ExifIFD.OffsetTime),
+    ("Exif", piexif.ExifIFD.DateTimeOriginal, piexif.ExifIFD.OffsetTimeOriginal),
+    ("Exif", piexif.ExifIFD.DateTimeDigitized, piexif.ExifIFD.OffsetTimeDigitized),
+)
+
+_SHIFT_UNITS = {"d": "days", "h": "hours", "m": "minutes", "s": "seconds"}
+_SHIFT_PART = re.compile(r"(\d+(?:\.\d+)?)\s*([dhms])", re.IGNORECASE)
+_CLOCK_SHIFT = re.compile(r"^(\d+):(\d{1,2})(?::(\d{1,2}))?$")
+
+
+def parse_time_shift(text):
+    """
+    解析时间偏移，如 "+1d2h"、"-30s"、"+2h 30m" 或 "-0:05:00"。
+
+    返回：
+        timedelta: 时间偏移。
+
+    异常：
+        ValueError: 无法解析时抛出。
+    """
+    text = text.strip()
+    sign = -1 if text.startswith("-") else 1
+    body = text.lstrip("+-").strip()
+
+    match = _CLOCK_SHIFT.match(body)
+    if match:
+        hours, minutes, seconds = (int(v or 0) for v in match.groups())
+        return sign * timedelta(hours=hours, minutes=minutes, seconds=seconds)
+
+    parts = _SHIFT_PART.findall(body)
+    if not parts or _SHIFT_PART.sub("", body).strip():
+        raise ValueError(f"无法解析时间偏移：{text}（示例：+1d2h、-30s、-0:05:00）")
+    delta = timedelta()
+    for value, unit in parts:
+        delta += timedelta(**{_SHIFT_UNITS[unit.lower()]: float(value)})
+    return sign * delta
+
+
+def format_utc_offset(offset):
+    """把时区偏移格式化为 EXIF OffsetTime 格式（"+08:00"）"""
+    minutes = int(offset.total_seconds() // 60)
+    sign = "-" if minutes < 0 else "+"
+    hours, minutes = divmod(abs(minutes), 60)
+    return f"{sign}{hours:02d}:{minutes:02d}"
+
+
+def parse_utc_offset(text):
+    """解析 EXIF OffsetTime 格式或小时数（"+08:00"、"-5"、"5.5"），无法解析时返回 None"""
+    text = text.strip("\x00 ")
+    try:
+        if ":" in text:
+            sign = -1 if text.startswith("-") else 1
+            hours, minutes = text.lstrip("+-").split(":")
+            return sign * timedelta(hours=int(hours), minutes=int(minutes))
+        return timedelta(hours=float(text))
+    except ValueError:
+        return None
+
+
+def shift_exif_dict(exif_dict, delta=timedelta(), from_offset=None, to_offset=None):
+    """
+    把 EXIF 字典中的拍摄时间平移，每个时间标签在自身原值的基础上调整。
+
+    SubSecTime* 标签保持不变（偏移按整秒计算）；指定 to_offset 时按时区差额再平移，
+    并把 OffsetTime* 标签改为新时区。GPS 时间戳本身是 UTC，不做调整。
+
+    参数：
+        exif_dict (dict): piexif 格式的 EXIF 字典，会被原地修改。
+        delta (timedelta): 时间偏移（相机时钟误差）。
+        from_offset (timedelta, 可选): 原时区，照片有 OffsetTime* 标签时以标签为准。
+        to_offset (timedelta, 可选): 新时区。
+
+    返回：
+        int: 修改的时间标签数。
+
+    异常：
+        ValueError: 需要转换时区但照片和参数都没有原时区时抛出。
+    """
+    delta = timedelta(seconds=round(delta.total_seconds()))
+    changed = 0
+    for ifd, date_tag, offset_tag in _DATE_TAGS:
+        raw = exif_dict.get(ifd, {}).get(date_tag)
+        if not raw:
+            continue
+        try:
+            value = datetime.strptime(raw.decode().strip("\x00 "), EXIF_DATE_FORMAT)
+        except ValueError:
+            continue    # 无法解析的日期保持原样
+
+        shift = delta
+        if to_offset is not None:
+            raw_offset = exif_dict["Exif"].get(offset_tag)
+            source = parse_utc_offset(raw_offset.decode()) if raw_offset else None
+            if source is None:
+                source = from_offset
+            if source is None:
+                raise ValueError("照片没有时区信息，需要指定原时区")
+            shift += to_offset - source
+            exif_dict["Exif"][offset_tag] = format_utc_offset(to_offset)
+
+        exif_dict[ifd][date_tag] = (value + shift).strftime(EXIF_DATE_FORMAT)
+        changed += 1
+    return changed
+
+
+class TimeShiftSpec:
+    """
+    平移拍摄时间的批量编辑内容，可直接交给 BatchEditor。
+
+    参数：
+        delta (timedelta): 时间偏移。
+        from_offset (timedelta, 可选): 原时区（照片没有 OffsetTime* 标签时使用）。
+        to_offset (timedelta, 可选): 新时区，指定时按时区差额平移并更新时区标签。
+    """
+
+    def __init__(self, delta=timedelta(), from_offset=None, to_offset=None):
+        self.delta = delta
+        self.from_offset = from_offset
+        self.to_offset = to_offset
+
+    def apply(self, image_path, dest_path, fsync=False):
+        """平移单个文件的拍摄时间，JPEG 只改写文件头；dest_path 为 None 时原地修改"""
+        def edit(exif_dict):
+            if not shift_exif_dict(exif_dict, self.delta, self.from_offset, self.to_offset):
+                raise LookupError("没有拍摄日期")
+            return piexif.dump(exif_dict)
+
+        rewrite_exif(image_path, dest_path, edit, fsync)